@@ -0,0 +1,88 @@
+"""
+Embedding Micro-Batching Benchmark - 查询向量微批处理基准测试
+模拟泊松到达的并发查询，对比不同批处理窗口下的吞吐、端到端延迟和批大小
+窗口为 0 且批大小上限为 1 时相当于每个请求单独计算（未启用微批处理）
+
+用法: python benchmark_batching.py [queries per second] [number of queries] [backend]
+"""
+
+import asyncio
+import random
+import sys
+import time
+
+import numpy as np
+
+from embedding_batcher import EmbeddingMicroBatcher
+from retreival import get_embedding_model
+
+# (max_wait_ms, max_batch_size)
+CONFIGURATIONS = [(0, 1), (0, 32), (2, 32), (5, 32), (10, 32), (20, 64)]
+
+QUERY_TEMPLATES = [
+    "What did you work on at {}?",
+    "Tell me about your {} projects",
+    "Which {} tools have you used?",
+    "{}相关的经历",
+]
+TOPICS = ["Baidu", "Apple", "Michelin", "machine learning", "deep learning", "data analysis", "NLP", "PyTorch"]
+
+
+def make_queries(n_queries, seed=42):
+    """Distinct queries, so that every request needs a forward pass."""
+    rng = random.Random(seed)
+    return [f"{rng.choice(QUERY_TEMPLATES).format(rng.choice(TOPICS))} #{i}" for i in range(n_queries)]
+
+
+async def run_load(batcher, queries, qps, seed=42):
+    """
+    Send queries with exponential inter-arrival times and wait for all of them.
+
+    Returns:
+        tuple: (wall time in seconds, per-query latencies in milliseconds)
+    """
+    rng = random.Random(seed)
+    latencies = []
+
+    async def request(query):
+        start = time.perf_counter()
+        await batcher.embed_query(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    tasks = []
+    for query in queries:
+        tasks.append(asyncio.create_task(request(query)))
+        await asyncio.sleep(rng.expovariate(qps))
+    await asyncio.gather(*tasks)
+    return time.perf_counter() - start, latencies
+
+
+async def run_benchmark(qps=200, n_queries=1000, backend=None):
+    """Run every batching configuration under the same load and print the results."""
+    embeddings = get_embedding_model(backend=backend)
+    # Warm up the model so the first configuration is not penalized
+    embeddings.embed_documents(make_queries(8, seed=0))
+    queries = make_queries(n_queries)
+
+    print(f"\nload: {qps} queries/s, {n_queries} queries")
+    print(f"{'wait(ms)':>8} | {'max batch':>9} | {'queries/s':>9} | {'p50(ms)':>8} | {'p95(ms)':>8} | "
+          f"{'p99(ms)':>8} | {'mean batch':>10} | {'mean wait(ms)':>13}")
+    print("-" * 96)
+    for max_wait_ms, max_batch_size in CONFIGURATIONS:
+        batcher = EmbeddingMicroBatcher(embeddings, max_wait_ms=max_wait_ms, max_batch_size=max_batch_size)
+        elapsed, latencies = await run_load(batcher, queries, qps)
+        stats = batcher.stats()
+        await batcher.close()
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        print(f"{max_wait_ms:>8} | {max_batch_size:>9} | {n_queries / elapsed:>9.1f} | {p50:>8.2f} | {p95:>8.2f} | "
+              f"{p99:>8.2f} | {stats['batch_size']['mean']:>10.2f} | {stats['queue_wait_ms']['mean']:>13.2f}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(run_benchmark(
+        float(args[0]) if len(args) > 0 else 200,
+        int(args[1]) if len(args) > 1 else 1000,
+        args[2] if len(args) > 2 else None,
+    ))
@@ -0,0 +1,84 @@
+"""
+Near-Duplicate Elimination Benchmark - 近似重复 chunk 去重效果评估
+对比不去重与不同 Jaccard 阈值的 MinHash-LSH 去重：chunk 数、向量索引大小、
+top_k 结果中近似重复的数量，以及写入 prompt 的检索上下文平均 token 数（按英文单词 / 中文单字近似计数）
+
+用法: python benchmark_dedup.py [PDF / Excel file or directory] [top_k]
+"""
+
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+from chucking import chunk_resume_documents, load_document
+from dedup import deduplicate_chunks, jaccard, shingles
+from flat_store import FlatNumpyStore
+from ingest import find_documents
+from retreival import get_embedding_model
+
+BENCHMARK_QUERIES = [
+    "What are the candidate's main skills?",
+    "Tell me about machine learning projects",
+    "What work experience do you have at Baidu?",
+    "What deep learning frameworks have you used?",
+    "How can I contact the candidate?",
+    "What is the candidate's education?",
+    "机器学习相关的内容",
+    "深度学习的应用",
+]
+
+THRESHOLDS = (None, 0.9, 0.8, 0.7, 0.5)
+
+
+def approx_tokens(text):
+    """Approximate LLM token count: one per word, number or CJK character / symbol."""
+    return len(re.findall(r"[A-Za-z0-9]+|[^\sA-Za-z0-9]", text))
+
+
+def redundant_results(docs, threshold):
+    """Number of results that are near-duplicates of a higher-ranked result."""
+    seen, redundant = [], 0
+    for doc in docs:
+        doc_shingles = shingles(doc.page_content)
+        if any(jaccard(doc_shingles, other) >= threshold for other in seen):
+            redundant += 1
+        seen.append(doc_shingles)
+    return redundant
+
+
+def run_benchmark(path="../data", top_k=5):
+    """Chunk the documents once, then compare deduplication thresholds."""
+    files = find_documents(path) if os.path.isdir(path) else [path]
+    pages = [page for file_path in files for page in load_document(file_path)]
+    chunks = chunk_resume_documents(pages, dedup_threshold=None)
+    embeddings = get_embedding_model()
+    vectors = np.asarray(embeddings.embed_documents([chunk.page_content for chunk in chunks]), dtype=np.float32)
+    query_vectors = embeddings.embed_documents(BENCHMARK_QUERIES)
+    print(f"\n{len(files)} files, {len(pages)} pages, {len(chunks)} chunks")
+
+    print(f"\n{'threshold':>9} | {'chunks':>6} | {'index(KB)':>9} | {'dedup(ms)':>9} | "
+          f"{'dup@' + str(top_k):>6} | {'context tokens':>14}")
+    print("-" * 68)
+    # Redundancy among results is always judged at 0.8, so rows are comparable
+    for threshold in THRESHOLDS:
+        start = time.perf_counter()
+        kept = deduplicate_chunks(list(chunks), threshold) if threshold else chunks
+        dedup_ms = (time.perf_counter() - start) * 1000
+        positions = {id(chunk): i for i, chunk in enumerate(chunks)}
+        rows = [positions[id(chunk)] for chunk in kept]
+
+        store = FlatNumpyStore(vectors[rows], [chunk.page_content for chunk in kept],
+                               [dict(chunk.metadata) for chunk in kept])
+        results = store.similarity_search_by_vectors(query_vectors, top_k)
+        redundant = np.mean([redundant_results(docs, 0.8) for docs in results])
+        tokens = np.mean([sum(approx_tokens(doc.page_content) for doc in docs) for docs in results])
+        print(f"{threshold or 'off':>9} | {len(kept):>6} | {store.nbytes() / 1024:>9.1f} | {dedup_ms:>9.1f} | "
+              f"{redundant:>6.2f} | {tokens:>14.1f}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    run_benchmark(args[0] if args else "../data", int(args[1]) if len(args) > 1 else 5)
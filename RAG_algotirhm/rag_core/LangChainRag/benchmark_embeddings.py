@@ -0,0 +1,116 @@
+"""
+Embedding Backend Benchmark - 向量化后端基准测试
+对比 HuggingFaceEmbeddings（PyTorch）、ONNX Runtime float32 与 int8 量化后端
+指标：单条查询延迟、批量吞吐、与 PyTorch 向量的余弦相似度、在 docs/chroma 上的检索结果重合率
+
+用法: python benchmark_embeddings.py [persist_directory] [backend ...]
+"""
+
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from retreival import DEFAULT_EMBEDDING_MODEL, EMBEDDING_BACKENDS, create_embedding_model, load_chroma_db
+
+BENCHMARK_QUERIES = [
+    "What are the candidate's main skills?",
+    "Tell me about machine learning projects",
+    "What work experience do you have at Baidu?",
+    "What deep learning frameworks have you used?",
+    "机器学习相关的内容",
+    "深度学习的应用",
+]
+
+
+def query_latency_ms(embeddings, queries, repeat=20):
+    """
+    Median latency of a single embed_query call in milliseconds.
+
+    Args:
+        embeddings (Embeddings): Embedding backend.
+        queries (list): Query strings.
+        repeat (int): Number of passes over the queries.
+
+    Returns:
+        float: Median latency per query.
+    """
+    timings = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            embeddings.embed_query(query)
+            timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def throughput(embeddings, texts, min_texts=512):
+    """
+    Texts embedded per second with embed_documents.
+
+    Args:
+        embeddings (Embeddings): Embedding backend.
+        texts (list): Document texts, repeated until there are at least min_texts.
+        min_texts (int): Minimum number of texts per measurement.
+
+    Returns:
+        float: Texts per second.
+    """
+    batch = (texts * (min_texts // max(len(texts), 1) + 1))[:max(min_texts, len(texts))]
+    start = time.perf_counter()
+    embeddings.embed_documents(batch)
+    return len(batch) / (time.perf_counter() - start)
+
+
+def top_k_ids(vectordb, query_vectors, top_k):
+    """Query the Chroma collection with precomputed vectors and return the result ids."""
+    results = vectordb._collection.query(query_embeddings=query_vectors, n_results=top_k, include=[])
+    return results["ids"]
+
+
+def run_benchmark(persist_directory="docs/chroma/", backends=EMBEDDING_BACKENDS, top_k=5):
+    """Run the benchmark and print one row per backend."""
+    vectordb = load_chroma_db(persist_directory, backend="huggingface")
+    texts = vectordb._collection.get(include=["documents"])["documents"] or BENCHMARK_QUERIES
+    print(f"Corpus: {len(texts)} chunks in {persist_directory}, {len(BENCHMARK_QUERIES)} queries, top_k={top_k}")
+
+    models = {}
+    for backend in backends:
+        start = time.perf_counter()
+        # The benchmark is how int8 gets evaluated, so it does not need EMBEDDING_ALLOW_INT8
+        models[backend] = create_embedding_model(DEFAULT_EMBEDDING_MODEL, backend, allow_int8=True)
+        print(f"Loaded {backend} in {time.perf_counter() - start:.2f}s")
+
+    # The PyTorch backend is the reference the stored vectors were built with
+    reference = models.get("huggingface") or create_embedding_model(DEFAULT_EMBEDDING_MODEL, "huggingface")
+    reference_queries = np.array(reference.embed_documents(BENCHMARK_QUERIES))
+    reference_docs = np.array(reference.embed_documents(texts))
+    reference_ids = top_k_ids(vectordb, reference_queries.tolist(), top_k)
+
+    print(f"\n{'backend':>12} | {'query p50(ms)':>13} | {'texts/s':>8} | {'cos(query)':>10} | "
+          f"{'cos(doc)':>8} | {'overlap@' + str(top_k):>10}")
+    print("-" * 78)
+    for backend, embeddings in models.items():
+        # Warm up so lazy initialization is not measured
+        embeddings.embed_documents(BENCHMARK_QUERIES)
+        latency = query_latency_ms(embeddings, BENCHMARK_QUERIES)
+        rate = throughput(embeddings, texts)
+
+        query_vectors = np.array(embeddings.embed_documents(BENCHMARK_QUERIES))
+        doc_vectors = np.array(embeddings.embed_documents(texts))
+        # Vectors are L2-normalized, so the row-wise dot product is the cosine similarity
+        query_cos = float(np.mean(np.sum(query_vectors * reference_queries, axis=1)))
+        doc_cos = float(np.mean(np.sum(doc_vectors * reference_docs, axis=1)))
+
+        ids = top_k_ids(vectordb, query_vectors.tolist(), top_k)
+        overlap = np.mean([len(set(a) & set(b)) / max(len(b), 1) for a, b in zip(ids, reference_ids)])
+
+        print(f"{backend:>12} | {latency:>13.2f} | {rate:>8.1f} | {query_cos:>10.4f} | "
+              f"{doc_cos:>8.4f} | {overlap:>10.2%}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    persist_directory = args.pop(0) if args and args[0] not in EMBEDDING_BACKENDS else "docs/chroma/"
+    run_benchmark(persist_directory, tuple(args) or EMBEDDING_BACKENDS)
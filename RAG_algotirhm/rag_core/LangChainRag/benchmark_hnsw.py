@@ -0,0 +1,93 @@
+"""
+HNSW Parameter Sweep - HNSW 参数扫描
+以 FlatNumpyStore float32 精确检索为标准答案，扫描 M / ef_construction / ef_search，
+报告构建耗时、索引内存、recall@k 和单条查询延迟，用于选择召回率与延迟的平衡点
+语料：docs/chroma 中的真实向量，以及带聚类结构的合成向量
+
+用法: python benchmark_hnsw.py [persist_directory] [synthetic size]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from benchmark_quantization import synthetic_corpus
+from flat_store import FlatNumpyStore
+from hnsw_store import HnswStore
+from retreival import get_embedding_model, load_chroma_db
+
+BENCHMARK_QUERIES = [
+    "What are the candidate's main skills?",
+    "Tell me about machine learning projects",
+    "What work experience do you have at Baidu?",
+    "What deep learning frameworks have you used?",
+    "机器学习相关的内容",
+    "深度学习的应用",
+]
+
+M_VALUES = (8, 16, 32)
+EF_CONSTRUCTION_VALUES = (100, 200)
+EF_SEARCH_VALUES = (10, 20, 40, 80, 160, 320)
+
+
+def latency_ms(store, query_vectors, top_k):
+    """Median milliseconds of a single-query search."""
+    timings = []
+    for vector in query_vectors:
+        start = time.perf_counter()
+        store.search_by_vectors([vector], top_k)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def recall(store, query_vectors, exact_indices, top_k):
+    """Mean fraction of the exact top-k also returned by the store."""
+    indices, _ = store.search_by_vectors(query_vectors, top_k)
+    return float(np.mean([
+        len(set(found.tolist()) & set(expected.tolist())) / len(expected)
+        for found, expected in zip(indices, exact_indices)
+    ]))
+
+
+def sweep(name, vectors, query_vectors, top_k):
+    """Print one row per (M, ef_construction, ef_search) for a corpus."""
+    documents = [f"{name} chunk {i}" for i in range(len(vectors))]
+    exact = FlatNumpyStore(vectors, documents)
+    exact_indices, _ = exact.search_by_vectors(query_vectors, top_k)
+    print(f"{name:>12} | {len(documents):>8} | {'exact':>5} | {'':>7} | {'':>6} | {'':>8} | "
+          f"{exact.nbytes() / 1e6:>10.2f} | {1.0:>9.3f} | {latency_ms(exact, query_vectors, top_k):>8.3f}")
+
+    for M in M_VALUES:
+        for ef_construction in EF_CONSTRUCTION_VALUES:
+            start = time.perf_counter()
+            store = HnswStore(vectors, documents, M=M, ef_construction=ef_construction)
+            build_time = time.perf_counter() - start
+            for ef_search in EF_SEARCH_VALUES:
+                store.ef_search = ef_search
+                print(f"{name:>12} | {len(documents):>8} | {M:>5} | {ef_construction:>7} | {ef_search:>6} | "
+                      f"{build_time:>8.2f} | {store.nbytes() / 1e6:>10.2f} | "
+                      f"{recall(store, query_vectors, exact_indices, top_k):>9.3f} | "
+                      f"{latency_ms(store, query_vectors, top_k):>8.3f}")
+
+
+def run_benchmark(persist_directory="docs/chroma/", synthetic_size=100_000, top_k=5):
+    """Run the sweep and print the results."""
+    print(f"\n{'corpus':>12} | {'docs':>8} | {'M':>5} | {'ef_cons':>7} | {'ef':>6} | {'build(s)':>8} | "
+          f"{'memory(MB)':>10} | {'recall@' + str(top_k):>9} | {'ms/query':>8}")
+    print("-" * 100)
+
+    chroma = load_chroma_db(persist_directory, store_type="chroma")
+    vectors = np.asarray(chroma._collection.get(include=["embeddings"])["embeddings"], dtype=np.float32)
+    query_vectors = np.asarray(get_embedding_model().embed_documents(BENCHMARK_QUERIES), dtype=np.float32)
+    sweep("docs/chroma", vectors, query_vectors, top_k)
+
+    if synthetic_size:
+        vectors, queries, embeddings = synthetic_corpus(synthetic_size, vectors.shape[1])
+        sweep("synthetic", vectors, np.asarray(embeddings.embed_documents(queries), dtype=np.float32), top_k)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    persist_directory = args.pop(0) if args and not args[0].isdigit() else "docs/chroma/"
+    run_benchmark(persist_directory, int(args[0]) if args else 100_000)
@@ -0,0 +1,123 @@
+"""
+Quantized Storage Benchmark - 量化存储召回率评估
+以 float32 精确检索结果为标准答案，用 evaluate_retrieval 评估 float16 / int8（可选 float32 重排）
+FlatNumpyStore 的 recall@k，并报告内存、磁盘占用（及相对 float32 的比例；重排需要额外保存 float32 副本）和查询延迟
+语料：docs/chroma 中的真实向量，以及带聚类结构的合成向量
+
+用法: python benchmark_quantization.py [persist_directory] [synthetic size]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from flat_store import METADATA_FILE, FlatNumpyStore, normalize_rows
+from retreival import evaluate_retrieval, get_embedding_model, load_chroma_db
+
+BENCHMARK_QUERIES = [
+    "What are the candidate's main skills?",
+    "Tell me about machine learning projects",
+    "What work experience do you have at Baidu?",
+    "What deep learning frameworks have you used?",
+    "机器学习相关的内容",
+    "深度学习的应用",
+]
+
+CONFIGURATIONS = [("float32", 0), ("float16", 0), ("float16", 4), ("int8", 0), ("int8", 4)]
+
+
+class LookupEmbeddings:
+    """Embeddings that return precomputed vectors for known query strings."""
+
+    def __init__(self, vectors_by_text):
+        self.vectors_by_text = vectors_by_text
+
+    def embed_query(self, text):
+        return self.vectors_by_text[text]
+
+    def embed_documents(self, texts):
+        return [self.vectors_by_text[text] for text in texts]
+
+
+def directory_bytes(directory):
+    """Total size of the files in a directory."""
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def ground_truth(store, queries, top_k):
+    """Build evaluate_retrieval test queries whose relevant docs are the exact float32 top-k."""
+    results = store.similarity_search_by_vectors(store.embeddings.embed_documents(queries), top_k)
+    return [
+        {"query": query, "relevant_docs": [doc.metadata["id"] for doc in docs]}
+        for query, docs in zip(queries, results)
+    ]
+
+
+def report(name, vectors, documents, metadatas, embeddings, queries, top_k, tmp_root):
+    """Print recall@k, size and latency of every storage configuration for one corpus."""
+    exact = FlatNumpyStore(vectors, documents, metadatas=metadatas, embeddings=embeddings)
+    test_queries = ground_truth(exact, queries, top_k)
+    query_vectors = embeddings.embed_documents(queries)
+
+    float32_disk = None
+    for dtype, rescore in CONFIGURATIONS:
+        directory = os.path.join(tmp_root, f"{name}-{dtype}-{rescore}")
+        FlatNumpyStore(vectors, documents, metadatas=metadatas, dtype=dtype, rescore=rescore).save(directory)
+        store = FlatNumpyStore.load(directory, embeddings)
+        # Vector files only: the texts and metadata in metadata.json are the same for every configuration
+        disk = directory_bytes(directory) - os.path.getsize(os.path.join(directory, METADATA_FILE))
+        float32_disk = float32_disk or disk
+
+        results = evaluate_retrieval(test_queries, store, top_k=top_k)
+        recall = np.mean([result["recall"] for result in results])
+
+        start = time.perf_counter()
+        for vector in query_vectors:
+            store.search_by_vectors([vector], top_k)
+        latency = (time.perf_counter() - start) * 1000 / len(query_vectors)
+
+        print(f"{name:>12} | {len(documents):>8} | {dtype:>7} | {rescore:>7} | {store.nbytes() / 1e6:>10.2f} | "
+              f"{disk / 1e6:>13.2f} | {disk / float32_disk:>8.2f}x | {recall:>9.3f} | {latency:>8.3f}")
+
+
+def synthetic_corpus(n_docs, dim, n_queries=200, n_clusters=256, noise=0.6, seed=42):
+    """Clustered unit vectors, closer to real embedding distributions than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim))
+    vectors = normalize_rows(centers[rng.integers(0, n_clusters, n_docs)] + noise * rng.standard_normal((n_docs, dim)))
+    query_vectors = normalize_rows(
+        centers[rng.integers(0, n_clusters, n_queries)] + noise * rng.standard_normal((n_queries, dim))
+    )
+    queries = [f"synthetic query {i}" for i in range(n_queries)]
+    return vectors, queries, LookupEmbeddings(dict(zip(queries, query_vectors.tolist())))
+
+
+def run_benchmark(persist_directory="docs/chroma/", synthetic_size=100_000, top_k=5):
+    """Run the benchmark and print the results."""
+    tmp_root = tempfile.mkdtemp(prefix="quant-bench-")
+    print(f"\n{'corpus':>12} | {'docs':>8} | {'dtype':>7} | {'rescore':>7} | {'memory(MB)':>10} | "
+          f"{'vector disk(MB)':>13} | {'vs fp32':>9} | {'recall@' + str(top_k):>9} | {'ms/query':>8}")
+    print("-" * 114)
+    try:
+        chroma = load_chroma_db(persist_directory, store_type="chroma")
+        data = chroma._collection.get(include=["embeddings", "documents", "metadatas"])
+        report("docs/chroma", data["embeddings"], data["documents"], data["metadatas"],
+               get_embedding_model(), BENCHMARK_QUERIES, top_k, tmp_root)
+
+        if synthetic_size:
+            vectors, queries, embeddings = synthetic_corpus(synthetic_size, len(data["embeddings"][0]))
+            documents = [f"synthetic chunk {i}" for i in range(synthetic_size)]
+            metadatas = [{"id": i} for i in range(synthetic_size)]
+            report("synthetic", vectors, documents, metadatas, embeddings, queries, top_k, tmp_root)
+    finally:
+        shutil.rmtree(tmp_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    persist_directory = args.pop(0) if args and not args[0].isdigit() else "docs/chroma/"
+    run_benchmark(persist_directory, int(args[0]) if args else 100_000)
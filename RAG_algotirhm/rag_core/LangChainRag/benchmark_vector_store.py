@@ -0,0 +1,115 @@
+"""
+Vector Store Benchmark - 向量库基准测试
+对比 Chroma 与 FlatNumpyStore（内存 / mmap）在 docs/chroma 以及合成语料上的检索延迟和结果一致性
+查询向量预先计算，只测量向量库本身的开销
+
+用法: python benchmark_vector_store.py [persist_directory] [synthetic sizes ...]
+"""
+
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+from langchain.vectorstores import Chroma
+
+from flat_store import FlatNumpyStore, normalize_rows
+from retreival import get_embedding_model, load_chroma_db
+
+BENCHMARK_QUERIES = [
+    "What are the candidate's main skills?",
+    "Tell me about machine learning projects",
+    "What work experience do you have at Baidu?",
+    "What deep learning frameworks have you used?",
+    "机器学习相关的内容",
+    "深度学习的应用",
+]
+
+DEFAULT_SIZES = [1_000, 10_000]
+
+
+def time_per_query_ms(search, query_vectors, repeat):
+    """Average milliseconds per query for search(vector)."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for vector in query_vectors:
+            search(vector)
+    return (time.perf_counter() - start) * 1000 / (repeat * len(query_vectors))
+
+
+def overlap(results, reference):
+    """Mean fraction of reference documents also returned, per query."""
+    return np.mean([
+        len({doc.page_content for doc in a} & {doc.page_content for doc in b}) / max(len(b), 1)
+        for a, b in zip(results, reference)
+    ])
+
+
+def compare_stores(name, chroma, flat_dir, query_vectors, top_k, repeat):
+    """Print one row comparing Chroma with the in-memory and mmap-loaded flat store."""
+    in_memory = FlatNumpyStore.load(flat_dir, mmap=False)
+    mapped = FlatNumpyStore.load(flat_dir, mmap=True)
+    vectors = query_vectors.tolist()
+
+    chroma_ms = time_per_query_ms(lambda v: chroma.similarity_search_by_vector(v, k=top_k), vectors, repeat)
+    memory_ms = time_per_query_ms(lambda v: in_memory.similarity_search_by_vector(v, k=top_k), vectors, repeat)
+    mmap_ms = time_per_query_ms(lambda v: mapped.similarity_search_by_vector(v, k=top_k), vectors, repeat)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        batch_results = in_memory.similarity_search_by_vectors(vectors, k=top_k)
+    batch_ms = (time.perf_counter() - start) * 1000 / (repeat * len(vectors))
+
+    reference = [chroma.similarity_search_by_vector(v, k=top_k) for v in vectors]
+    print(f"{name:>14} | {len(in_memory):>8} | {chroma_ms:>10.3f} | {memory_ms:>10.3f} | {mmap_ms:>9.3f} | "
+          f"{batch_ms:>9.3f} | {overlap(batch_results, reference):>10.2%}")
+
+
+def synthetic_chroma(n_docs, dim, seed=42, batch_size=5000):
+    """Build an in-memory Chroma collection with random unit vectors."""
+    rng = np.random.default_rng(seed)
+    vectors = normalize_rows(rng.standard_normal((n_docs, dim)))
+    chroma = Chroma(collection_name=f"benchmark_{n_docs}", embedding_function=None)
+    for start in range(0, n_docs, batch_size):
+        end = min(start + batch_size, n_docs)
+        chroma._collection.add(
+            ids=[str(i) for i in range(start, end)],
+            embeddings=vectors[start:end].tolist(),
+            documents=[f"synthetic chunk {i}" for i in range(start, end)],
+            metadatas=[{"id": i} for i in range(start, end)],
+        )
+    return chroma
+
+
+def run_benchmark(persist_directory="docs/chroma/", sizes=DEFAULT_SIZES, top_k=5, repeat=20):
+    """Run the benchmark and print the results."""
+    embeddings = get_embedding_model()
+    query_vectors = np.array(embeddings.embed_documents(BENCHMARK_QUERIES), dtype=np.float32)
+    tmp_root = tempfile.mkdtemp(prefix="flat-bench-")
+
+    print(f"\n{'corpus':>14} | {'docs':>8} | {'chroma(ms)':>10} | {'flat(ms)':>10} | {'mmap(ms)':>9} | "
+          f"{'batch(ms)':>9} | {'overlap@' + str(top_k):>10}")
+    print("-" * 92)
+    try:
+        chroma = load_chroma_db(persist_directory, store_type="chroma")
+        flat_dir = f"{tmp_root}/docs"
+        FlatNumpyStore.from_chroma(chroma).save(flat_dir)
+        compare_stores("docs/chroma", chroma, flat_dir, query_vectors, top_k, repeat)
+
+        rng = np.random.default_rng(0)
+        for n_docs in sizes:
+            chroma = synthetic_chroma(n_docs, query_vectors.shape[1])
+            flat_dir = f"{tmp_root}/synthetic_{n_docs}"
+            FlatNumpyStore.from_chroma(chroma).save(flat_dir)
+            synthetic_queries = normalize_rows(rng.standard_normal(query_vectors.shape))
+            compare_stores("synthetic", chroma, flat_dir, synthetic_queries, top_k, max(1, repeat // 4))
+            chroma.delete_collection()
+    finally:
+        shutil.rmtree(tmp_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    persist_directory = args.pop(0) if args and not args[0].isdigit() else "docs/chroma/"
+    run_benchmark(persist_directory, [int(arg) for arg in args] or DEFAULT_SIZES)
@@ -7,9 +7,12 @@ Chatbot Module - 人性化对话接口
 from langchain.memory import ConversationBufferMemory
 from typing import List, Dict, Any, Optional
 import logging
+import threading
 
 # 导入 retrieval 和 generation 模块
-from retreival import load_chroma_db, retrieve_similar_documents
+from retreival import (DEFAULT_EMBEDDING_MODEL, get_store_metadatas, load_chroma_db, retrieve_diverse_documents,
+                       retrieve_similar_documents)
+from metadata_filter import QueryMetadataMatcher
 from generation import ResumeRAGGenerator
 
 # 设置日志
@@ -19,6 +22,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Retrieval Configuration
+RETRIEVAL_CONFIG = {
+    "mmr": False,  # 可选：用 MMR 去掉重叠 chunk 造成的近似重复结果；写入 prompt 的文档数仍为 context_docs
+    "fetch_k": 20,  # MMR 候选数量
+    "lambda_mult": 0.5,  # 1 只看相关度，0 只看多样性
+    "context_docs": 3,  # 写入 prompt 的文档数量
+    "metadata_filter": False,  # 查询中提到文件名或页码时只在对应 chunk 中检索，无结果时退回全量检索；默认关闭，与关键词检索一致
+    "filter_fields": ["source", "page"],  # 参与查询匹配的 metadata 字段
+    "embedding_model": DEFAULT_EMBEDDING_MODEL,  # 查询 embedding 模型，须与入库时一致
+    "embedding_backend": None,  # embedding 后端，None 时使用 EMBEDDING_BACKEND 环境变量
+    "store_type": None  # 向量库类型 chroma / flat / hnsw，None 时使用 VECTOR_STORE 环境变量
+}
+
 
 class ResumeChatbot:
     """
@@ -34,11 +50,15 @@ class ResumeChatbot:
             persist_directory (str): ChromaDB 存储目录
             config (dict): 可选配置
         """
-        # 初始化检索模块（直接加载 ChromaDB）
-        self.vectordb = load_chroma_db(persist_directory)
+        self.retrieval_config = {**RETRIEVAL_CONFIG, **(config.get("retrieval", {}) if config else {})}
+        
+        # 初始化检索模块，生成模块共用同一个向量库
+        self.vectordb = self.load_vector_store(persist_directory)
         
         # 初始化生成模块
-        self.generator = ResumeRAGGenerator(persist_directory, config)
+        self.generator = ResumeRAGGenerator(persist_directory, config, vectordb=self.vectordb)
+        # 查询元数据匹配器，首次检索时根据向量库中的 metadata 构建
+        self._metadata_matcher = None
         
         # 初始化对话记忆
         self.memory = ConversationBufferMemory(
@@ -49,12 +69,96 @@ class ResumeChatbot:
         
         # 对话历史（用于简单展示）
         self.conversation_history = []
+        # 读取记忆、生成、写回记忆须作为一个整体执行，并发请求的对话轮次才不会交错
+        self._chat_lock = threading.Lock()
         
         # 欢迎消息
         self.welcome_message = "Hello! How can I assist you today? Feel free to ask me anything about my background, experience, or skills!"
         
         logger.info("Chatbot initialized successfully")
     
+    def load_vector_store(self, persist_directory):
+        """
+        按检索配置中的 embedding 模型、后端和向量库类型加载向量库（来自进程级注册表）
+        
+        Args:
+            persist_directory (str): ChromaDB 存储目录
+            
+        Returns:
+            Chroma、FlatNumpyStore 或 HnswStore
+        """
+        return load_chroma_db(
+            persist_directory,
+            self.retrieval_config["embedding_model"],
+            self.retrieval_config["embedding_backend"],
+            self.retrieval_config["store_type"]
+        )
+    
+    def swap_vector_store(self, vectordb):
+        """
+        替换检索使用的向量库（索引热切换）
+        新的 metadata 匹配器在替换前构建好；已经开始的检索继续使用旧向量库完成
+        
+        Args:
+            vectordb: 新的向量库（Chroma、FlatNumpyStore 或 HnswStore）
+        """
+        matcher = None
+        if self.retrieval_config["metadata_filter"]:
+            matcher = QueryMetadataMatcher(get_store_metadatas(vectordb), self.retrieval_config["filter_fields"])
+        self._metadata_matcher = matcher
+        self.vectordb = vectordb
+        self.generator.vectordb = vectordb
+        logger.info("Vector store swapped")
+    
+    def _query_filter(self, query: str) -> Dict[str, List[Any]]:
+        """从查询中识别 metadata 过滤条件，未开启过滤时返回空字典"""
+        if not self.retrieval_config["metadata_filter"]:
+            return {}
+        if self._metadata_matcher is None:
+            self._metadata_matcher = QueryMetadataMatcher(
+                get_store_metadatas(self.vectordb), self.retrieval_config["filter_fields"]
+            )
+        where = self._metadata_matcher.match(query)
+        if where:
+            logger.debug(f"Metadata filter: {where}")
+        return where
+    
+    def retrieve(self, query: str, top_k: int = 5, where: Optional[Dict[str, Any]] = None,
+                 query_vector: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+        """
+        向量检索，结果转换为统一格式
+        开启 MMR 时在最相似的 fetch_k 个候选中选出相关且互不重复的 top_k 个
+        
+        Args:
+            query (str): 查询字符串
+            top_k (int): 检索文档数量
+            where (dict): metadata 过滤条件 {字段: 取值或取值列表}，默认从查询中识别
+            query_vector (list): 预先计算的查询向量（如微批处理的结果），为None时在检索时计算
+            
+        Returns:
+            文档列表，每个文档包含content、metadata、rank字段
+        """
+        # 索引热切换时，同一次检索始终使用同一个向量库
+        vectordb = self.vectordb
+        if where is None:
+            where = self._query_filter(query)
+        if self.retrieval_config["mmr"]:
+            retrieved_results = retrieve_diverse_documents(
+                query, vectordb, top_k,
+                fetch_k=self.retrieval_config["fetch_k"],
+                lambda_mult=self.retrieval_config["lambda_mult"],
+                where=where,
+                query_vector=query_vector
+            )
+        else:
+            retrieved_results = retrieve_similar_documents(
+                query, vectordb, top_k, where=where, query_vector=query_vector
+            )
+        return [
+            {'content': doc.page_content, 'metadata': doc.metadata, 'rank': i + 1}
+            for i, doc in enumerate(retrieved_results)
+        ]
+    
     def _build_prompt_with_history(self, question: str, retrieved_docs: List[Dict[str, Any]]) -> str:
         """
         构建包含对话历史的 prompt
@@ -83,7 +187,7 @@ class ResumeChatbot:
             context = "No specific background information found for this query."
         else:
             context_parts = []
-            for doc in retrieved_docs[:3]:  # 只使用前3个最相关的文档
+            for doc in retrieved_docs[:self.retrieval_config["context_docs"]]:  # 只使用最相关的几个文档
                 content = doc['content']
                 metadata = doc.get('metadata', {})
                 context_part = f"""
@@ -118,7 +222,8 @@ Current Question: {question}
     """
         return prompt
     
-    def chat(self, user_input: str, top_k: int = 5, stream: bool = False) -> Dict[str, Any]:
+    def chat(self, user_input: str, top_k: int = 5, stream: bool = False,
+             retrieved_docs: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
         """
         与用户对话（核心方法）
         调用 retrieval 模块检索，调用 generation 模块生成回答
@@ -127,44 +232,40 @@ Current Question: {question}
             user_input (str): 用户输入
             top_k (int): 检索文档数量
             stream (bool): 是否使用流式输出
+            retrieved_docs (list): 预先检索好的文档（如混合检索的结果，需包含content和metadata），
+                为None时使用向量检索
             
         Returns:
             包含回答和元数据的字典
         """
         try:
             # 1. 使用 retrieval 模块检索相关文档
-            retrieved_results = retrieve_similar_documents(user_input, self.vectordb, top_k)
+            if retrieved_docs is None:
+                retrieved_docs = self.retrieve(user_input, top_k)
             
-            # 将检索结果转换为统一格式
-            retrieved_docs = []
-            for i, doc in enumerate(retrieved_results):
-                retrieved_docs.append({
-                    'content': doc.page_content,
-                    'metadata': doc.metadata,
-                    'rank': i + 1
+            # 检索可以并发，读取记忆到写回记忆之间逐个请求执行
+            with self._chat_lock:
+                # 2. 构建带历史的 prompt
+                prompt = self._build_prompt_with_history(user_input, retrieved_docs)
+                
+                # 3. 使用 generation 模块生成回答
+                answer = self.generator.generate_response(prompt, stream)
+                
+                # 4. 保存到记忆中
+                self.memory.save_context(
+                    {"input": user_input},
+                    {"answer": answer}
+                )
+                
+                # 5. 保存到对话历史
+                self.conversation_history.append({
+                    "role": "user",
+                    "content": user_input
+                })
+                self.conversation_history.append({
+                    "role": "assistant",
+                    "content": answer
                 })
-            
-            # 2. 构建带历史的 prompt
-            prompt = self._build_prompt_with_history(user_input, retrieved_docs)
-            
-            # 3. 使用 generation 模块生成回答
-            answer = self.generator.generate_response(prompt, stream)
-            
-            # 4. 保存到记忆中
-            self.memory.save_context(
-                {"input": user_input},
-                {"answer": answer}
-            )
-            
-            # 5. 保存到对话历史
-            self.conversation_history.append({
-                "role": "user",
-                "content": user_input
-            })
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": answer
-            })
             
             result = {
                 "answer": answer,
@@ -194,12 +295,14 @@ Current Question: {question}
     
     def get_conversation_history(self) -> List[Dict[str, str]]:
         """获取对话历史"""
-        return self.conversation_history
+        with self._chat_lock:
+            return list(self.conversation_history)
     
     def clear_history(self):
         """清除对话历史"""
-        self.memory.clear()
-        self.conversation_history = []
+        with self._chat_lock:
+            self.memory.clear()
+            self.conversation_history = []
         logger.info("Conversation history cleared")
     
     def get_memory_summary(self) -> str:
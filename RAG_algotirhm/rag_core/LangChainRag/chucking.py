@@ -1,8 +1,22 @@
 from langchain.document_loaders import PyPDFLoader
+from langchain.schema import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.embeddings import HuggingFaceEmbeddings
 from langchain.vectorstores import Chroma
+import hashlib
+import json
 import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from dedup import DEDUP_THRESHOLD, deduplicate_chunks
+from retreival import (DEFAULT_EMBEDDING_MODEL, EMBEDDING_BACKEND, INDEX_BUILD_PREFIX, INDEX_POINTER_FILE,
+                       INDEX_VERSIONS_DIR, MANIFEST_FILE, clear_registry, flat_store_directory, get_embedding_model,
+                       hnsw_store_directory)
+
+# Chunks per embedding forward pass and per Chroma insert
+EMBED_BATCH_SIZE = 64
 
 def load_pdf(file_path):
     """
@@ -18,17 +32,74 @@ def load_pdf(file_path):
     pages = loader.load()
     return pages
 
-def chunk_resume_documents(pages, chunk_size=1000, chunk_overlap=200):
+def load_xlsx(file_path):
+    """
+    Load every sheet of an Excel workbook, one Document per non-empty row.
+    
+    Each row is rendered as "column: value | column: value ..." so the column
+    names (type, company_organization, ...) are searchable alongside the values.
+    
+    Args:
+        file_path (str): Path to the .xlsx / .xls file.
+    
+    Returns:
+        list: List of Document objects with source, sheet and row metadata.
+    """
+    documents = []
+    for sheet_name, frame in pd.read_excel(file_path, sheet_name=None).items():
+        for row_index, row in frame.iterrows():
+            cells = [f"{column}: {value}" for column, value in row.items() if pd.notna(value) and str(value).strip()]
+            if cells:
+                documents.append(Document(
+                    page_content=" | ".join(cells),
+                    metadata={"source": file_path, "sheet": str(sheet_name), "row": int(row_index)},
+                ))
+    return documents
+
+# File extension -> loader returning a list of Document objects
+DOCUMENT_LOADERS = {".pdf": load_pdf, ".xlsx": load_xlsx, ".xls": load_xlsx}
+
+def load_document(file_path):
+    """
+    Load a PDF or Excel file with the loader registered for its extension.
+    
+    Args:
+        file_path (str): Path to the file.
+    
+    Returns:
+        list: List of Document objects.
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension not in DOCUMENT_LOADERS:
+        raise ValueError(f"Unsupported file type: {file_path}, expected one of {sorted(DOCUMENT_LOADERS)}")
+    return DOCUMENT_LOADERS[extension](file_path)
+
+def normalize_source(source):
+    """
+    Absolute form of a chunk source path, so the same file ingested from
+    another working directory or through a relative path keeps its chunk ids
+    and manifest entries. Empty sources are kept as they are.
+    """
+    return os.path.abspath(source) if source else source
+
+def chunk_resume_documents(pages, chunk_size=1000, chunk_overlap=200, dedup_threshold=DEDUP_THRESHOLD):
     """
     Chunk the resume documents using RecursiveCharacterTextSplitter.
     
+    Near-duplicate chunks (repeated boilerplate) are dropped with MinHash-LSH,
+    see dedup.deduplicate_chunks.
+    
     Args:
         pages (list): List of Document objects.
         chunk_size (int): Maximum size of each chunk.
         chunk_overlap (int): Overlap between chunks.
+        dedup_threshold (float): Jaccard similarity above which a chunk is a
+            duplicate of an earlier one; None keeps every chunk.
     
     Returns:
-        list: List of chunked Document objects.
+        list: List of chunked Document objects; metadata["source"] is an absolute
+            path (see normalize_source) and metadata["id"] is the chunk's vector
+            id (see chunk_ids).
     """
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
@@ -36,69 +107,407 @@ def chunk_resume_documents(pages, chunk_size=1000, chunk_overlap=200):
         separators=["\n\n", "\n", " ", ""],  # Prioritize paragraphs, then lines, etc.
     )
     chunks = text_splitter.split_documents(pages)
-    # 为每个chunk添加唯一id
-    for i, chunk in enumerate(chunks):
+    if dedup_threshold:
+        chunks = deduplicate_chunks(chunks, dedup_threshold)
+    # 为每个chunk添加唯一id：与向量id相同（来源+内容的哈希），插入或删除其他chunk时不会改变
+    for chunk in chunks:
         if not hasattr(chunk, "metadata") or chunk.metadata is None:
             chunk.metadata = {}
-        chunk.metadata["id"] = i
+        if chunk.metadata.get("source"):
+            chunk.metadata["source"] = normalize_source(chunk.metadata["source"])
+    for chunk, vector_id in zip(chunks, chunk_ids(chunks)):
+        chunk.metadata["id"] = vector_id
     return chunks
 
-def embed_chunks(chunks):
+def embed_chunks(chunks, model_name=DEFAULT_EMBEDDING_MODEL, backend=None, batch_size=EMBED_BATCH_SIZE):
     """
     Embed the chunks using Hugging Face's sentence-transformers model.
     
     Args:
         chunks (list): List of chunked Document objects.
+        model_name (str): Hugging Face sentence-transformers model name.
+        backend (str): Embedding backend ("huggingface", "onnx" or "onnx-int8");
+            defaults to the EMBEDDING_BACKEND environment variable.
+        batch_size (int): Number of chunks per embedding call.
     
     Returns:
-        list: List of embedding vectors.
+        numpy.ndarray: (num_chunks, dim) float32 embedding matrix.
     """
-    # Initialize Hugging Face embeddings
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    # Shared embedding model for the selected backend
+    embeddings = get_embedding_model(model_name, backend)
+    
+    # Fill one float32 matrix batch by batch instead of holding lists of Python floats
+    vectors = None
+    for start in range(0, len(chunks), batch_size):
+        batch = embeddings.embed_documents([chunk.page_content for chunk in chunks[start:start + batch_size]])
+        if vectors is None:
+            vectors = np.empty((len(chunks), len(batch[0])), dtype=np.float32)
+        vectors[start:start + len(batch)] = batch
+    return vectors if vectors is not None else np.empty((0, 0), dtype=np.float32)
+
+def chunk_ids(chunks):
+    """
+    Content-addressed vector ids for chunks.
+    
+    The id is a sha256 of the chunk's source and text, plus an occurrence counter
+    for identical chunks of the same source, so unchanged text keeps its id when
+    the document is re-ingested.
+    
+    Args:
+        chunks (list): List of chunked Document objects.
     
-    # Extract text content from chunks
-    texts = [chunk.page_content for chunk in chunks]
+    Returns:
+        list: One id per chunk.
+    """
+    ids, occurrences = [], {}
+    for chunk in chunks:
+        key = f"{chunk.metadata.get('source', '')}\0{chunk.page_content}"
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+        occurrence = occurrences.get(digest, 0)
+        occurrences[digest] = occurrence + 1
+        ids.append(f"{digest}-{occurrence}")
+    return ids
+
+def load_manifest(persist_directory):
+    """
+    Read the ingestion manifest of a ChromaDB directory.
+    
+    Args:
+        persist_directory (str): Directory of the ChromaDB database.
+    
+    Returns:
+        dict: {"model_name", "backend", "chunks": {vector id: {"source", "metadata"}}},
+            or None when there is no readable manifest.
+    """
+    path = os.path.join(persist_directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable ingestion manifest {path}: {e}")
+        return None
+
+def save_manifest(persist_directory, manifest):
+    """Write the ingestion manifest atomically."""
+    os.makedirs(persist_directory, exist_ok=True)
+    path = os.path.join(persist_directory, MANIFEST_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def remove_mirrored_stores(persist_directory="docs/chroma/"):
+    """
+    Remove the flat / HNSW stores mirrored from a ChromaDB; they are re-exported on next load.
+    
+    Args:
+        persist_directory (str): Directory of the ChromaDB database.
+    """
+    for mirror_directory in (flat_store_directory(persist_directory), hnsw_store_directory(persist_directory)):
+        if os.path.exists(mirror_directory):
+            shutil.rmtree(mirror_directory)
+    # Stores opened before the change no longer match the files on disk
+    clear_registry(persist_directory)
+
+def check_index_writable(persist_directory):
+    """
+    Refuse to write into an index that may be served.
+    
+    A persist directory with a CURRENT pointer, and the published versions
+    under it, are only changed by building a new version next to them
+    (index_versions.build_index_version); writing or deleting in place would
+    change the files a running server reads.
+    
+    Args:
+        persist_directory (str): Directory about to be written.
+    
+    Raises:
+        ValueError: If the directory is a versioned persist directory or one of its published versions.
+    """
+    directory = os.path.abspath(persist_directory)
+    versions_dir = os.path.dirname(directory)
+    published = (os.path.basename(versions_dir) == INDEX_VERSIONS_DIR
+                 and os.path.exists(os.path.join(os.path.dirname(versions_dir), INDEX_POINTER_FILE))
+                 and not os.path.basename(directory).startswith(INDEX_BUILD_PREFIX))
+    if published or os.path.exists(os.path.join(directory, INDEX_POINTER_FILE)):
+        raise ValueError(f"{persist_directory} is a served index; build a new version with "
+                         f"index_versions.build_index_version instead of writing to it")
+
+def reset_vector_store(persist_directory="docs/chroma/"):
+    """
+    Remove a persisted ChromaDB, its ingestion manifest and the stores mirrored from it.
+    
+    Args:
+        persist_directory (str): Directory of the ChromaDB database.
+    
+    Raises:
+        ValueError: If the directory is served (see check_index_writable).
+    """
+    check_index_writable(persist_directory)
+    if os.path.exists(persist_directory):
+        shutil.rmtree(persist_directory)
+    remove_mirrored_stores(persist_directory)
+
+def add_embedded_chunks(vectordb, chunks, vectors, ids=None, batch_size=EMBED_BATCH_SIZE):
+    """
+    Write chunks with precomputed vectors into a Chroma store without re-embedding them.
     
-    # Generate embeddings
-    vectors = embeddings.embed_documents(texts)
-    return vectors
+    Args:
+        vectordb (Chroma): Target ChromaDB vector store.
+        chunks (list): List of chunked Document objects.
+        vectors (array-like): One embedding vector per chunk.
+        ids (list): Vector ids; defaults to chunk_ids(chunks).
+        batch_size (int): Number of chunks per insert.
+    """
+    ids = ids if ids is not None else chunk_ids(chunks)
+    for start in range(0, len(chunks), batch_size):
+        batch = chunks[start:start + batch_size]
+        vectordb._collection.add(
+            ids=ids[start:start + len(batch)],
+            embeddings=np.asarray(vectors[start:start + len(batch)], dtype=np.float32).tolist(),
+            documents=[chunk.page_content for chunk in batch],
+            metadatas=[chunk.metadata for chunk in batch],
+        )
 
-def store_embeddings_in_chroma(chunks, embeddings, persist_directory="docs/chroma/"):
+def store_embeddings_in_chroma(chunks, embeddings, persist_directory="docs/chroma/",
+                               model_name=DEFAULT_EMBEDDING_MODEL, backend=None):
     """
     Store the embeddings and documents in ChromaDB.
     
+    The precomputed embeddings are written as they are; the embedding model is
+    only attached to the store for embedding queries. The ingestion manifest is
+    written as well, so later re-ingests can be incremental (see sync_chunks).
+    
     Args:
         chunks (list): List of chunked Document objects.
-        embeddings (list): List of embedding vectors.
+        embeddings (array-like): One embedding vector per chunk, from embed_chunks.
         persist_directory (str): Directory to persist the ChromaDB database.
+        model_name (str): Hugging Face sentence-transformers model name.
+        backend (str): Embedding backend, should match the one used for the embeddings.
+    
+    Raises:
+        ValueError: If the directory is served (see check_index_writable); write
+            through index_versions.build_index_version instead.
     """
-    # Remove old database files if any
-    if os.path.exists(persist_directory):
-        os.system(f"rm -rf {persist_directory}")
+    reset_vector_store(persist_directory)
     
     # Store in ChromaDB
-    vectordb = Chroma.from_documents(
-        documents=chunks,
-        embedding=HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2"),
-        persist_directory=persist_directory
+    vectordb = Chroma(
+        persist_directory=persist_directory,
+        embedding_function=get_embedding_model(model_name, backend)
+    )
+    ids = chunk_ids(chunks)
+    add_embedded_chunks(vectordb, chunks, embeddings, ids)
+    save_manifest(persist_directory, {
+        "model_name": model_name,
+        "backend": backend or EMBEDDING_BACKEND,
+        "chunks": {vector_id: {"source": chunk.metadata.get("source", ""), "metadata": chunk.metadata}
+                   for vector_id, chunk in zip(ids, chunks)},
+    })
+    print(f"Number of vectors stored: {vectordb._collection.count()}")
+    return vectordb
+
+def open_manifest(persist_directory, model_name=DEFAULT_EMBEDDING_MODEL, backend=None, incremental=True):
+    """
+    Load the ingestion manifest, starting from an empty store when it is missing
+    or was written for another embedding model.
+    
+    A directory that holds a store but no manifest (e.g. one written before
+    manifests existed) is not wiped implicitly: pass incremental=False to
+    rebuild it from scratch.
+    
+    Args:
+        persist_directory (str): Directory of the ChromaDB database.
+        model_name (str): Hugging Face sentence-transformers model name.
+        backend (str): Embedding backend; defaults to the EMBEDDING_BACKEND environment variable.
+        incremental (bool): Keep the stored vectors; False always starts from an empty store.
+    
+    Returns:
+        dict: The manifest (see load_manifest).
+    
+    Raises:
+        ValueError: If the directory is served (see check_index_writable), or
+            holds a store without a manifest and incremental is True.
+    """
+    check_index_writable(persist_directory)
+    backend = backend or EMBEDDING_BACKEND
+    manifest = load_manifest(persist_directory) if incremental else None
+    if incremental and manifest is None and os.path.isdir(persist_directory) and os.listdir(persist_directory):
+        raise ValueError(f"{persist_directory} holds a vector store without an ingestion manifest "
+                         f"({MANIFEST_FILE}); pass incremental=False to rebuild it from scratch")
+    if manifest is not None and (manifest.get("model_name"), manifest.get("backend")) != (model_name, backend):
+        # Vectors of another model cannot be mixed with new ones
+        print(f"{persist_directory} was built with {manifest.get('model_name')} ({manifest.get('backend')}), "
+              f"rebuilding it with {model_name} ({backend})")
+        manifest = None
+    if manifest is None:
+        reset_vector_store(persist_directory)
+        manifest = {"model_name": model_name, "backend": backend, "chunks": {}}
+    for entry in manifest["chunks"].values():
+        # Manifests written before sources were normalized may hold relative paths
+        entry["source"] = normalize_source(entry["source"])
+    return manifest
+
+def plan_sync(chunks, entries, sources):
+    """
+    Compare current chunks with the manifest entries.
+    
+    Args:
+        chunks (list): All current chunks of the given sources.
+        entries (dict): Manifest chunk entries, vector id -> {"source", "metadata"}.
+        sources (set): Sources whose vanished chunks should be deleted.
+    
+    Returns:
+        tuple: (current {vector id: chunk}, added ids, metadata-updated ids, deleted ids)
+    """
+    current = dict(zip(chunk_ids(chunks), chunks))
+    added = [vector_id for vector_id in current if vector_id not in entries]
+    updated = [vector_id for vector_id in current
+               if vector_id in entries and entries[vector_id]["metadata"] != current[vector_id].metadata]
+    deleted = [vector_id for vector_id, entry in entries.items()
+               if entry["source"] in sources and vector_id not in current]
+    return current, added, updated, deleted
+
+def record_chunks(entries, current, vector_ids):
+    """Record written chunks in the manifest entries."""
+    for vector_id in vector_ids:
+        chunk = current[vector_id]
+        entries[vector_id] = {"source": chunk.metadata.get("source", ""), "metadata": chunk.metadata}
+
+def apply_metadata_changes(vectordb, entries, current, updated, deleted, batch_size=EMBED_BATCH_SIZE):
+    """
+    Delete vanished vectors and rewrite moved metadata; neither needs the embedding model.
+    
+    Args:
+        vectordb (Chroma): Target ChromaDB vector store.
+        entries (dict): Manifest chunk entries, updated in place.
+        current (dict): Vector id -> current chunk.
+        updated (list): Ids whose metadata changed.
+        deleted (list): Ids to delete.
+        batch_size (int): Number of ids per write.
+    """
+    for start in range(0, len(deleted), batch_size):
+        vectordb._collection.delete(ids=deleted[start:start + batch_size])
+    for start in range(0, len(updated), batch_size):
+        batch_ids = updated[start:start + batch_size]
+        vectordb._collection.update(ids=batch_ids, metadatas=[current[vector_id].metadata for vector_id in batch_ids])
+    for vector_id in deleted:
+        del entries[vector_id]
+    record_chunks(entries, current, updated)
+
+def sync_chunks(chunks, persist_directory="docs/chroma/", model_name=DEFAULT_EMBEDDING_MODEL, backend=None,
+                sources=None, batch_size=EMBED_BATCH_SIZE, incremental=True):
+    """
+    Bring a ChromaDB in line with the given chunks, embedding only new or changed text.
+    
+    Chunks are matched to stored vectors by content-hash id (see chunk_ids):
+    - new ids are embedded batch by batch and inserted;
+    - known ids whose metadata moved (e.g. page or position) get a metadata-only update;
+    - stored ids of the given sources that no longer occur are deleted.
+    The store is rebuilt from scratch when it was built with another embedding model
+    or incremental is False.
+    
+    Args:
+        chunks (list): All current chunks of the sources being ingested.
+        persist_directory (str): Directory of the ChromaDB database.
+        model_name (str): Hugging Face sentence-transformers model name.
+        backend (str): Embedding backend; defaults to the EMBEDDING_BACKEND environment variable.
+        sources (set): Sources whose vanished chunks are deleted; defaults to the
+            sources of the given chunks. Chunks of other sources are left untouched.
+            Relative paths are resolved against the working directory.
+        batch_size (int): Number of chunks per embedding call and write.
+        incremental (bool): Reuse stored vectors; False rebuilds the store (see open_manifest).
+    
+    Returns:
+        tuple: (Chroma vector store, {"added", "updated", "deleted", "unchanged"} counts)
+    
+    Raises:
+        ValueError: If the directory is served (see check_index_writable); sync a
+            new version with index_versions.build_index_version instead. Also
+            when it holds a store without a manifest and incremental is True.
+    """
+    manifest = open_manifest(persist_directory, model_name, backend, incremental)
+    if sources is None:
+        sources = {chunk.metadata.get("source", "") for chunk in chunks}
+    sources = {normalize_source(source) for source in sources}
+    
+    embeddings = get_embedding_model(model_name, backend)
+    vectordb = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
+    entries = manifest["chunks"]
+    current, added, updated, deleted = plan_sync(chunks, entries, sources)
+    
+    apply_metadata_changes(vectordb, entries, current, updated, deleted, batch_size)
+    for start in range(0, len(added), batch_size):
+        batch_ids = added[start:start + batch_size]
+        batch = [current[vector_id] for vector_id in batch_ids]
+        vectors = embeddings.embed_documents([chunk.page_content for chunk in batch])
+        add_embedded_chunks(vectordb, batch, vectors, batch_ids, batch_size)
+    record_chunks(entries, current, added)
+    
+    save_manifest(persist_directory, manifest)
+    if added or updated or deleted:
+        remove_mirrored_stores(persist_directory)
+    
+    stats = {"added": len(added), "updated": len(updated), "deleted": len(deleted),
+             "unchanged": len(current) - len(added) - len(updated)}
+    return vectordb, stats
+
+def ingest_pdf(file_path, persist_directory="docs/chroma/", model_name=DEFAULT_EMBEDDING_MODEL, backend=None,
+               chunk_size=1000, chunk_overlap=200, batch_size=EMBED_BATCH_SIZE, incremental=True):
+    """
+    Single-pass ingestion: load, chunk, embed each new chunk once and publish a new index version.
+    
+    Chunks are embedded and inserted batch by batch, so only one batch of
+    vectors is held in memory at a time. With incremental=True only chunks
+    whose text changed since the last ingest are embedded. The new index is
+    built next to the served one and switched to atomically (see
+    index_versions.build_index_version).
+    
+    Args:
+        file_path (str): Path to the PDF file.
+        persist_directory (str): Directory to persist the ChromaDB database.
+        model_name (str): Hugging Face sentence-transformers model name.
+        backend (str): Embedding backend; defaults to the EMBEDDING_BACKEND environment variable.
+        chunk_size (int): Maximum size of each chunk.
+        chunk_overlap (int): Overlap between chunks.
+        batch_size (int): Number of chunks per embedding call and insert.
+        incremental (bool): Reuse stored vectors of unchanged chunks; False rebuilds from scratch.
+    
+    Returns:
+        Chroma: The vector store of the published version.
+    """
+    # index_versions imports this module
+    from index_versions import build_index_version
+    
+    chunks = chunk_resume_documents(load_pdf(file_path), chunk_size, chunk_overlap)
+    stats = {}
+    # PyPDFLoader records the path as the chunk source
+    version_directory = build_index_version(
+        persist_directory,
+        lambda directory: stats.update(
+            sync_chunks(chunks, directory, model_name, backend, {file_path}, batch_size)[1]),
+        model_name, backend, incremental
     )
+    vectordb = Chroma(persist_directory=version_directory,
+                      embedding_function=get_embedding_model(model_name, backend))
+    print(f"Ingested {file_path}: {stats['added']} added, {stats['updated']} updated, "
+          f"{stats['deleted']} deleted, {stats['unchanged']} unchanged")
     print(f"Number of vectors stored: {vectordb._collection.count()}")
     return vectordb
 
-# Example usage:
-pages = load_pdf("../data/Li_Rongcheng_Resume_MLE_Sep25.pdf")
-print(f"Number of pages: {len(pages)}")
-if pages:
-    chunks = chunk_resume_documents(pages)
-    print(f"Number of chunks: {len(chunks)}")
-    for i, chunk in enumerate(chunks[:5]):  # Print first 5 chunks as example
-        print(f"\n--- Chunk {i+1} ---\n")
-        print(chunk.page_content)
-    
-    # Generate embeddings for all chunks
-    embeddings = embed_chunks(chunks)
-    print(f"Generated {len(embeddings)} embeddings.")
-    
-    # Store embeddings in ChromaDB
-    persist_directory = "docs/chroma/"
-    vectordb = store_embeddings_in_chroma(chunks, embeddings, persist_directory)
\ No newline at end of file
+if __name__ == "__main__":
+    # Example usage:
+    pdf_path = "../data/Li_Rongcheng_Resume_MLE_Sep25.pdf"
+    pages = load_pdf(pdf_path)
+    print(f"Number of pages: {len(pages)}")
+    if pages:
+        chunks = chunk_resume_documents(pages)
+        print(f"Number of chunks: {len(chunks)}")
+        for i, chunk in enumerate(chunks[:5]):  # Print first 5 chunks as example
+            print(f"\n--- Chunk {i+1} ---\n")
+            print(chunk.page_content)
+        
+        # Embed only new or changed chunks into a new index version and switch to it
+        ingest_pdf(pdf_path, "docs/chroma/")
@@ -0,0 +1,178 @@
+"""
+Near-Duplicate Chunk Elimination - 基于 MinHash / LSH 的近似重复 chunk 去重
+简历中重复的模板文字（页眉页脚、联系方式、重复的技能描述）会产生大量近似重复的 chunk，
+它们挤占 top_k 名额并让 prompt 变长；入库前按 Jaccard 相似度去掉这些 chunk
+职责：字符 shingle、MinHash 签名、LSH 分桶找候选、精确 Jaccard 复核、合并重复 chunk 的 metadata
+"""
+
+import re
+import zlib
+
+import numpy as np
+
+# Chunks whose shingle sets have at least this Jaccard similarity are duplicates
+DEDUP_THRESHOLD = 0.8
+NUM_PERM = 128
+SHINGLE_SIZE = 5
+
+# Mersenne prime 2^31 - 1: a * x + b stays below 2^63 for 31-bit a, b and x
+_PRIME = (1 << 31) - 1
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """
+    Character shingles of whitespace-normalized, lower-cased text.
+
+    Character shingles work for English and CJK text alike; texts shorter
+    than size form a single shingle.
+
+    Args:
+        text (str): Chunk text.
+        size (int): Shingle length in characters.
+
+    Returns:
+        set: Distinct shingles.
+    """
+    text = re.sub(r"\s+", " ", text).strip().lower()
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def jaccard(a, b):
+    """Jaccard similarity of two sets."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def lsh_bands(num_perm, threshold):
+    """
+    Number of LSH bands for a similarity threshold.
+
+    Pairs with Jaccard s share a bucket with probability 1 - (1 - s^r)^b for
+    b bands of r rows; the curve is steepest near (1 / b)^(1 / r), so the
+    split whose midpoint is closest to the threshold is used.
+
+    Args:
+        num_perm (int): Signature length.
+        threshold (float): Target Jaccard threshold.
+
+    Returns:
+        int: Number of bands (a divisor of num_perm).
+    """
+    divisors = [b for b in range(1, num_perm + 1) if num_perm % b == 0]
+    return min(divisors, key=lambda b: abs((1 / b) ** (b / num_perm) - threshold))
+
+
+class MinHasher:
+    """MinHash signatures from a fixed family of universal hash functions."""
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        """
+        Args:
+            num_perm (int): Number of hash functions (signature length).
+            seed (int): Seed for the hash function coefficients.
+        """
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, _PRIME, size=num_perm, dtype=np.int64).astype(np.uint64)[:, None]
+        self.b = rng.randint(0, _PRIME, size=num_perm, dtype=np.int64).astype(np.uint64)[:, None]
+
+    def signature(self, shingle_set):
+        """
+        MinHash signature of a shingle set.
+
+        Args:
+            shingle_set (set): Shingles of one text.
+
+        Returns:
+            numpy.ndarray: (num_perm,) uint64 signature.
+        """
+        values = np.fromiter((zlib.crc32(s.encode("utf-8")) % _PRIME for s in shingle_set),
+                             dtype=np.uint64, count=len(shingle_set))
+        return ((self.a * values[None, :] + self.b) % _PRIME).min(axis=1)
+
+
+class MinHashLSH:
+    """Banded LSH index over MinHash signatures."""
+
+    def __init__(self, num_perm=NUM_PERM, threshold=DEDUP_THRESHOLD):
+        """
+        Args:
+            num_perm (int): Signature length.
+            threshold (float): Jaccard threshold the banding is tuned for.
+        """
+        self.bands = lsh_bands(num_perm, threshold)
+        self.rows = num_perm // self.bands
+        self.buckets = [{} for _ in range(self.bands)]
+
+    def _keys(self, signature):
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def query(self, signature):
+        """
+        Keys sharing at least one band with the signature.
+
+        Args:
+            signature (numpy.ndarray): MinHash signature.
+
+        Returns:
+            set: Candidate keys.
+        """
+        candidates = set()
+        for bucket, key in zip(self.buckets, self._keys(signature)):
+            candidates.update(bucket.get(key, ()))
+        return candidates
+
+    def insert(self, key, signature):
+        """
+        Add a signature under a key.
+
+        Args:
+            key (hashable): Item key.
+            signature (numpy.ndarray): MinHash signature.
+        """
+        for bucket, band_key in zip(self.buckets, self._keys(signature)):
+            bucket.setdefault(band_key, []).append(key)
+
+
+def deduplicate_chunks(chunks, threshold=DEDUP_THRESHOLD, num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE):
+    """
+    Drop chunks that are near-duplicates of an earlier chunk.
+
+    LSH candidates are confirmed with the exact Jaccard similarity of the
+    shingle sets, so banding false positives are never dropped. Each kept
+    chunk records how many duplicates were merged into it and the pages they
+    came from, so citations to those pages still resolve.
+
+    Args:
+        chunks (list): List of chunked Document objects, in document order.
+        threshold (float): Minimum Jaccard similarity for a duplicate.
+        num_perm (int): MinHash signature length.
+        shingle_size (int): Shingle length in characters.
+
+    Returns:
+        list: The kept chunks, in their original order.
+    """
+    hasher = MinHasher(num_perm)
+    lsh = MinHashLSH(num_perm, threshold)
+    kept, kept_shingles = [], []
+    for chunk in chunks:
+        chunk_shingles = shingles(chunk.page_content, shingle_size)
+        signature = hasher.signature(chunk_shingles)
+        original = next((i for i in sorted(lsh.query(signature))
+                         if jaccard(chunk_shingles, kept_shingles[i]) >= threshold), None)
+        if original is None:
+            lsh.insert(len(kept), signature)
+            kept.append(chunk)
+            kept_shingles.append(chunk_shingles)
+            continue
+
+        # Chroma metadata values must be scalars, so merged pages are a string
+        metadata = kept[original].metadata
+        metadata["duplicates"] = metadata.get("duplicates", 0) + 1
+        page = chunk.metadata.get("page")
+        if page is not None and page != metadata.get("page"):
+            pages = set(filter(None, str(metadata.get("duplicate_pages", "")).split(",")))
+            metadata["duplicate_pages"] = ",".join(sorted(pages | {str(page)}, key=lambda p: (len(p), p)))
+    return kept
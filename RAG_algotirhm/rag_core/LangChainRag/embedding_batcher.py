@@ -0,0 +1,206 @@
+"""
+Embedding Micro-Batcher - 跨请求查询向量微批处理
+并发请求的查询先进入 asyncio 队列，在很短的时间窗口内凑成一批后一次前向计算，再分别唤醒各请求
+职责：收集批次、在独立线程中调用 embedding 模型、记录批大小和排队等待时间的直方图
+"""
+
+import asyncio
+import bisect
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+from langchain.embeddings.base import Embeddings
+
+from embedding_cache import embed_query_batch
+
+logger = logging.getLogger(__name__)
+
+# 第一个查询到达后最多再等待的时间，以及每批最多的查询数
+BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "32"))
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+QUEUE_WAIT_BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 250)
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus style) with count and sum."""
+
+    def __init__(self, buckets: Sequence[float]):
+        """
+        Args:
+            buckets (Sequence[float]): Upper bounds of the buckets, ascending.
+        """
+        self.buckets = sorted(buckets)
+        # The extra slot counts observations above the largest bound
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """Record one observation."""
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self) -> Dict:
+        """
+        Returns:
+            dict: Cumulative counts per upper bound ("le_<bound>", "le_inf"), count, sum and mean.
+        """
+        with self._lock:
+            counts, count, total = list(self._counts), self.count, self.sum
+        buckets, cumulative = {}, 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            buckets[f"le_{bound:g}"] = cumulative
+        buckets["le_inf"] = count
+        return {"buckets": buckets, "count": count, "sum": total, "mean": total / count if count else 0.0}
+
+
+class EmbeddingMicroBatcher:
+    """
+    Gathers queries from concurrent requests and embeds them in one batched call.
+
+    The first query of a batch waits at most max_wait_ms for others to arrive;
+    the batch is dispatched earlier once it holds max_batch_size queries.
+    Queries that arrive while a batch is being embedded form the next batch
+    immediately. The model runs in a dedicated thread, so the event loop keeps
+    serving requests while a batch is computed.
+    """
+
+    def __init__(self, embeddings: Union[Embeddings, Callable[[], Embeddings]], max_wait_ms: float = BATCH_WAIT_MS,
+                 max_batch_size: int = BATCH_MAX_SIZE):
+        """
+        Args:
+            embeddings (Embeddings or callable): Query embedding model, or a function
+                returning the current one, called for every batch (e.g. the model of
+                the vector store being served, which changes on an index swap). A
+                CachedQueryEmbeddings is used through embed_queries, so cached
+                queries skip the forward pass.
+            max_wait_ms (float): Batching window after the first query of a batch.
+            max_batch_size (int): Maximum number of queries per forward pass.
+        """
+        self.embeddings = embeddings
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch_size = max(1, max_batch_size)
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_BUCKETS_MS)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding-batcher")
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def current_embeddings(self) -> Embeddings:
+        """The embedding model the next batch is computed with."""
+        if isinstance(self.embeddings, Embeddings) or not callable(self.embeddings):
+            return self.embeddings
+        return self.embeddings()
+
+    def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """Blocking batched embedding call, run on the batcher thread."""
+        return embed_query_batch(self.current_embeddings(), texts)
+
+    async def embed_query(self, text: str) -> List[float]:
+        """
+        Embed one query as part of the next batch.
+
+        Args:
+            text (str): Query text.
+
+        Returns:
+            list: The query vector.
+        """
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done():
+            # Queue and worker are bound to the loop of the first caller
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+        future = loop.create_future()
+        self._queue.put_nowait((text, future, time.perf_counter()))
+        return await future
+
+    async def _run(self):
+        """Collect batches from the queue and embed them one at a time."""
+        loop = asyncio.get_running_loop()
+        getter = None
+        while True:
+            if getter is None:
+                getter = asyncio.ensure_future(self._queue.get())
+            batch = [await getter]
+            getter = None
+
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                # asyncio.wait does not cancel the getter on timeout, so an item
+                # arriving at the deadline is kept for the next batch instead of lost
+                getter = asyncio.ensure_future(self._queue.get())
+                done, _ = await asyncio.wait({getter}, timeout=timeout)
+                if not done:
+                    break
+                batch.append(getter.result())
+                getter = None
+
+            await self._embed_batch(batch)
+
+    async def _embed_batch(self, batch):
+        """Embed one batch and resolve the waiting callers."""
+        dispatched = time.perf_counter()
+        self.batch_sizes.observe(len(batch))
+        for _, _, enqueued in batch:
+            self.queue_wait_ms.observe((dispatched - enqueued) * 1000)
+
+        texts = [text for text, _, _ in batch]
+        try:
+            vectors = await asyncio.get_running_loop().run_in_executor(self._executor, self._embed_texts, texts)
+        except Exception as e:
+            logger.error(f"Batched query embedding failed for {len(texts)} queries: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), vector in zip(batch, vectors):
+            # The caller may have been cancelled (e.g. client disconnected)
+            if not future.done():
+                future.set_result(vector)
+
+    def stats(self) -> Dict:
+        """
+        Returns:
+            dict: Batching settings plus batch-size and queue-wait (ms) histograms.
+        """
+        return {
+            "max_wait_ms": self.max_wait * 1000,
+            "max_batch_size": self.max_batch_size,
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+        }
+
+    async def close(self):
+        """Stop the worker and fail queries that were never dispatched."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        while self._queue is not None and not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Embedding batcher closed"))
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,274 @@
+"""
+Query Embedding Cache - 查询向量缓存
+在 embedding 模型前加一层 LRU 缓存，重复出现的问题不再重新计算向量
+职责：归一化查询文本、维护 LRU 缓存与命中统计、可选地持久化到本地文件
+"""
+
+import atexit
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(text: str, lowercase: bool = False) -> str:
+    """
+    Normalize a query before using it as a cache key.
+
+    Collapses whitespace, and lowercases the text only when the model's
+    tokenizer is uncased (see is_uncased), since case changes the embedding
+    of a cased model.
+
+    Args:
+        text (str): Raw query text.
+        lowercase (bool): Also lowercase the text.
+
+    Returns:
+        str: Normalized cache key.
+    """
+    text = " ".join(text.split())
+    return text.lower() if lowercase else text
+
+
+def is_uncased(embeddings: Embeddings) -> bool:
+    """
+    Whether an embedding model lowercases its input before tokenizing.
+
+    Looks at the tokenizer of OnnxEmbeddings or of the SentenceTransformer
+    behind HuggingFaceEmbeddings; models whose tokenizer cannot be found are
+    treated as cased.
+
+    Args:
+        embeddings (Embeddings): The embedding model.
+
+    Returns:
+        bool: True for uncased models such as all-MiniLM-L6-v2.
+    """
+    tokenizer = getattr(embeddings, "tokenizer", None)
+    if tokenizer is None:
+        tokenizer = getattr(getattr(embeddings, "client", None), "tokenizer", None)
+    if tokenizer is None:
+        return False
+    do_lower_case = getattr(tokenizer, "do_lower_case", None)
+    if do_lower_case is None:
+        do_lower_case = getattr(tokenizer, "init_kwargs", {}).get("do_lower_case", False)
+    return bool(do_lower_case)
+
+
+def embed_query_batch(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """
+    Embed a batch of queries through the model's query path.
+
+    Uses the model's batched embed_queries when it has one (OnnxEmbeddings,
+    CachedQueryEmbeddings) and otherwise calls embed_query per text, because
+    embed_documents may embed differently for asymmetric models (e.g. models
+    that prepend a query instruction).
+
+    Args:
+        embeddings (Embeddings): The embedding model.
+        texts (list): Query texts.
+
+    Returns:
+        list: One query vector per text, in input order.
+    """
+    embed_queries = getattr(embeddings, "embed_queries", None)
+    if embed_queries is not None:
+        return embed_queries(texts)
+    return [embeddings.embed_query(text) for text in texts]
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    LRU cache of normalized query -> embedding vector in front of an embedding model.
+
+    Only embed_query results are cached; embed_documents passes through, because
+    ingestion embeds each chunk once anyway. Vectors are kept as tuples and
+    every call returns a new list, so callers cannot modify cached entries.
+
+    Cached vectors always come from the wrapped model's query path. Batched
+    misses use embed_documents only after checking, on the first miss, that
+    it returns the same vector as embed_query for this model.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_size: int = 1024,
+                 persist_path: Optional[str] = None, persist_every: int = 32):
+        """
+        Args:
+            embeddings (Embeddings): The wrapped embedding model.
+            max_size (int): Maximum number of cached queries.
+            persist_path (str): Optional .npz file used to keep the cache warm across restarts.
+            persist_every (int): Save to persist_path after this many new entries.
+        """
+        self.embeddings = embeddings
+        self.model_name = getattr(embeddings, "model_name", type(embeddings).__name__)
+        self.lowercase = is_uncased(embeddings)
+        self.max_size = max_size
+        self.persist_path = persist_path
+        # Whether embed_documents matches embed_query for this model; checked on the first batched miss
+        self.symmetric: Optional[bool] = None
+        self.persist_every = persist_every
+
+        self.hits = 0
+        self.misses = 0
+        self._cache: "OrderedDict[str, Tuple[float, ...]]" = OrderedDict()
+        self._unsaved = 0
+        self._lock = threading.Lock()
+
+        if persist_path:
+            self._load()
+            atexit.register(self.save)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, returning the cached vector when the normalized query was seen before."""
+        key = normalize_query(text, self.lowercase)
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return list(vector)
+            self.misses += 1
+
+        vector = self.embeddings.embed_query(text)
+        self._store(key, vector)
+        return list(vector)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a batch of queries; cached ones are served from the cache and the
+        misses are embedded together in one batched call (see _embed_misses).
+        """
+        keys = [normalize_query(text, self.lowercase) for text in texts]
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._cache.get(key)
+                if vector is not None:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    vectors[i] = list(vector)
+                elif key in missing:
+                    # Duplicate within the batch: embedded once, counted as a hit
+                    self.hits += 1
+                    missing[key].append(i)
+                else:
+                    self.misses += 1
+                    missing[key] = [i]
+
+        if missing:
+            embedded = self._embed_misses([texts[positions[0]] for positions in missing.values()])
+            for (key, positions), vector in zip(missing.items(), embedded):
+                self._store(key, vector)
+                for i in positions:
+                    vectors[i] = list(vector)
+        return vectors
+
+    def _embed_misses(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed uncached queries with the wrapped model's query path.
+
+        Models without a batched embed_queries are batched through
+        embed_documents only if, for the first miss, it returned the same
+        vector as embed_query; asymmetric models embed one query at a time.
+        """
+        if hasattr(self.embeddings, "embed_queries"):
+            return embed_query_batch(self.embeddings, texts)
+        if self.symmetric is None:
+            first = self.embeddings.embed_query(texts[0])
+            self.symmetric = bool(np.allclose(first, self.embeddings.embed_documents(texts[:1])[0], atol=1e-5))
+            if not self.symmetric:
+                logger.info(f"{self.model_name} embeds queries differently from documents, "
+                            "embedding uncached queries one at a time")
+            rest = self._embed_misses(texts[1:]) if len(texts) > 1 else []
+            return [first] + rest
+        if self.symmetric:
+            return self.embeddings.embed_documents(texts)
+        return embed_query_batch(self.embeddings, texts)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents without caching."""
+        return self.embeddings.embed_documents(texts)
+
+    def _store(self, key: str, vector: List[float]):
+        """Insert a copy of a vector, evicting the least recently used entry when full."""
+        vector = tuple(vector)
+        with self._lock:
+            self._cache[key] = vector
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+            self._unsaved += 1
+            should_save = self.persist_path and self._unsaved >= self.persist_every
+        if should_save:
+            self.save()
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._cache),
+                "max_size": self.max_size,
+            }
+
+    def clear(self):
+        """Drop all cached vectors and reset the counters."""
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+            self._unsaved = 0
+
+    def save(self):
+        """Write the cache to persist_path atomically (no-op without a path)."""
+        if not self.persist_path:
+            return
+        with self._lock:
+            if not self._cache:
+                return
+            keys = np.array(list(self._cache.keys()))
+            vectors = np.array(list(self._cache.values()), dtype=np.float32)
+            self._unsaved = 0
+
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.persist_path)), exist_ok=True)
+            tmp_path = f"{self.persist_path}.tmp.npz"
+            np.savez(tmp_path, keys=keys, vectors=vectors, model_name=np.array(self.model_name),
+                     lowercase=np.array(self.lowercase))
+            os.replace(tmp_path, self.persist_path)
+        except OSError as e:
+            logger.warning(f"Failed to persist query embedding cache: {e}")
+
+    def _load(self):
+        """Warm the cache from persist_path if it was written for the same model."""
+        if not os.path.exists(self.persist_path):
+            return
+        try:
+            with np.load(self.persist_path) as data:
+                if str(data["model_name"]) != self.model_name:
+                    logger.info("Query embedding cache was built with another model, ignoring it")
+                    return
+                # Caches written before keys depended on the tokenizer lowercased every key
+                lowercase = bool(data["lowercase"]) if "lowercase" in data else True
+                if lowercase != self.lowercase:
+                    logger.info("Query embedding cache uses different key normalization, ignoring it")
+                    return
+                keys, vectors = data["keys"].tolist(), data["vectors"].tolist()
+        except Exception as e:
+            logger.warning(f"Failed to load query embedding cache: {e}")
+            return
+
+        # Entries were saved from least to most recently used
+        for key, vector in list(zip(keys, vectors))[-self.max_size:]:
+            self._cache[key] = tuple(vector)
+        logger.info(f"Loaded {len(self._cache)} cached query embeddings from {self.persist_path}")
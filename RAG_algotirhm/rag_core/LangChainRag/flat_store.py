@@ -0,0 +1,474 @@
+"""
+Flat NumPy Store - 进程内暴力检索向量库
+把归一化后的向量矩阵放在内存（或 mmap）中，一次矩阵-向量乘法加 argpartition 得到 top-k
+向量可以 float32 / float16 / 按维度缩放的 int8 存储，量化时可用磁盘上的 float32 向量对候选重排
+职责：从文档或现有 Chroma 库构建、以 .npy + 元数据 JSON 持久化、提供与 Chroma 相同的检索接口
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+from langchain.schema import Document
+
+from metadata_filter import MetadataBitmaps
+
+VECTORS_FILE = "vectors.npy"
+SCALES_FILE = "scales.npy"
+FULL_VECTORS_FILE = "vectors_full.npy"
+METADATA_FILE = "metadata.json"
+
+STORAGE_DTYPES = ("float32", "float16", "int8")
+
+# Attempts to move a finished export into place while other processes publish the same store
+PUBLISH_ATTEMPTS = 3
+
+# Rows scored per block when the stored matrix has to be upcast to float32
+SCORE_BLOCK_ROWS = 8192
+
+
+def normalize_rows(vectors):
+    """
+    L2-normalize each row so the dot product equals cosine similarity.
+
+    Args:
+        vectors (array-like): (n, dim) vectors.
+
+    Returns:
+        np.ndarray: float32 normalized copy.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+def saved_source(directory):
+    """Source fingerprint recorded in a saved store's metadata.json, None when unreadable."""
+    try:
+        with open(os.path.join(directory, METADATA_FILE), encoding="utf-8") as f:
+            return json.load(f).get("source")
+    except (OSError, ValueError):
+        return None
+
+
+def publish_store_directory(tmp_dir, directory, source=None):
+    """
+    Move a fully written store directory into place, replacing any existing one.
+
+    The existing directory is first renamed aside, then the new one is renamed
+    in and the old one deleted, so a complete store is never deleted before its
+    replacement is in place. Several processes may export the same mirror at
+    once: when another one has already published a complete store with the
+    same source fingerprint, that store is kept and tmp_dir is discarded.
+
+    Args:
+        tmp_dir (str): Finished store directory, next to directory.
+        directory (str): Target directory.
+        source (str): Source fingerprint of the new store (see retreival.chroma_fingerprint).
+    """
+    old_dir = f"{directory}.old-{os.getpid()}-{threading.get_ident()}"
+    try:
+        for attempt in range(PUBLISH_ATTEMPTS):
+            try:
+                os.replace(directory, old_dir)
+            except FileNotFoundError:
+                pass
+            try:
+                os.replace(tmp_dir, directory)
+                return
+            except OSError:
+                # Another process renamed its store into place in between
+                if source is not None and saved_source(directory) == source:
+                    return
+                if attempt == PUBLISH_ATTEMPTS - 1:
+                    raise
+    finally:
+        shutil.rmtree(old_dir, ignore_errors=True)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def top_k_rows(scores, k):
+    """
+    Indices of the k highest scores in each row, sorted by descending score.
+
+    Args:
+        scores (np.ndarray): (num_queries, num_docs) score matrix.
+        k (int): Number of results per row.
+
+    Returns:
+        np.ndarray: (num_queries, min(k, num_docs)) column indices.
+    """
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    if k < scores.shape[1]:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def maximal_marginal_relevance(query_vector, candidate_vectors, k=4, lambda_mult=0.5):
+    """
+    Select k candidates by Maximal Marginal Relevance.
+
+    Each step picks the candidate maximizing
+    lambda_mult * sim(query, d) - (1 - lambda_mult) * max(sim(d, selected)).
+    The candidate-candidate similarity matrix is computed once, and the running
+    max similarity to the selected set is updated with one vector op per step.
+
+    Args:
+        query_vector (array-like): (dim,) query vector.
+        candidate_vectors (array-like): (n, dim) candidate vectors, typically the top fetch_k.
+        k (int): Number of candidates to select.
+        lambda_mult (float): 1 ranks by relevance only, 0 by diversity only.
+
+    Returns:
+        list: Selected candidate positions, in selection order.
+    """
+    candidates = normalize_rows(candidate_vectors)
+    if len(candidates) == 0 or k <= 0:
+        return []
+    relevance = candidates @ normalize_rows(query_vector).reshape(-1)
+    similarity = candidates @ candidates.T
+
+    first = int(np.argmax(relevance))
+    selected = [first]
+    chosen = np.zeros(len(candidates), dtype=bool)
+    chosen[first] = True
+    max_similarity = similarity[first].copy()
+    while len(selected) < min(k, len(candidates)):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[chosen] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        chosen[best] = True
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+    return selected
+
+
+def quantize_vectors(vectors, dtype):
+    """
+    Convert normalized float32 vectors to the storage dtype.
+
+    int8 uses one scale per dimension (max |value| / 127), so each dimension
+    keeps its full 8-bit range.
+
+    Args:
+        vectors (np.ndarray): (n, dim) float32 vectors.
+        dtype (str): One of STORAGE_DTYPES.
+
+    Returns:
+        tuple: (stored vectors, per-dimension scales or None).
+    """
+    if dtype == "float32":
+        return vectors, None
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=0) / 127.0 if len(vectors) else np.ones(vectors.shape[1])
+        scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+        return np.clip(np.rint(vectors / scales), -127, 127).astype(np.int8), scales
+    raise ValueError(f"Unknown storage dtype: {dtype}, expected one of {STORAGE_DTYPES}")
+
+
+class FlatNumpyStore:
+    """
+    Cosine-similarity vector store backed by a single normalized matrix.
+
+    With dtype "float32" the search is exact. With "float16" or "int8" the matrix
+    takes 2x / 4x less memory and disk and ranking is approximate; when rescore > 0
+    the top k * rescore candidates are re-ranked with float32 vectors that are
+    kept in a separate file and only read for those rows. That file is a full
+    float32 copy, so a rescoring store takes more disk than a float32 one and
+    only saves the memory scanned per query.
+
+    Exposes the parts of the Chroma interface used by retreival.py
+    (similarity_search, similarity_search_with_score and embeddings). Search
+    methods take an optional {field: value or values} filter; only the rows
+    it selects are scored.
+    """
+
+    def __init__(self, vectors, documents, metadatas=None, ids=None, embeddings=None,
+                 dtype="float32", rescore=0):
+        """
+        Args:
+            vectors (array-like): (n, dim) document vectors, normalized on construction.
+            documents (list): Document texts, one per vector.
+            metadatas (list): Metadata dicts, one per vector.
+            ids (list): Document ids, one per vector.
+            embeddings (Embeddings): Model used to embed queries.
+            dtype (str): Storage dtype, one of STORAGE_DTYPES.
+            rescore (int): Candidate multiplier for float32 rescoring; 0 disables it.
+        """
+        vectors = normalize_rows(vectors)
+        vectors = vectors.reshape(len(documents), -1) if len(documents) else vectors.reshape(0, 0)
+        self.vectors, self.scales = quantize_vectors(vectors, dtype)
+        self.dtype = dtype
+        self.rescore = rescore if dtype != "float32" else 0
+        self.full_vectors = vectors if self.rescore else None
+        self.documents = list(documents)
+        self.metadatas = [metadata or {} for metadata in (metadatas or [None] * len(self.documents))]
+        self.ids = list(ids) if ids is not None else [str(i) for i in range(len(self.documents))]
+        self.embeddings = embeddings
+        # Fingerprint of the Chroma store this one was exported from (see retreival.chroma_fingerprint)
+        self.source = None
+        self._bitmaps = None
+
+    def __len__(self):
+        return len(self.documents)
+
+    @classmethod
+    def from_documents(cls, documents, embedding, **kwargs):
+        """
+        Build a store by embedding LangChain documents.
+
+        Args:
+            documents (list): Document objects.
+            embedding (Embeddings): Embedding model used for documents and queries.
+            **kwargs: dtype / rescore, passed to the constructor.
+
+        Returns:
+            FlatNumpyStore: The new store.
+        """
+        texts = [doc.page_content for doc in documents]
+        return cls(
+            embedding.embed_documents(texts),
+            texts,
+            metadatas=[doc.metadata for doc in documents],
+            embeddings=embedding,
+            **kwargs,
+        )
+
+    @classmethod
+    def from_chroma(cls, vectordb, embedding=None, **kwargs):
+        """
+        Copy the vectors, texts and metadata out of an existing Chroma store.
+
+        Args:
+            vectordb (Chroma): Source ChromaDB vector store.
+            embedding (Embeddings): Query embedding model; defaults to the Chroma store's.
+            **kwargs: dtype / rescore, passed to the constructor.
+
+        Returns:
+            FlatNumpyStore: The new store.
+        """
+        data = vectordb._collection.get(include=["embeddings", "documents", "metadatas"])
+        return cls(
+            data["embeddings"],
+            data["documents"],
+            metadatas=data["metadatas"],
+            ids=data["ids"],
+            embeddings=embedding or vectordb.embeddings,
+            **kwargs,
+        )
+
+    def save(self, directory):
+        """
+        Write vectors.npy and metadata.json, replacing any existing store (see publish_store_directory).
+
+        int8 stores also write scales.npy, and stores with rescoring enabled
+        write the float32 vectors to vectors_full.npy.
+
+        Args:
+            directory (str): Target directory.
+        """
+        parent = os.path.dirname(os.path.abspath(directory))
+        os.makedirs(parent, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=parent)
+        try:
+            np.save(os.path.join(tmp_dir, VECTORS_FILE), np.ascontiguousarray(self.vectors))
+            if self.scales is not None:
+                np.save(os.path.join(tmp_dir, SCALES_FILE), self.scales)
+            if self.full_vectors is not None:
+                np.save(os.path.join(tmp_dir, FULL_VECTORS_FILE), np.ascontiguousarray(self.full_vectors))
+            with open(os.path.join(tmp_dir, METADATA_FILE), "w", encoding="utf-8") as f:
+                json.dump({
+                    "dtype": self.dtype,
+                    "rescore": self.rescore,
+                    "ids": self.ids,
+                    "documents": self.documents,
+                    "metadatas": self.metadatas,
+                    "model_name": getattr(self.embeddings, "model_name", None),
+                    "source": self.source,
+                }, f, ensure_ascii=False)
+            publish_store_directory(tmp_dir, directory, self.source)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory, embedding=None, mmap=True, rescore=None):
+        """
+        Load a store written by save().
+
+        Args:
+            directory (str): Store directory.
+            embedding (Embeddings): Query embedding model.
+            mmap (bool): Memory-map vectors.npy instead of reading it into memory.
+            rescore (int): Override the saved rescoring multiplier; 0 disables rescoring.
+
+        Returns:
+            FlatNumpyStore: The loaded store.
+        """
+        mmap_mode = "r" if mmap else None
+        vectors = np.load(os.path.join(directory, VECTORS_FILE), mmap_mode=mmap_mode)
+        with open(os.path.join(directory, METADATA_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        # Rows were normalized before saving, so skip __init__ to keep the memory map
+        store = cls.__new__(cls)
+        store.vectors = vectors
+        store.dtype = meta.get("dtype", "float32")
+        scales_path = os.path.join(directory, SCALES_FILE)
+        store.scales = np.load(scales_path) if os.path.exists(scales_path) else None
+        full_path = os.path.join(directory, FULL_VECTORS_FILE)
+        # Full-precision rows are only read for rescoring candidates, so always map them
+        store.full_vectors = np.load(full_path, mmap_mode="r") if os.path.exists(full_path) else None
+        store.rescore = meta.get("rescore", 0) if rescore is None else rescore
+        if store.full_vectors is None:
+            store.rescore = 0
+        store.documents = meta["documents"]
+        store.metadatas = meta["metadatas"]
+        store.ids = meta["ids"]
+        store.embeddings = embedding
+        store.source = meta.get("source")
+        store._bitmaps = None
+        return store
+
+    def _score(self, queries, rows=None):
+        """
+        Approximate (or exact for float32) similarity of each query to the
+        stored vectors, or only to the given rows.
+        """
+        vectors = self.vectors if rows is None else self.vectors[rows]
+        if vectors.dtype == np.float32:
+            return queries @ vectors.T
+        if self.scales is not None:
+            # (q * s) . v8 == q . (v8 * s): fold the int8 scales into the query once
+            queries = queries * self.scales
+        scores = np.empty((len(queries), len(vectors)), dtype=np.float32)
+        for start in range(0, len(vectors), SCORE_BLOCK_ROWS):
+            block = np.asarray(vectors[start:start + SCORE_BLOCK_ROWS], dtype=np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        return scores
+
+    def filter_rows(self, filter):
+        """
+        Row indices matching a metadata filter.
+
+        Args:
+            filter (dict): Field to allowed value(s); fields are ANDed, values are ORed.
+
+        Returns:
+            numpy.ndarray: Ascending row indices.
+        """
+        if self._bitmaps is None:
+            # Built on first use; stores that are never filtered pay nothing
+            self._bitmaps = MetadataBitmaps(self.metadatas)
+        return np.flatnonzero(self._bitmaps.mask(filter))
+
+    def search_by_vectors(self, query_vectors, k=4, filter=None):
+        """
+        Top-k search for a batch of query vectors.
+
+        Args:
+            query_vectors (array-like): (num_queries, dim) query vectors.
+            k (int): Number of results per query.
+            filter (dict): Optional metadata filter; only matching rows are scored.
+
+        Returns:
+            tuple: (indices, scores) arrays of shape (num_queries, min(k, n)).
+        """
+        queries = normalize_rows(np.atleast_2d(query_vectors))
+        rows = self.filter_rows(filter) if filter else None
+        if len(self.documents) == 0 or (rows is not None and len(rows) == 0):
+            empty = np.empty((len(queries), 0))
+            return empty.astype(np.int64), empty
+        scores = self._score(queries, rows)
+        if not self.rescore:
+            indices = top_k_rows(scores, k)
+            scores = np.take_along_axis(scores, indices, axis=1)
+            return (indices if rows is None else rows[indices]), scores
+
+        candidates = top_k_rows(scores, k * self.rescore)
+        if rows is not None:
+            candidates = rows[candidates]
+        exact = np.einsum("qd,qcd->qc", queries, np.asarray(self.full_vectors[candidates], dtype=np.float32))
+        order = top_k_rows(exact, k)
+        return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(exact, order, axis=1)
+
+    def nbytes(self):
+        """Bytes of the matrix scanned per query (excluding the rescoring vectors)."""
+        return self.vectors.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def get_vectors(self, indices):
+        """
+        Float32 vectors of the given rows: the full-precision copy when kept,
+        otherwise the dequantized stored vectors.
+        """
+        if self.full_vectors is not None:
+            return np.asarray(self.full_vectors[indices], dtype=np.float32)
+        vectors = np.asarray(self.vectors[indices], dtype=np.float32)
+        return vectors * self.scales if self.scales is not None else vectors
+
+    def _to_documents(self, indices):
+        """Convert row indices to Document objects."""
+        return [Document(page_content=self.documents[i], metadata=self.metadatas[i]) for i in indices]
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None):
+        """Return the k documents most similar to a query vector."""
+        indices, _ = self.search_by_vectors([embedding], k, filter)
+        return self._to_documents(indices[0])
+
+    def similarity_search_by_vectors(self, embeddings, k=4, filter=None):
+        """Return the k most similar documents for each query vector."""
+        indices, _ = self.search_by_vectors(embeddings, k, filter)
+        return [self._to_documents(row) for row in indices]
+
+    def similarity_search_with_score(self, query, k=4, filter=None):
+        """
+        Return (document, cosine similarity) pairs for the k most similar documents.
+
+        Args:
+            query (str): Query text.
+            k (int): Number of results.
+            filter (dict): Optional metadata filter.
+
+        Returns:
+            list: (Document, float) tuples by descending similarity.
+        """
+        indices, scores = self.search_by_vectors([self.embeddings.embed_query(query)], k, filter)
+        return list(zip(self._to_documents(indices[0]), scores[0].tolist()))
+
+    def similarity_search(self, query, k=4, filter=None):
+        """Return the k documents most similar to the query text."""
+        return self.similarity_search_by_vector(self.embeddings.embed_query(query), k, filter)
+
+    def max_marginal_relevance_search_by_vector(self, embedding, k=4, fetch_k=20, lambda_mult=0.5, filter=None):
+        """
+        Return k diverse documents among the fetch_k most similar to a query vector.
+
+        Args:
+            embedding (list): Query vector.
+            k (int): Number of documents to return.
+            fetch_k (int): Number of nearest candidates to diversify.
+            lambda_mult (float): 1 ranks by relevance only, 0 by diversity only.
+            filter (dict): Optional metadata filter applied before candidate selection.
+
+        Returns:
+            list: Selected Document objects.
+        """
+        indices, _ = self.search_by_vectors([embedding], max(fetch_k, k), filter)
+        candidates = indices[0]
+        selected = maximal_marginal_relevance(embedding, self.get_vectors(candidates), k, lambda_mult)
+        return self._to_documents(candidates[selected])
+
+    def max_marginal_relevance_search(self, query, k=4, fetch_k=20, lambda_mult=0.5, filter=None):
+        """Return k diverse documents among the fetch_k most similar to the query text."""
+        return self.max_marginal_relevance_search_by_vector(
+            self.embeddings.embed_query(query), k, fetch_k, lambda_mult, filter
+        )
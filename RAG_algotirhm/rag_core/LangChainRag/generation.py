@@ -26,19 +26,20 @@ class ResumeRAGGenerator:
     负责从检索结果生成自然语言回答
     """
     
-    def __init__(self, persist_directory="docs/chroma/", config: Optional[Dict] = None):
+    def __init__(self, persist_directory="docs/chroma/", config: Optional[Dict] = None, vectordb=None):
         """
         Initialize the RAG Generator
         
         Args:
             persist_directory (str): Directory where the ChromaDB is stored.
             config (dict): Optional configuration overrides.
+            vectordb: Already loaded vector store; loaded from persist_directory when None.
         """
         self.model_config = {**MODEL_CONFIG, **(config.get("model", {}) if config else {})}
         self.persist_directory = persist_directory
         
         # Load ChromaDB using retrieval module
-        self.vectordb = load_chroma_db(persist_directory)
+        self.vectordb = vectordb if vectordb is not None else load_chroma_db(persist_directory)
         
         # Initialize OpenAI client
         self.client = OpenAIClient(
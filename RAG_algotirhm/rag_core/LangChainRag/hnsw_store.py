@@ -0,0 +1,207 @@
+"""
+HNSW Store - hnswlib 近似最近邻向量库
+用 HNSW 图代替全量矩阵扫描，检索耗时随文档数亚线性增长，适合多份简历的大语料
+职责：以可配置的 M / ef_construction 构建索引、以 ef_search 控制召回与延迟、持久化到语料旁的目录
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+import hnswlib
+import numpy as np
+
+from flat_store import FlatNumpyStore, normalize_rows, publish_store_directory, top_k_rows
+
+INDEX_FILE = "index.bin"
+METADATA_FILE = "metadata.json"
+
+DEFAULT_M = 16
+DEFAULT_EF_CONSTRUCTION = 200
+DEFAULT_EF_SEARCH = 64
+
+# Filtered queries selecting at most this many rows are scored exactly: HNSW
+# traversal with a restrictive filter visits many rejected nodes and loses recall.
+EXACT_FILTER_MAX_ROWS = 20_000
+
+
+class HnswStore(FlatNumpyStore):
+    """
+    Cosine-similarity vector store backed by an hnswlib graph.
+
+    M and ef_construction fix the graph at build time (more links / a wider
+    build search give higher recall at the cost of memory and build time);
+    ef_search sets the search beam width per query and can be changed at
+    any time. Document, metadata filter and MMR handling are inherited from
+    FlatNumpyStore, only the exhaustive scan is replaced.
+    """
+
+    def __init__(self, vectors, documents, metadatas=None, ids=None, embeddings=None,
+                 M=DEFAULT_M, ef_construction=DEFAULT_EF_CONSTRUCTION, ef_search=DEFAULT_EF_SEARCH,
+                 num_threads=-1):
+        """
+        Args:
+            vectors (array-like): (n, dim) document vectors, normalized on construction.
+            documents (list): Document texts, one per vector.
+            metadatas (list): Metadata dicts, one per vector.
+            ids (list): Document ids, one per vector.
+            embeddings (Embeddings): Model used to embed queries.
+            M (int): Graph links per node.
+            ef_construction (int): Beam width while inserting nodes.
+            ef_search (int): Beam width while searching.
+            num_threads (int): Threads used to insert vectors; -1 uses all cores.
+        """
+        vectors = normalize_rows(vectors)
+        vectors = vectors.reshape(len(documents), -1) if len(documents) else vectors.reshape(0, 0)
+        self.documents = list(documents)
+        self.metadatas = [metadata or {} for metadata in (metadatas or [None] * len(self.documents))]
+        self.ids = list(ids) if ids is not None else [str(i) for i in range(len(self.documents))]
+        self.embeddings = embeddings
+        self.source = None
+        self.dtype = "float32"
+        self.rescore = 0
+        self.vectors = self.scales = self.full_vectors = None
+        self._bitmaps = None
+
+        self.M = M
+        self.ef_construction = ef_construction
+        self.dim = vectors.shape[1]
+        # Vectors are normalized, so inner-product distance (1 - dot) is cosine distance
+        self.index = hnswlib.Index(space="ip", dim=max(self.dim, 1))
+        self.index.init_index(max_elements=max(len(vectors), 1), ef_construction=ef_construction, M=M,
+                              random_seed=100)
+        if len(vectors):
+            self.index.add_items(vectors, np.arange(len(vectors)), num_threads=num_threads)
+        self.ef_search = ef_search
+
+    @property
+    def ef_search(self):
+        """Search beam width; higher values raise recall and latency."""
+        return self._ef_search
+
+    @ef_search.setter
+    def ef_search(self, value):
+        # Only set while loading or tuning, not while queries run
+        self._ef_search = value
+        self.index.set_ef(value)
+
+    def save(self, directory):
+        """
+        Write index.bin and metadata.json, replacing any existing store (see publish_store_directory).
+
+        Args:
+            directory (str): Target directory.
+        """
+        parent = os.path.dirname(os.path.abspath(directory))
+        os.makedirs(parent, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=parent)
+        try:
+            self.index.save_index(os.path.join(tmp_dir, INDEX_FILE))
+            with open(os.path.join(tmp_dir, METADATA_FILE), "w", encoding="utf-8") as f:
+                json.dump({
+                    "M": self.M,
+                    "ef_construction": self.ef_construction,
+                    "ef_search": self.ef_search,
+                    "dim": self.dim,
+                    "ids": self.ids,
+                    "documents": self.documents,
+                    "metadatas": self.metadatas,
+                    "model_name": getattr(self.embeddings, "model_name", None),
+                    "source": self.source,
+                }, f, ensure_ascii=False)
+            publish_store_directory(tmp_dir, directory, self.source)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory, embedding=None, ef_search=None):
+        """
+        Load a store written by save().
+
+        Args:
+            directory (str): Store directory.
+            embedding (Embeddings): Query embedding model.
+            ef_search (int): Override the saved search beam width.
+
+        Returns:
+            HnswStore: The loaded store.
+        """
+        with open(os.path.join(directory, METADATA_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        store = cls.__new__(cls)
+        store.documents = meta["documents"]
+        store.metadatas = meta["metadatas"]
+        store.ids = meta["ids"]
+        store.embeddings = embedding
+        store.source = meta.get("source")
+        store.dtype = "float32"
+        store.rescore = 0
+        store.vectors = store.scales = store.full_vectors = None
+        store._bitmaps = None
+        store.M = meta["M"]
+        store.ef_construction = meta["ef_construction"]
+        store.dim = meta["dim"]
+        store.index = hnswlib.Index(space="ip", dim=max(store.dim, 1))
+        store.index.load_index(os.path.join(directory, INDEX_FILE), max_elements=max(len(store.documents), 1))
+        store.ef_search = meta["ef_search"] if ef_search is None else ef_search
+        return store
+
+    def _exact_search(self, queries, rows, k):
+        """Exact top-k among the given rows."""
+        scores = queries @ self.get_vectors(rows).T
+        indices = top_k_rows(scores, k)
+        return rows[indices], np.take_along_axis(scores, indices, axis=1)
+
+    def search_by_vectors(self, query_vectors, k=4, filter=None):
+        """
+        Approximate top-k search for a batch of query vectors.
+
+        Args:
+            query_vectors (array-like): (num_queries, dim) query vectors.
+            k (int): Number of results per query.
+            filter (dict): Optional metadata filter. Small selections are scored
+                exactly, larger ones are searched in the graph skipping other rows.
+
+        Returns:
+            tuple: (indices, scores) arrays of shape (num_queries, min(k, n)).
+        """
+        queries = normalize_rows(np.atleast_2d(query_vectors)).astype(np.float32)
+        rows = self.filter_rows(filter) if filter else None
+        n = len(self.documents) if rows is None else len(rows)
+        if n == 0:
+            empty = np.empty((len(queries), 0))
+            return empty.astype(np.int64), empty
+        k = min(k, n)
+
+        allowed = None
+        if rows is not None:
+            if len(rows) <= EXACT_FILTER_MAX_ROWS:
+                return self._exact_search(queries, rows, k)
+            mask = np.zeros(len(self.documents), dtype=bool)
+            mask[rows] = True
+            allowed = lambda label: bool(mask[label])
+
+        # hnswlib searches with a beam of max(ef, k), so ef is never changed per query:
+        # the index is shared by concurrent requests
+        try:
+            if allowed is None:
+                labels, distances = self.index.knn_query(queries, k=k)
+            else:
+                # The filter argument needs hnswlib >= 0.7 (chatbot/requirements-optional.txt)
+                labels, distances = self.index.knn_query(queries, k=k, filter=allowed)
+        except RuntimeError:
+            # The graph search could not reach k allowed rows
+            return self._exact_search(queries, rows if rows is not None else np.arange(len(self.documents)), k)
+        return labels.astype(np.int64), (1 - distances).astype(np.float32)
+
+    def nbytes(self):
+        """Approximate index memory: float32 vectors plus level-0 links (upper levels are negligible)."""
+        return len(self.documents) * (self.dim * 4 + 2 * self.M * 4 + 8)
+
+    def get_vectors(self, indices):
+        """Float32 vectors of the given rows, read back from the index."""
+        indices = np.asarray(indices, dtype=np.int64)
+        if len(indices) == 0:
+            return np.empty((0, self.dim), dtype=np.float32)
+        return np.asarray(self.index.get_items(indices.tolist()), dtype=np.float32).reshape(len(indices), self.dim)
@@ -0,0 +1,265 @@
+"""
+Index Versions - 向量索引版本化构建与原子切换
+新索引在持久化目录内的临时目录中构建、校验，通过后改名为新版本并原子地改写 CURRENT 指针；
+正在服务的旧版本目录在切换过程中保持不变，运行中的服务可随后热切换（见 LangChainRAGAdapter.reload_index）
+职责：复制当前版本作为增量构建的起点、校验构建结果、发布版本、清理过期版本
+
+目录结构（persist_directory 内）:
+    CURRENT              当前版本名
+    versions/<version>/  每个版本的 ChromaDB 及入库清单，镜像的 flat / HNSW 库在其旁边
+    leases/<host>-<pid>  各服务进程正在读取的版本名，文件修改时间即心跳（见 retreival.renew_index_lease）
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+from langchain.vectorstores import Chroma
+
+from chucking import MANIFEST_FILE, load_manifest
+from retreival import (DEFAULT_EMBEDDING_MODEL, EMBEDDING_BACKEND, INDEX_BUILD_PREFIX, INDEX_LEASE_TIMEOUT,
+                       INDEX_LEASES_DIR, INDEX_POINTER_FILE, INDEX_VERSIONS_DIR, flat_store_directory,
+                       get_embedding_model, hnsw_store_directory, resolve_index_directory)
+
+# Versions kept on disk after a publish: the new one plus the previous one,
+# which requests that started before the swap may still be reading.
+KEEP_VERSIONS = 2
+# A superseded version is kept for this long after its successor was published,
+# so servers that have not polled CURRENT yet can still open it. Must exceed the
+# servers' reload interval (API_CONFIG["index_reload_interval"]).
+VERSION_GRACE_SECONDS = 600
+
+# Probe queries run against a new build before it is published
+VALIDATION_QUERIES = [
+    "What are the candidate's main skills?",
+    "Tell me about machine learning projects",
+]
+
+
+def current_version(persist_directory):
+    """
+    Name of the active version.
+
+    Args:
+        persist_directory (str): Directory of the ChromaDB database.
+
+    Returns:
+        str: Version name, or None for an unversioned directory.
+    """
+    directory = resolve_index_directory(persist_directory)
+    return None if directory == persist_directory else os.path.basename(directory)
+
+
+def list_versions(persist_directory):
+    """
+    Published versions, oldest first.
+
+    Args:
+        persist_directory (str): Directory of the ChromaDB database.
+
+    Returns:
+        list: Version names.
+    """
+    versions_dir = os.path.join(persist_directory, INDEX_VERSIONS_DIR)
+    if not os.path.isdir(versions_dir):
+        return []
+    mirrors = ("_flat", "_hnsw")
+    return sorted(name for name in os.listdir(versions_dir)
+                  if not name.startswith(INDEX_BUILD_PREFIX) and not name.endswith(mirrors)
+                  and os.path.isdir(os.path.join(versions_dir, name)))
+
+
+def validate_index(directory, model_name=DEFAULT_EMBEDDING_MODEL, backend=None, queries=VALIDATION_QUERIES):
+    """
+    Check that a built index can be served.
+
+    The ingestion manifest must belong to the serving embedding model and
+    list exactly the stored vectors, and every probe query must return results.
+
+    Args:
+        directory (str): Chroma directory of the build.
+        model_name (str): Embedding model the server embeds queries with.
+        backend (str): Embedding backend; defaults to the EMBEDDING_BACKEND environment variable.
+        queries (list): Probe queries.
+
+    Returns:
+        int: Number of stored vectors.
+
+    Raises:
+        ValueError: If the build is empty, inconsistent or was embedded with another model.
+    """
+    backend = backend or EMBEDDING_BACKEND
+    manifest = load_manifest(directory)
+    if manifest is None:
+        raise ValueError(f"No ingestion manifest ({MANIFEST_FILE}) in {directory}")
+    if (manifest.get("model_name"), manifest.get("backend")) != (model_name, backend):
+        raise ValueError(f"Index was embedded with {manifest.get('backend')}:{manifest.get('model_name')}, "
+                         f"expected {backend}:{model_name}")
+
+    embeddings = get_embedding_model(model_name, backend)
+    vectordb = Chroma(persist_directory=directory, embedding_function=embeddings)
+    count = vectordb._collection.count()
+    if count == 0:
+        raise ValueError(f"Index in {directory} is empty")
+    if count != len(manifest["chunks"]):
+        raise ValueError(f"Index in {directory} stores {count} vectors but its manifest lists "
+                         f"{len(manifest['chunks'])}")
+    for query, vector in zip(queries, embeddings.embed_documents(list(queries))):
+        if not vectordb.similarity_search_by_vector(vector, k=1):
+            raise ValueError(f"Probe query returned no results: {query}")
+    return count
+
+
+def publish_version(persist_directory, build_directory):
+    """
+    Move a validated build into versions/ and point CURRENT at it.
+
+    Both steps are renames within the persist directory, so readers see
+    either the old version or the complete new one.
+
+    Args:
+        persist_directory (str): Directory of the ChromaDB database.
+        build_directory (str): Temporary build directory inside versions/.
+
+    Returns:
+        str: The new version directory.
+    """
+    # Time-ordered names down to the nanosecond, so sorting versions gives their publish order
+    now = time.time_ns()
+    version = f"{time.strftime('%Y%m%dT%H%M%S', time.localtime(now // 10**9))}.{now % 10**9:09d}"
+    version_directory = os.path.join(persist_directory, INDEX_VERSIONS_DIR, version)
+    os.rename(build_directory, version_directory)
+
+    pointer = os.path.join(persist_directory, INDEX_POINTER_FILE)
+    tmp_pointer = f"{pointer}.tmp"
+    with open(tmp_pointer, "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_pointer, pointer)
+    return version_directory
+
+
+def version_published_at(version):
+    """
+    Publish time of a version, from its name (see publish_version).
+
+    Args:
+        version (str): Version name.
+
+    Returns:
+        float: Seconds since the epoch.
+    """
+    seconds, _, nanoseconds = version.partition(".")
+    return time.mktime(time.strptime(seconds, "%Y%m%dT%H%M%S")) + int(nanoseconds or 0) / 10**9
+
+
+def leased_versions(persist_directory, timeout=INDEX_LEASE_TIMEOUT):
+    """
+    Versions that serving processes reported reading within the lease timeout.
+
+    Args:
+        persist_directory (str): Directory of the ChromaDB database.
+        timeout (float): Seconds after which a lease that was not renewed expires.
+
+    Returns:
+        set: Version names.
+    """
+    leases_dir = os.path.join(persist_directory, INDEX_LEASES_DIR)
+    if not os.path.isdir(leases_dir):
+        return set()
+    now = time.time()
+    versions = set()
+    for name in os.listdir(leases_dir):
+        lease = os.path.join(leases_dir, name)
+        try:
+            if now - os.path.getmtime(lease) > timeout:
+                continue
+            with open(lease, encoding="utf-8") as f:
+                versions.add(f.read().strip())
+        except OSError:
+            # Lease removed or being replaced by its reader
+            continue
+    return versions
+
+
+def prune_versions(persist_directory, keep=KEEP_VERSIONS, grace=VERSION_GRACE_SECONDS,
+                   lease_timeout=INDEX_LEASE_TIMEOUT):
+    """
+    Delete all but the newest versions, together with their mirrored flat / HNSW stores.
+
+    A version older than the newest ones is still kept while a serving process
+    holds a fresh lease on it (see retreival.renew_index_lease), and for the
+    grace period after the version that replaced it was published, so servers
+    that have not switched yet never lose the directory they read.
+
+    Args:
+        persist_directory (str): Directory of the ChromaDB database.
+        keep (int): Number of newest versions to keep; the active version is always kept.
+        grace (float): Seconds a version is kept after its successor was published.
+        lease_timeout (float): Seconds after which a reader's lease expires.
+
+    Returns:
+        list: Deleted version names.
+    """
+    active = current_version(persist_directory)
+    versions = list_versions(persist_directory)
+    leased = leased_versions(persist_directory, lease_timeout)
+    now = time.time()
+    stale = [version for version, successor in zip(versions[:max(len(versions) - keep, 0)], versions[1:])
+             if version != active and version not in leased
+             and now - version_published_at(successor) >= grace]
+    for version in stale:
+        version_directory = os.path.join(persist_directory, INDEX_VERSIONS_DIR, version)
+        for directory in (version_directory, flat_store_directory(version_directory),
+                          hnsw_store_directory(version_directory)):
+            shutil.rmtree(directory, ignore_errors=True)
+    return stale
+
+
+def build_index_version(persist_directory, build, model_name=DEFAULT_EMBEDDING_MODEL, backend=None,
+                        incremental=True, keep=KEEP_VERSIONS):
+    """
+    Build a new index version next to the served one and switch to it atomically.
+
+    The build runs in a temporary directory inside versions/. With
+    incremental=True it starts from a copy of the active index, so the
+    ingestion manifest lets unchanged chunks keep their vectors. The result
+    is validated (see validate_index) and only then published; a failed build
+    or validation leaves the active version untouched.
+
+    Args:
+        persist_directory (str): Directory of the ChromaDB database.
+        build (callable): Called with the build directory; writes the index there,
+            e.g. lambda directory: ingest_directory("../data", directory).
+        model_name (str): Hugging Face sentence-transformers model name.
+        backend (str): Embedding backend; defaults to the EMBEDDING_BACKEND environment variable.
+        incremental (bool): Start from a copy of the active index instead of an empty one.
+        keep (int): Number of newest versions kept on disk; older ones are pruned
+            once they are neither leased nor within the grace period.
+
+    Returns:
+        str: The published version directory.
+    """
+    versions_dir = os.path.join(persist_directory, INDEX_VERSIONS_DIR)
+    os.makedirs(versions_dir, exist_ok=True)
+    build_directory = tempfile.mkdtemp(prefix=INDEX_BUILD_PREFIX, dir=versions_dir)
+    try:
+        active = resolve_index_directory(persist_directory)
+        if incremental and os.path.exists(os.path.join(active, MANIFEST_FILE)):
+            # An unversioned directory also holds the versions/ tree, the pointer and the leases
+            shutil.copytree(active, build_directory, dirs_exist_ok=True,
+                            ignore=shutil.ignore_patterns(INDEX_VERSIONS_DIR, INDEX_POINTER_FILE, INDEX_LEASES_DIR))
+        elif incremental and set(os.listdir(active)) - {INDEX_VERSIONS_DIR, INDEX_POINTER_FILE, INDEX_LEASES_DIR}:
+            print(f"{active} has no ingestion manifest ({MANIFEST_FILE}), building the new version from scratch")
+        build(build_directory)
+        count = validate_index(build_directory, model_name, backend)
+        version_directory = publish_version(persist_directory, build_directory)
+    finally:
+        shutil.rmtree(build_directory, ignore_errors=True)
+
+    print(f"Published index version {os.path.basename(version_directory)} with {count} vectors")
+    for version in prune_versions(persist_directory, keep):
+        print(f"Removed index version {version}")
+    return version_directory
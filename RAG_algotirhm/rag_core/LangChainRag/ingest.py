@@ -0,0 +1,200 @@
+"""
+Directory Ingestion - 目录批量入库
+用进程池并行解析、切分目录下的 PDF / Excel 文件，切分结果流式送入批量 embedding 阶段并写入 ChromaDB
+职责：发现文件、多进程解析与切分、跨文件凑批计算向量、按内容哈希增量写入、统计各阶段吞吐
+
+命令行入库在新的索引版本中进行，校验通过后原子切换（见 index_versions.py），不影响正在服务的索引
+
+用法: python ingest.py <directory> [persist_directory] [workers]
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from langchain.vectorstores import Chroma
+
+from chucking import (DOCUMENT_LOADERS, EMBED_BATCH_SIZE, add_embedded_chunks, apply_metadata_changes,
+                      chunk_resume_documents, load_document, open_manifest, plan_sync, record_chunks,
+                      remove_mirrored_stores, save_manifest)
+from dedup import DEDUP_THRESHOLD
+from index_versions import build_index_version
+from retreival import DEFAULT_EMBEDDING_MODEL, get_embedding_model
+
+STAGES = ("parse", "embed", "write")
+
+
+def default_workers():
+    """One parse worker per core, leaving one core to the embedding stage."""
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+def find_documents(directory):
+    """
+    Supported files under a directory, recursively.
+
+    Args:
+        directory (str): Root directory.
+
+    Returns:
+        list: Sorted file paths.
+    """
+    paths = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            # "~$" files are Office lock files, not workbooks
+            if os.path.splitext(name)[1].lower() in DOCUMENT_LOADERS and not name.startswith("~$"):
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+
+def parse_file(file_path, chunk_size=1000, chunk_overlap=200, dedup_threshold=DEDUP_THRESHOLD):
+    """
+    Load and chunk one file; runs in a worker process.
+
+    Returns:
+        tuple: (file_path, chunks, seconds spent)
+    """
+    start = time.perf_counter()
+    chunks = chunk_resume_documents(load_document(file_path), chunk_size, chunk_overlap, dedup_threshold)
+    return file_path, chunks, time.perf_counter() - start
+
+
+def ingest_directory(directory, persist_directory="docs/chroma/", model_name=DEFAULT_EMBEDDING_MODEL, backend=None,
+                     workers=None, chunk_size=1000, chunk_overlap=200, batch_size=EMBED_BATCH_SIZE, prune=True,
+                     dedup_threshold=DEDUP_THRESHOLD, incremental=True):
+    """
+    Ingest every PDF / Excel file under a directory into ChromaDB.
+
+    Files are parsed and chunked in a process pool. As each file finishes,
+    its chunks are diffed against the ingestion manifest; new chunks join a
+    buffer shared across files, which is embedded and written in full
+    batches while the workers keep parsing.
+
+    Args:
+        directory (str): Directory to scan recursively.
+        persist_directory (str): Directory of the ChromaDB database.
+        model_name (str): Hugging Face sentence-transformers model name.
+        backend (str): Embedding backend; defaults to the EMBEDDING_BACKEND environment variable.
+        workers (int): Parse processes; defaults to one per core minus one.
+        chunk_size (int): Maximum size of each chunk.
+        chunk_overlap (int): Overlap between chunks.
+        batch_size (int): Chunks per embedding call and insert.
+        prune (bool): Delete the vectors of files that were removed from the directory.
+        dedup_threshold (float): Jaccard threshold for dropping near-duplicate chunks
+            within a file; None keeps every chunk.
+        incremental (bool): Reuse stored vectors; False rebuilds the store (see chucking.open_manifest).
+
+    Returns:
+        dict: Chunk counts, per-stage items and busy seconds, wall time and the
+            time the main process spent waiting for parse results.
+    """
+    wall_start = time.perf_counter()
+    # Chunk sources are absolute paths (see chucking.normalize_source)
+    directory = os.path.abspath(directory)
+    files = find_documents(directory)
+    manifest = open_manifest(persist_directory, model_name, backend, incremental)
+    entries = manifest["chunks"]
+    embeddings = get_embedding_model(model_name, backend)
+    vectordb = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
+
+    stats = {"files": len(files), "failed": 0, "chunks": 0, "added": 0, "updated": 0, "deleted": 0, "unchanged": 0,
+             "stages": {stage: {"items": 0, "seconds": 0.0} for stage in STAGES}, "parse_wait_seconds": 0.0}
+    stages = stats["stages"]
+    pending = {}
+
+    def flush(min_size):
+        """Embed and write buffered chunks in full batches (any remainder when min_size is 1)."""
+        while len(pending) >= min_size and pending:
+            batch_ids = list(pending)[:batch_size]
+            batch = {vector_id: pending.pop(vector_id) for vector_id in batch_ids}
+
+            start = time.perf_counter()
+            vectors = embeddings.embed_documents([chunk.page_content for chunk in batch.values()])
+            stages["embed"]["seconds"] += time.perf_counter() - start
+            stages["embed"]["items"] += len(batch)
+
+            start = time.perf_counter()
+            add_embedded_chunks(vectordb, list(batch.values()), vectors, batch_ids, batch_size)
+            stages["write"]["seconds"] += time.perf_counter() - start
+            stages["write"]["items"] += len(batch)
+            record_chunks(entries, batch, batch_ids)
+
+    with ProcessPoolExecutor(max_workers=workers or default_workers()) as executor:
+        futures = {executor.submit(parse_file, path, chunk_size, chunk_overlap, dedup_threshold): path
+                   for path in files}
+        waiting_since = time.perf_counter()
+        for future in as_completed(futures):
+            stats["parse_wait_seconds"] += time.perf_counter() - waiting_since
+            try:
+                path, chunks, seconds = future.result()
+            except Exception as e:
+                # Stored vectors of a file that fails to parse are kept as they are
+                print(f"Failed to parse {futures[future]}: {e}")
+                stats["failed"] += 1
+                waiting_since = time.perf_counter()
+                continue
+            stages["parse"]["seconds"] += seconds
+            stages["parse"]["items"] += len(chunks)
+            stats["chunks"] += len(chunks)
+
+            current, added, updated, deleted = plan_sync(chunks, entries, {path})
+            start = time.perf_counter()
+            apply_metadata_changes(vectordb, entries, current, updated, deleted, batch_size)
+            stages["write"]["seconds"] += time.perf_counter() - start
+            pending.update((vector_id, current[vector_id]) for vector_id in added)
+            stats["added"] += len(added)
+            stats["updated"] += len(updated)
+            stats["deleted"] += len(deleted)
+            stats["unchanged"] += len(current) - len(added) - len(updated)
+
+            flush(batch_size)
+            waiting_since = time.perf_counter()
+    flush(1)
+
+    if prune:
+        # os.walk joins paths onto the directory as given, so sources share this prefix
+        prefix = os.path.join(directory, "")
+        present = set(files)
+        vanished = [vector_id for vector_id, entry in entries.items()
+                    if entry["source"].startswith(prefix) and entry["source"] not in present]
+        apply_metadata_changes(vectordb, entries, {}, [], vanished, batch_size)
+        stats["deleted"] += len(vanished)
+
+    save_manifest(persist_directory, manifest)
+    if stats["added"] or stats["updated"] or stats["deleted"]:
+        remove_mirrored_stores(persist_directory)
+    stats["wall_seconds"] = time.perf_counter() - wall_start
+    return stats
+
+
+def print_report(stats, workers):
+    """Print chunk counts and per-stage throughput."""
+    print(f"\nFiles: {stats['files']} ({stats['failed']} failed), chunks: {stats['chunks']} "
+          f"({stats['added']} added, {stats['updated']} updated, {stats['deleted']} deleted, "
+          f"{stats['unchanged']} unchanged)")
+    print(f"\n{'stage':>6} | {'chunks':>8} | {'busy(s)':>8} | {'chunks/s':>9}")
+    print("-" * 42)
+    for stage in STAGES:
+        items, seconds = stats["stages"][stage]["items"], stats["stages"][stage]["seconds"]
+        print(f"{stage:>6} | {items:>8} | {seconds:>8.2f} | {items / seconds if seconds else 0:>9.1f}")
+    wall = stats["wall_seconds"]
+    print(f"\nWall time: {wall:.2f}s, overall {stats['chunks'] / wall if wall else 0:.1f} chunks/s")
+    # Parse busy time is summed over workers, so the row above is a per-worker rate
+    parse = stats["stages"]["parse"]
+    capacity = parse["items"] / parse["seconds"] * workers if parse["seconds"] else 0
+    print(f"Parse capacity with {workers} workers: {capacity:.1f} chunks/s, "
+          f"main process waited {stats['parse_wait_seconds']:.2f}s for parse results")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    args = sys.argv[1:]
+    workers = int(args[2]) if len(args) > 2 else default_workers()
+    stats = {}
+    build_index_version(args[1] if len(args) > 1 else "docs/chroma/",
+                        lambda directory: stats.update(ingest_directory(args[0], directory, workers=workers)))
+    print_report(stats, workers)
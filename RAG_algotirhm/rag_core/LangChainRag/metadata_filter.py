@@ -0,0 +1,196 @@
+"""
+Metadata Filter Module - 元数据预过滤
+为向量库的 metadata 字段建立位图，检索前把候选缩小到满足条件的 chunk
+职责：位图构建与组合、过滤条件转换为 Chroma where 语法、从查询中识别 source / page 等过滤条件
+"""
+
+import os
+import re
+
+import numpy as np
+
+DEFAULT_FILTER_FIELDS = ("source", "page")
+
+# 查询中的页码写法，页码从 1 开始，PyPDFLoader 的 page 从 0 开始
+PAGE_PATTERN = re.compile(r"\bpage\s*(\d+)\b|第\s*(\d+)\s*页", re.IGNORECASE)
+# 文件名中长度不足的词（如 "cv"、"v2"）不作为 source 的别名
+MIN_SOURCE_TOKEN_LENGTH = 3
+
+
+def _as_values(values):
+    """Normalize a single filter value or a collection of values to a list."""
+    return list(values) if isinstance(values, (list, tuple, set, frozenset)) else [values]
+
+
+def to_chroma_where(where):
+    """
+    Convert a {field: value or values} filter to Chroma's where syntax.
+
+    Args:
+        where (dict): Field to allowed value(s); fields are ANDed, values are ORed.
+
+    Returns:
+        dict: Chroma where clause, or None for an empty filter.
+    """
+    clauses = [{field: {"$in": _as_values(values)}} for field, values in (where or {}).items()]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+class MetadataBitmaps:
+    """
+    Packed bitmaps of the rows holding each metadata value.
+
+    Each bitmap takes n / 8 bytes, so fields with many distinct values
+    (e.g. page numbers across many documents) stay small, and combining
+    constraints is a handful of bitwise operations on uint8 arrays.
+    Rows can be added and cleared in place; the byte arrays grow by doubling.
+    Also used by the keyword retriever's MetadataIndex (chatbot/metadata_index.py).
+    """
+
+    def __init__(self, metadatas=(), fields=None):
+        """
+        Args:
+            metadatas (list): Metadata dict of every row; an empty dict for rows without metadata.
+            fields (iterable): Fields to index; defaults to every scalar field.
+        """
+        self.size = len(metadatas)
+        self.fields = set(fields) if fields is not None else None
+        rows_by_value = {}
+        for row, metadata in enumerate(metadatas):
+            for field, value in self._indexed_items(metadata):
+                rows_by_value.setdefault(field, {}).setdefault(value, []).append(row)
+
+        self._capacity = (self.size + 7) // 8
+        self.bitmaps = {}
+        for field, values in rows_by_value.items():
+            self.bitmaps[field] = {}
+            for value, rows in values.items():
+                bitmap = np.zeros(self.size, dtype=bool)
+                bitmap[rows] = True
+                self.bitmaps[field][value] = np.packbits(bitmap)
+
+    def _indexed_items(self, metadata):
+        """(field, value) pairs of a metadata dict that get a bitmap."""
+        for field, value in (metadata or {}).items():
+            if (self.fields is None or field in self.fields) and isinstance(value, (str, int, float, bool)):
+                yield field, value
+
+    def _grow(self, size):
+        """Make room for size rows, doubling the byte arrays."""
+        nbytes = (size + 7) // 8
+        if nbytes > self._capacity:
+            self._capacity = max(nbytes, 2 * self._capacity, 8)
+            for values in self.bitmaps.values():
+                for value, bitmap in values.items():
+                    values[value] = np.concatenate((bitmap, np.zeros(self._capacity - len(bitmap), dtype=np.uint8)))
+        self.size = max(self.size, size)
+
+    def add(self, row, metadata):
+        """
+        Set a row's bits for its metadata values.
+
+        Args:
+            row (int): Row number; rows between the current size and it are empty.
+            metadata (dict): Metadata of the row.
+        """
+        self._grow(row + 1)
+        for field, value in self._indexed_items(metadata):
+            values = self.bitmaps.setdefault(field, {})
+            if value not in values:
+                values[value] = np.zeros(self._capacity, dtype=np.uint8)
+            # np.packbits stores the first row in the most significant bit
+            values[value][row >> 3] |= 0x80 >> (row & 7)
+
+    def delete(self, row):
+        """Clear a row's bits in every bitmap."""
+        for values in self.bitmaps.values():
+            for bitmap in values.values():
+                bitmap[row >> 3] &= ~np.uint8(0x80 >> (row & 7))
+
+    def values(self, field):
+        """Distinct values of an indexed field."""
+        return list(self.bitmaps.get(field, {}))
+
+    def mask(self, where):
+        """
+        Rows matching a filter.
+
+        Args:
+            where (dict): Field to allowed value(s); fields are ANDed, values are ORed.
+
+        Returns:
+            numpy.ndarray: Boolean mask of length size.
+        """
+        packed = np.full(self._capacity, 0xFF, dtype=np.uint8)
+        for field, values in where.items():
+            field_bits = np.zeros_like(packed)
+            for value in _as_values(values):
+                bitmap = self.bitmaps.get(field, {}).get(value)
+                if bitmap is not None:
+                    field_bits |= bitmap
+            packed &= field_bits
+        return np.unpackbits(packed, count=self.size).astype(bool)
+
+
+class QueryMetadataMatcher:
+    """
+    Derive a metadata filter from the query text.
+
+    - source: a query word that appears in exactly one source file name
+      (e.g. "michelin" in "Michelin_Report.pdf") selects that file.
+    - page: "page 2" / "第2页" selects the matching 0-based page.
+    - other string fields: the full value appearing in the query selects it.
+
+    Fields with fewer than two distinct values are skipped, since filtering
+    on them cannot narrow the candidates.
+    """
+
+    def __init__(self, metadatas, fields=DEFAULT_FILTER_FIELDS):
+        """
+        Args:
+            metadatas (list): Metadata dict of every row in the vector store.
+            fields (iterable): Fields that may be filtered on.
+        """
+        bitmaps = MetadataBitmaps(metadatas, fields)
+        self.values = {field: bitmaps.values(field) for field in fields if len(bitmaps.values(field)) > 1}
+
+        self.source_aliases = {}
+        if "source" in self.values:
+            owners = {}
+            for source in self.values["source"]:
+                stem = os.path.splitext(os.path.basename(str(source)))[0].lower()
+                for token in set(re.findall(r"[^\W_]+", stem)):
+                    if len(token) >= MIN_SOURCE_TOKEN_LENGTH and not token.isdigit():
+                        owners.setdefault(token, set()).add(source)
+            self.source_aliases = {token: next(iter(sources)) for token, sources in owners.items() if len(sources) == 1}
+
+        self.phrases = [
+            (re.compile(rf"(?<!\w){re.escape(value.lower())}(?!\w)"), field, value)
+            for field, values in self.values.items() if field not in ("source", "page")
+            for value in values if isinstance(value, str) and value.strip()
+        ]
+
+    def match(self, query):
+        """
+        Args:
+            query (str): Query text.
+
+        Returns:
+            dict: {field: [values]} filter, empty when the query names no value.
+        """
+        query_lower = query.lower()
+        where = {}
+        for word in set(re.findall(r"\w+", query_lower)):
+            if word in self.source_aliases:
+                where.setdefault("source", set()).add(self.source_aliases[word])
+        if "page" in self.values:
+            for match in PAGE_PATTERN.finditer(query_lower):
+                page = int(match.group(1) or match.group(2)) - 1
+                if page in self.values["page"]:
+                    where.setdefault("page", set()).add(page)
+        for pattern, field, value in self.phrases:
+            if pattern.search(query_lower):
+                where.setdefault(field, set()).add(value)
+        return {field: sorted(values) for field, values in where.items()}
@@ -0,0 +1,183 @@
+"""
+ONNX Embeddings - ONNX Runtime 推理后端
+把 sentence-transformers 模型导出为 ONNX，可选 int8 动态量化，在 CPU 上用 ONNX Runtime 推理
+职责：导出与缓存 ONNX 模型、分词、mean pooling 与归一化，输出与 HuggingFaceEmbeddings 一致的向量
+"""
+
+import logging
+import os
+import tempfile
+from typing import List
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ONNX_DIR = os.getenv(
+    "EMBEDDING_ONNX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+)
+
+
+def _temp_model_path(output_path):
+    """
+    Create an empty temporary file next to output_path.
+
+    Every process writes its own file and moves it into place with
+    os.replace, so workers exporting the same model at once do not clobber
+    each other's partial output.
+    """
+    directory = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".onnx", dir=directory)
+    os.close(fd)
+    return tmp_path
+
+
+def export_onnx_model(model_name, output_path, opset_version=14):
+    """
+    Export a Hugging Face transformer encoder to ONNX with dynamic batch and sequence axes.
+
+    Args:
+        model_name (str): Hugging Face model name.
+        output_path (str): Where to write the .onnx file.
+        opset_version (int): ONNX opset used for the export.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    tmp_path = _temp_model_path(output_path)
+    try:
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(sample[name] for name in input_names),
+                tmp_path,
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=opset_version,
+            )
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def quantize_onnx_model(input_path, output_path):
+    """
+    Apply int8 dynamic quantization to the weights of an ONNX model.
+
+    Args:
+        input_path (str): Float32 .onnx model.
+        output_path (str): Where to write the quantized model.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    tmp_path = _temp_model_path(output_path)
+    try:
+        quantize_dynamic(input_path, tmp_path, weight_type=QuantType.QInt8)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    sentence-transformers compatible embeddings computed with ONNX Runtime on CPU.
+
+    Reproduces the all-MiniLM-L6-v2 pipeline (transformer -> mean pooling -> L2
+    normalize), so vectors can be compared with those already stored in Chroma.
+    """
+
+    def __init__(self, model_name="sentence-transformers/all-MiniLM-L6-v2", quantize=False,
+                 model_dir=None, max_length=256, batch_size=32, num_threads=None):
+        """
+        Args:
+            model_name (str): Hugging Face sentence-transformers model name.
+            quantize (bool): Use the int8 dynamically quantized model.
+            model_dir (str): Directory for exported models; defaults to EMBEDDING_ONNX_DIR.
+            max_length (int): Maximum tokens per text, same as the model's max_seq_length.
+            batch_size (int): Number of texts per forward pass.
+            num_threads (int): ONNX Runtime intra-op threads; ONNX Runtime decides when None.
+        """
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.quantize = quantize
+        self.max_length = max_length
+        self.batch_size = batch_size
+
+        model_dir = os.path.join(model_dir or DEFAULT_ONNX_DIR, model_name.replace("/", "_"))
+        fp32_path = os.path.join(model_dir, "model.onnx")
+        model_path = os.path.join(model_dir, "model-int8.onnx") if quantize else fp32_path
+        if not os.path.exists(fp32_path):
+            logger.info(f"Exporting {model_name} to ONNX: {fp32_path}")
+            export_onnx_model(model_name, fp32_path)
+        if quantize and not os.path.exists(model_path):
+            logger.info(f"Quantizing ONNX model to int8: {model_path}")
+            quantize_onnx_model(fp32_path, model_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Run one forward pass and return L2-normalized mean-pooled vectors."""
+        encoded = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_length, return_tensors="np"
+        )
+        inputs = {name: encoded[name].astype(np.int64) for name in self.input_names}
+        token_embeddings = self.session.run(None, inputs)[0]
+
+        mask = encoded["attention_mask"][..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a list of texts.
+
+        Texts are grouped by length before batching so each batch pads to a
+        similar length, then results are returned in input order.
+        """
+        if not texts:
+            return []
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = np.empty((len(texts), 0), dtype=np.float32)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            embedded = self._embed_batch([texts[i] for i in batch])
+            if vectors.shape[1] == 0:
+                vectors = np.empty((len(texts), embedded.shape[1]), dtype=np.float32)
+            vectors[batch] = embedded
+        return vectors.tolist()
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a batch of queries.
+
+        Queries and documents go through the same pipeline (no query
+        instruction), so this is embed_documents; defined so batched callers
+        can use it in place of embed_query.
+        """
+        return self.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query."""
+        return self._embed_batch([text])[0].astype(np.float32).tolist()
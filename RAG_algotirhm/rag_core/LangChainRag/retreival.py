@@ -1,55 +1,529 @@
+import hashlib
+import os
+import socket
+import threading
 from langchain.vectorstores import Chroma
 from langchain.embeddings import HuggingFaceEmbeddings
+from langchain.schema import Document
 from sklearn.metrics import precision_score, recall_score, f1_score
 
-def load_chroma_db(persist_directory="docs/chroma/"):
+from embedding_cache import CachedQueryEmbeddings, embed_query_batch
+from flat_store import FlatNumpyStore, maximal_marginal_relevance
+from metadata_filter import to_chroma_where
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Embedding backend: "huggingface" (PyTorch sentence-transformers), "onnx"
+# (ONNX Runtime, float32) or "onnx-int8" (ONNX Runtime, int8 dynamic quantization).
+EMBEDDING_BACKENDS = ("huggingface", "onnx", "onnx-int8")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "huggingface")
+# The int8 backend changes the query vectors, and its latency / retrieval overlap
+# against the PyTorch vectors has not been measured on this corpus yet. Run
+# benchmark_embeddings.py first, then opt in with EMBEDDING_ALLOW_INT8=1.
+EMBEDDING_ALLOW_INT8 = os.getenv("EMBEDDING_ALLOW_INT8", "0") == "1"
+
+# Vector store: "chroma" (ChromaDB), "flat" (FlatNumpyStore, exact search over an
+# mmap-ed .npy matrix) or "hnsw" (HnswStore, approximate search over an hnswlib
+# graph). Flat and HNSW stores are exported from the Chroma store on first use and
+# re-exported whenever the Chroma store changes (see chroma_fingerprint).
+VECTOR_STORES = ("chroma", "flat", "hnsw")
+VECTOR_STORE = os.getenv("VECTOR_STORE", "chroma")
+# FlatNumpyStore storage dtype ("float32", "float16" or "int8") and the candidate
+# multiplier used to rescore quantized results with float32 vectors (0 disables it).
+# Rescoring keeps a full float32 copy next to the quantized matrix, so it costs
+# more disk than plain float32 (see benchmark_quantization.py); it is off by default.
+FLAT_STORE_DTYPE = os.getenv("VECTOR_STORE_DTYPE", "float32")
+FLAT_STORE_RESCORE = int(os.getenv("VECTOR_STORE_RESCORE", "0"))
+# HnswStore graph parameters (changing M or ef_construction rebuilds the index)
+# and the search beam width, which only affects queries.
+HNSW_M = int(os.getenv("VECTOR_STORE_HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("VECTOR_STORE_HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("VECTOR_STORE_HNSW_EF_SEARCH", "64"))
+# Maps content-hash vector ids to their source and metadata, stored inside the Chroma
+# directory; every writer in chucking.py rewrites it, so it also fingerprints the store.
+MANIFEST_FILE = "ingest_manifest.json"
+# Versioned index layout inside a persist directory: CURRENT names the active
+# build under versions/, so a rebuild never touches the directory being served.
+INDEX_POINTER_FILE = "CURRENT"
+INDEX_VERSIONS_DIR = "versions"
+# Prefix of the temporary directories new versions are built in
+INDEX_BUILD_PREFIX = ".tmp-"
+# Every serving process records the version it reads in leases/<host>-<pid> and
+# refreshes it periodically; a version with a lease younger than the timeout is never pruned.
+INDEX_LEASES_DIR = "leases"
+INDEX_LEASE_TIMEOUT = int(os.getenv("INDEX_LEASE_TIMEOUT", "600"))
+
+# Query embedding cache, configurable through the environment.
+# Set QUERY_EMBEDDING_CACHE_PATH to keep the cache warm across restarts.
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+QUERY_CACHE_PATH = os.getenv("QUERY_EMBEDDING_CACHE_PATH")
+
+# Process-wide registry: one embedding model per (backend, model name) and one
+# vector store per (store type, backend, model name, persist directory), shared by every caller.
+_registry_lock = threading.Lock()
+_embedding_models = {}
+_query_caches = {}
+_vector_stores = {}
+
+def create_embedding_model(model_name=DEFAULT_EMBEDDING_MODEL, backend=None, allow_int8=None):
+    """
+    Create a new embedding model for the given backend.
+
+    Args:
+        model_name (str): Hugging Face sentence-transformers model name.
+        backend (str): One of EMBEDDING_BACKENDS; defaults to EMBEDDING_BACKEND.
+        allow_int8 (bool): Allow the "onnx-int8" backend; defaults to EMBEDDING_ALLOW_INT8.
+
+    Returns:
+        Embeddings: HuggingFaceEmbeddings or OnnxEmbeddings.
+    """
+    backend = backend or EMBEDDING_BACKEND
+    if backend == "onnx-int8" and not (EMBEDDING_ALLOW_INT8 if allow_int8 is None else allow_int8):
+        raise ValueError("The onnx-int8 embedding backend is experimental: compare it with "
+                         "benchmark_embeddings.py, then set EMBEDDING_ALLOW_INT8=1 to use it")
+    if backend == "huggingface":
+        return HuggingFaceEmbeddings(model_name=model_name)
+    if backend in ("onnx", "onnx-int8"):
+        # onnxruntime is only needed when an ONNX backend is selected
+        from onnx_embeddings import OnnxEmbeddings
+        return OnnxEmbeddings(model_name=model_name, quantize=backend == "onnx-int8")
+    raise ValueError(f"Unknown embedding backend: {backend}, expected one of {EMBEDDING_BACKENDS}")
+
+def get_embedding_model(model_name=DEFAULT_EMBEDDING_MODEL, backend=None):
+    """
+    Return the shared embedding model for the given name and backend, loading it on first use.
+
+    Args:
+        model_name (str): Hugging Face sentence-transformers model name.
+        backend (str): One of EMBEDDING_BACKENDS; defaults to EMBEDDING_BACKEND.
+
+    Returns:
+        Embeddings: The shared embedding model.
+    """
+    key = (backend or EMBEDDING_BACKEND, model_name)
+    with _registry_lock:
+        if key not in _embedding_models:
+            _embedding_models[key] = create_embedding_model(model_name, key[0])
+        return _embedding_models[key]
+
+def get_query_embeddings(model_name=DEFAULT_EMBEDDING_MODEL, backend=None):
+    """
+    Return the shared query-embedding cache in front of the given model.
+
+    Args:
+        model_name (str): Hugging Face sentence-transformers model name.
+        backend (str): One of EMBEDDING_BACKENDS; defaults to EMBEDDING_BACKEND.
+
+    Returns:
+        CachedQueryEmbeddings: LRU-cached embeddings shared by all vector stores of this model.
+    """
+    key = (backend or EMBEDDING_BACKEND, model_name)
+    embeddings = get_embedding_model(model_name, key[0])
+    with _registry_lock:
+        if key not in _query_caches:
+            persist_path = None
+            if QUERY_CACHE_PATH:
+                # One file per backend and model so vectors from different models never mix
+                root, ext = os.path.splitext(QUERY_CACHE_PATH)
+                persist_path = f"{root}-{key[0]}-{model_name.replace('/', '_')}{ext or '.npz'}"
+            _query_caches[key] = CachedQueryEmbeddings(
+                embeddings, max_size=QUERY_CACHE_SIZE, persist_path=persist_path
+            )
+        return _query_caches[key]
+
+def get_query_cache_stats():
+    """
+    Return hit/miss statistics of every query-embedding cache.
+
+    Returns:
+        dict: Cache statistics keyed by "backend:model name".
+    """
+    with _registry_lock:
+        caches = dict(_query_caches)
+    return {f"{backend}:{model_name}": cache.stats() for (backend, model_name), cache in caches.items()}
+
+def resolve_index_directory(persist_directory):
+    """
+    Return the Chroma directory currently served for a persist directory.
+
+    Index builds are published as versions/<version> inside the persist
+    directory and activated through the CURRENT pointer file (see
+    index_versions.py). Without a pointer the persist directory itself holds
+    the Chroma database.
+
+    Args:
+        persist_directory (str): Directory where the ChromaDB is stored.
+
+    Returns:
+        str: The active version directory, or persist_directory.
+    """
+    try:
+        with open(os.path.join(persist_directory, INDEX_POINTER_FILE), encoding="utf-8") as f:
+            version = f.read().strip()
+    except OSError:
+        return persist_directory
+    return os.path.join(persist_directory, INDEX_VERSIONS_DIR, version) if version else persist_directory
+
+def index_reader_id():
+    """Lease name of this process: host name and process id."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+def renew_index_lease(persist_directory, index_directory, reader=None):
+    """
+    Record that this process reads an index version, or refresh that record.
+
+    Call it when a version is opened and then at least every
+    INDEX_LEASE_TIMEOUT seconds; index_versions.prune_versions keeps every
+    version with a fresh lease. Unversioned directories need no lease.
+
+    Args:
+        persist_directory (str): Directory where the ChromaDB is stored.
+        index_directory (str): The version directory being read (see resolve_index_directory).
+        reader (str): Lease name; defaults to index_reader_id().
+    """
+    if os.path.abspath(index_directory) == os.path.abspath(persist_directory):
+        return
+    leases_dir = os.path.join(persist_directory, INDEX_LEASES_DIR)
+    os.makedirs(leases_dir, exist_ok=True)
+    lease = os.path.join(leases_dir, reader or index_reader_id())
+    tmp_lease = f"{lease}.tmp"
+    with open(tmp_lease, "w", encoding="utf-8") as f:
+        f.write(os.path.basename(os.path.normpath(index_directory)))
+    # Replacing the file also refreshes its mtime, which is the lease heartbeat
+    os.replace(tmp_lease, lease)
+
+def release_index_lease(persist_directory, reader=None):
+    """
+    Drop this process's lease, e.g. on shutdown.
+
+    Args:
+        persist_directory (str): Directory where the ChromaDB is stored.
+        reader (str): Lease name; defaults to index_reader_id().
+    """
+    try:
+        os.remove(os.path.join(persist_directory, INDEX_LEASES_DIR, reader or index_reader_id()))
+    except OSError:
+        pass
+
+def flat_store_directory(persist_directory):
+    """
+    Return the FlatNumpyStore directory that mirrors a Chroma persist directory.
+
+    Args:
+        persist_directory (str): Directory where the ChromaDB is stored.
+
+    Returns:
+        str: Sibling directory with a "_flat" suffix.
+    """
+    return persist_directory.rstrip("/\\") + "_flat"
+
+def hnsw_store_directory(persist_directory):
+    """
+    Return the HnswStore directory that mirrors a Chroma persist directory.
+
+    Args:
+        persist_directory (str): Directory where the ChromaDB is stored.
+
+    Returns:
+        str: Sibling directory with a "_hnsw" suffix.
+    """
+    return persist_directory.rstrip("/\\") + "_hnsw"
+
+def chroma_fingerprint(persist_directory):
+    """
+    Fingerprint the contents of a Chroma persist directory.
+
+    Flat and HNSW mirrors record it when they are exported and are re-exported
+    when it changes. Uses the ingestion manifest when there is one, otherwise
+    the size and modification time of every Chroma file.
+
+    Args:
+        persist_directory (str): Directory where the ChromaDB is stored.
+
+    Returns:
+        str: Hex digest.
+    """
+    digest = hashlib.sha256()
+    manifest_path = os.path.join(persist_directory, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "rb") as f:
+            digest.update(f.read())
+        return digest.hexdigest()
+    for root, dirs, files in os.walk(persist_directory):
+        dirs[:] = sorted(d for d in dirs if d not in (INDEX_LEASES_DIR, INDEX_VERSIONS_DIR))
+        for name in sorted(files):
+            # SQLite journals come and go with readers, they do not change the contents
+            if name.endswith(("-wal", "-shm", "-journal")):
+                continue
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            digest.update(f"{os.path.relpath(path, persist_directory)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+def _load_mirror(store_class, directory, embeddings, **kwargs):
+    """Load a flat / HNSW mirror, or return None when it is missing or unreadable."""
+    if not os.path.exists(directory):
+        return None
+    try:
+        return store_class.load(directory, embeddings, **kwargs)
+    except (OSError, ValueError, KeyError, RuntimeError) as e:
+        print(f"Ignoring unreadable vector store {directory}: {e}")
+        return None
+
+def open_vector_store(persist_directory, embeddings, store_type=None):
+    """
+    Open a new vector store of the given type (not shared through the registry).
+
+    Args:
+        persist_directory (str): Directory where the ChromaDB is stored.
+        embeddings (Embeddings): Embedding model used to embed queries.
+        store_type (str): One of VECTOR_STORES; defaults to VECTOR_STORE.
+
+    Returns:
+        Chroma, FlatNumpyStore or HnswStore: The opened vector store.
+    """
+    store_type = store_type or VECTOR_STORE
+    if store_type == "chroma":
+        return Chroma(persist_directory=persist_directory, embedding_function=embeddings)
+    if store_type == "flat":
+        flat_directory = flat_store_directory(persist_directory)
+        source = chroma_fingerprint(persist_directory)
+        # A missing or half-replaced mirror (another process is publishing it) is exported again
+        store = _load_mirror(FlatNumpyStore, flat_directory, embeddings, rescore=FLAT_STORE_RESCORE)
+        if store is not None:
+            needs_full = FLAT_STORE_DTYPE != "float32" and FLAT_STORE_RESCORE > 0
+            if (store.source == source and store.dtype == FLAT_STORE_DTYPE
+                    and (store.full_vectors is not None or not needs_full)):
+                return store
+        # First use, Chroma store changed or storage settings changed: export the vectors stored in Chroma
+        chroma = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
+        store = FlatNumpyStore.from_chroma(chroma, dtype=FLAT_STORE_DTYPE, rescore=FLAT_STORE_RESCORE)
+        store.source = source
+        store.save(flat_directory)
+        # Reopen memory-mapped; keep the in-memory export if another process is replacing the mirror right now
+        loaded = _load_mirror(FlatNumpyStore, flat_directory, embeddings)
+        return loaded if loaded is not None else store
+    if store_type == "hnsw":
+        # hnswlib is only needed when the HNSW store is selected
+        from hnsw_store import HnswStore
+        hnsw_directory = hnsw_store_directory(persist_directory)
+        source = chroma_fingerprint(persist_directory)
+        store = _load_mirror(HnswStore, hnsw_directory, embeddings, ef_search=HNSW_EF_SEARCH)
+        if (store is not None and store.source == source
+                and store.M == HNSW_M and store.ef_construction == HNSW_EF_CONSTRUCTION):
+            return store
+        chroma = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
+        store = HnswStore.from_chroma(chroma, M=HNSW_M, ef_construction=HNSW_EF_CONSTRUCTION,
+                                      ef_search=HNSW_EF_SEARCH)
+        store.source = source
+        store.save(hnsw_directory)
+        return store
+    raise ValueError(f"Unknown vector store: {store_type}, expected one of {VECTOR_STORES}")
+
+def get_vector_store(persist_directory="docs/chroma/", model_name=DEFAULT_EMBEDDING_MODEL, backend=None,
+                     store_type=None):
+    """
+    Return the shared vector store for (store_type, backend, model_name, persist_directory).
+
+    Queries are embedded through the shared LRU cache, so a question asked
+    before skips the embedding forward pass. A versioned persist directory is
+    resolved to its active version first, so stores are shared per version.
+
+    Args:
+        persist_directory (str): Directory where the ChromaDB is stored.
+        model_name (str): Embedding model used to embed queries.
+        backend (str): One of EMBEDDING_BACKENDS; defaults to EMBEDDING_BACKEND.
+        store_type (str): One of VECTOR_STORES; defaults to VECTOR_STORE.
+
+    Returns:
+        Chroma, FlatNumpyStore or HnswStore: The shared vector store.
+    """
+    persist_directory = resolve_index_directory(persist_directory)
+    key = (store_type or VECTOR_STORE, backend or EMBEDDING_BACKEND, model_name,
+           os.path.abspath(persist_directory))
+    embeddings = get_query_embeddings(model_name, key[1])
+    with _registry_lock:
+        if key not in _vector_stores:
+            _vector_stores[key] = open_vector_store(persist_directory, embeddings, key[0])
+        return _vector_stores[key]
+
+def clear_registry(persist_directory=None):
+    """
+    Drop cached vector stores so the next lookup reopens them from disk.
+
+    Args:
+        persist_directory (str): Only drop stores for this directory; all stores when None.
+            Embedding models are kept since they do not depend on the stored data.
+    """
+    with _registry_lock:
+        for key in list(_vector_stores):
+            if persist_directory is None or key[-1] == os.path.abspath(persist_directory):
+                del _vector_stores[key]
+
+def load_chroma_db(persist_directory="docs/chroma/", model_name=DEFAULT_EMBEDDING_MODEL, backend=None,
+                   store_type=None):
     """
     Load the ChromaDB vector store from the specified directory.
 
+    The store and its embedding model come from the process-wide registry, so
+    repeated calls for the same directory share one model and one Chroma client.
+    With store_type "flat" or "hnsw" (or VECTOR_STORE=flat / hnsw) the same data
+    is served by a FlatNumpyStore or an HnswStore instead.
+
     Args:
         persist_directory (str): Directory where the ChromaDB is stored.
+        model_name (str): Embedding model used to embed queries.
+        backend (str): Embedding backend, one of EMBEDDING_BACKENDS; defaults to the
+            EMBEDDING_BACKEND environment variable.
+        store_type (str): Vector store, one of VECTOR_STORES; defaults to the
+            VECTOR_STORE environment variable.
 
     Returns:
-        Chroma: The loaded ChromaDB vector store.
+        Chroma, FlatNumpyStore or HnswStore: The loaded vector store.
     """
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    vectordb = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
-    return vectordb
+    return get_vector_store(persist_directory, model_name, backend, store_type)
 
-def retrieve_similar_documents(query, vectordb, top_k=5):
+def get_store_metadatas(vectordb):
+    """
+    Metadata of every document in a vector store.
+
+    Args:
+        vectordb (Chroma or FlatNumpyStore): The vector store.
+
+    Returns:
+        list: One metadata dict per stored document.
+    """
+    if isinstance(vectordb, FlatNumpyStore):
+        return vectordb.metadatas
+    return [metadata or {} for metadata in vectordb._collection.get(include=["metadatas"])["metadatas"]]
+
+def retrieve_similar_documents(query, vectordb, top_k=5, where=None, query_vector=None):
     """
     Retrieve the most similar documents to the query from the vector store.
 
     Args:
         query (str): The query string.
-        vectordb (Chroma): The ChromaDB vector store.
+        vectordb (Chroma or FlatNumpyStore): The vector store.
         top_k (int): Number of top similar documents to retrieve.
+        where (dict): Optional {field: value or values} metadata filter. When no
+            document matches it, the search falls back to the whole store.
+        query_vector (list): Precomputed query embedding (e.g. from the
+            micro-batcher); the query is embedded here when omitted.
 
     Returns:
         list: List of retrieved documents.
     """
-    results = vectordb.similarity_search(query, k=top_k)
+    if query_vector is None:
+        query_vector = vectordb.embeddings.embed_query(query)
+    if where:
+        store_filter = where if isinstance(vectordb, FlatNumpyStore) else to_chroma_where(where)
+        results = vectordb.similarity_search_by_vector(query_vector, k=top_k, filter=store_filter)
+        if results:
+            return results
+    results = vectordb.similarity_search_by_vector(query_vector, k=top_k)
     return results
 
+def retrieve_diverse_documents(query, vectordb, top_k=5, fetch_k=20, lambda_mult=0.5, where=None,
+                               query_vector=None):
+    """
+    Retrieve relevant but mutually dissimilar documents with Maximal Marginal Relevance.
+
+    Overlapping chunks often fill the plain top_k with near-duplicates; MMR
+    re-selects top_k among the fetch_k nearest candidates, penalizing
+    similarity to documents already chosen.
+
+    Args:
+        query (str): The query string.
+        vectordb (Chroma or FlatNumpyStore): The vector store.
+        top_k (int): Number of documents to return.
+        fetch_k (int): Number of nearest candidates to diversify.
+        lambda_mult (float): 1 ranks by relevance only, 0 by diversity only.
+        where (dict): Optional {field: value or values} metadata filter applied
+            before candidate selection, with the same fallback as
+            retrieve_similar_documents.
+        query_vector (list): Precomputed query embedding; the query is embedded
+            here when omitted.
+
+    Returns:
+        list: List of retrieved documents.
+    """
+    if query_vector is None:
+        query_vector = vectordb.embeddings.embed_query(query)
+    if isinstance(vectordb, FlatNumpyStore):
+        results = vectordb.max_marginal_relevance_search_by_vector(query_vector, top_k, fetch_k, lambda_mult, where)
+        if results or not where:
+            return results
+        return vectordb.max_marginal_relevance_search_by_vector(query_vector, top_k, fetch_k, lambda_mult)
+
+    results = vectordb._collection.query(
+        query_embeddings=[query_vector],
+        n_results=max(fetch_k, top_k),
+        where=to_chroma_where(where),
+        include=["documents", "metadatas", "embeddings"],
+    )
+    if where and not results["documents"][0]:
+        return retrieve_diverse_documents(query, vectordb, top_k, fetch_k, lambda_mult, query_vector=query_vector)
+    texts, metadatas = results["documents"][0], results["metadatas"][0]
+    selected = maximal_marginal_relevance(query_vector, results["embeddings"][0], top_k, lambda_mult)
+    return [Document(page_content=texts[i], metadata=metadatas[i] or {}) for i in selected]
+
+def retrieve_similar_documents_batch(queries, vectordb, top_k=5):
+    """
+    Retrieve the most similar documents for a batch of queries.
+
+    All queries are embedded through the model's batched query path and sent to
+    Chroma in one query call, instead of one embedding + search per query.
+    Queries already in the query-embedding cache are not re-embedded.
+
+    Args:
+        queries (list): List of query strings.
+        vectordb (Chroma or FlatNumpyStore): The vector store.
+        top_k (int): Number of top similar documents to retrieve per query.
+
+    Returns:
+        list: One list of retrieved documents per query, in input order.
+    """
+    if not queries:
+        return []
+
+    query_embeddings = embed_query_batch(vectordb.embeddings, list(queries))
+    if isinstance(vectordb, FlatNumpyStore):
+        return vectordb.similarity_search_by_vectors(query_embeddings, top_k)
+
+    results = vectordb._collection.query(
+        query_embeddings=query_embeddings,
+        n_results=top_k,
+        include=["documents", "metadatas"],
+    )
+    return [
+        [Document(page_content=text, metadata=metadata or {}) for text, metadata in zip(texts, metadatas)]
+        for texts, metadatas in zip(results["documents"], results["metadatas"])
+    ]
+
 def evaluate_retrieval(test_queries, vectordb, top_k=5):
     """
     Evaluate the retrieval system using precision, recall, and F1 score.
 
     Args:
-        test_queries (list): List of queries with ground truth.
+        test_queries (list): List of {"query", "relevant_docs"} dicts; relevant_docs
+            holds chunk ids, the metadata["id"] that chucking.chunk_resume_documents
+            sets (the content-hash vector id, see chucking.chunk_ids).
         vectordb (Chroma): The ChromaDB vector store.
         top_k (int): Number of top results to retrieve.
 
     Returns:
         dict: Precision, recall, and F1 score for each query.
     """
+    # Retrieve top_k results for all queries in one batch
+    batch_results = retrieve_similar_documents_batch(
+        [test_query["query"] for test_query in test_queries], vectordb, top_k
+    )
+
     results = []
-    for test_query in test_queries:
+    for test_query, retrieved_docs in zip(test_queries, batch_results):
         query = test_query["query"]
         relevant_docs = set(test_query["relevant_docs"])
         
-        # Retrieve top_k results
-        retrieved_docs = vectordb.similarity_search(query, k=top_k)
         retrieved_ids = set([doc.metadata["id"] for doc in retrieved_docs])
         
         # Calculate precision, recall, and F1
@@ -86,10 +560,16 @@ if __name__ == "__main__":
         print(f"\n--- Result {i+1} ---")
         print(result.page_content)
 
-    # Evaluation
+    # Evaluation: chunk ids are content hashes, so mark the chunks mentioning a topic as relevant
+    stored = vectordb._collection.get(include=["documents", "metadatas"])
+
+    def chunk_ids_mentioning(phrase):
+        return [metadata["id"] for text, metadata in zip(stored["documents"], stored["metadatas"])
+                if phrase in text.lower()]
+
     test_queries = [
-        {"query": "机器学习相关的内容", "relevant_docs": [1, 2, 3]},
-        {"query": "深度学习的应用", "relevant_docs": [4, 5]},
+        {"query": "机器学习相关的内容", "relevant_docs": chunk_ids_mentioning("machine learning")},
+        {"query": "深度学习的应用", "relevant_docs": chunk_ids_mentioning("deep learning")},
     ]
     evaluation_results = evaluate_retrieval(test_queries, vectordb, top_k=3)
     for result in evaluation_results:
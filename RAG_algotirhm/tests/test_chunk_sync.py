@@ -0,0 +1,202 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "rag_core", "LangChainRag"))
+
+try:
+    import chucking
+    from flat_store import FlatNumpyStore
+    from langchain.schema import Document
+    from retreival import evaluate_retrieval, retrieve_similar_documents, retrieve_similar_documents_batch
+except ImportError:  # langchain is not installed
+    chucking = None
+
+
+class InMemoryCollection:
+    """Stand-in for the Chroma collection methods used by sync_chunks."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def add(self, ids, embeddings, documents, metadatas):
+        for vector_id, vector, text, metadata in zip(ids, embeddings, documents, metadatas):
+            self.rows[vector_id] = {"vector": vector, "text": text, "metadata": dict(metadata)}
+
+    def update(self, ids, metadatas):
+        for vector_id, metadata in zip(ids, metadatas):
+            self.rows[vector_id]["metadata"] = dict(metadata)
+
+    def delete(self, ids):
+        for vector_id in ids:
+            del self.rows[vector_id]
+
+    def count(self):
+        return len(self.rows)
+
+
+class CountingEmbeddings:
+    model_name = "test-model"
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+def make_chunks(texts, source="resume.pdf"):
+    """One chunk per (short) text, as chunk_resume_documents produces them."""
+    pages = [Document(page_content=text, metadata={"source": source, "page": 0}) for text in texts]
+    return chucking.chunk_resume_documents(pages, dedup_threshold=None)
+
+
+@unittest.skipIf(chucking is None, "langchain is not installed")
+class TestChunkSync(unittest.TestCase):
+    """Incremental sync must only touch the chunks whose text or metadata changed."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.persist_directory = os.path.join(self.directory, "chroma")
+        self.collection = InMemoryCollection()
+        self.embeddings = CountingEmbeddings()
+        chroma = mock.Mock(return_value=mock.Mock(_collection=self.collection))
+        for target, value in [("Chroma", chroma), ("get_embedding_model", lambda *args: self.embeddings)]:
+            patcher = mock.patch.object(chucking, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def sync(self, chunks, **kwargs):
+        return chucking.sync_chunks(chunks, self.persist_directory, "test-model", "huggingface", **kwargs)[1]
+
+    def test_insertion_only_adds_the_new_chunk(self):
+        texts = [f"chunk {i}" for i in range(6)]
+        self.assertEqual(self.sync(make_chunks(texts))["added"], 6)
+
+        stats = self.sync(make_chunks(texts[:2] + ["inserted chunk"] + texts[2:]))
+        self.assertEqual(stats, {"added": 1, "updated": 0, "deleted": 0, "unchanged": 6})
+        self.assertEqual(self.embeddings.embedded[6:], ["inserted chunk"])
+        self.assertEqual(self.collection.count(), 7)
+
+    def test_plan_sync(self):
+        source = os.path.abspath("resume.pdf")
+        chunks = make_chunks(["a", "b", "c"])
+        entries = {vector_id: {"source": source, "metadata": dict(chunk.metadata)}
+                   for vector_id, chunk in zip(chucking.chunk_ids(chunks), chunks)}
+        entries["stale-0"] = {"source": source, "metadata": {}}
+        entries["other-0"] = {"source": os.path.abspath("other.pdf"), "metadata": {}}
+
+        new_chunks = make_chunks(["a", "b", "c", "d"])
+        new_chunks[1].metadata["page"] = 1
+        current, added, updated, deleted = chucking.plan_sync(new_chunks, entries, {source})
+        ids = chucking.chunk_ids(new_chunks)
+        self.assertEqual(list(current), ids)
+        self.assertEqual(added, [ids[3]])
+        self.assertEqual(updated, [ids[1]])
+        # Vanished chunks are only deleted for the sources being synced
+        self.assertEqual(deleted, ["stale-0"])
+
+    def test_metadata_and_deletion(self):
+        self.sync(make_chunks(["a", "b", "c"]))
+        chunks = make_chunks(["a", "c"])
+        chunks[1].metadata["page"] = 2
+
+        stats = self.sync(chunks)
+        self.assertEqual(stats, {"added": 0, "updated": 1, "deleted": 1, "unchanged": 1})
+        self.assertEqual(sorted(row["text"] for row in self.collection.rows.values()), ["a", "c"])
+        self.assertEqual(self.collection.rows[chunks[1].metadata["id"]]["metadata"]["page"], 2)
+        with open(os.path.join(self.persist_directory, chucking.MANIFEST_FILE), encoding="utf-8") as f:
+            self.assertEqual(set(json.load(f)["chunks"]), set(self.collection.rows))
+
+    def test_relative_and_absolute_sources_match(self):
+        texts = ["a", "b"]
+        self.sync(make_chunks(texts, source="resume.pdf"))
+        stats = self.sync(make_chunks(texts, source=os.path.abspath("resume.pdf")), sources={"resume.pdf"})
+        self.assertEqual(stats, {"added": 0, "updated": 0, "deleted": 0, "unchanged": 2})
+
+        with open(os.path.join(self.persist_directory, chucking.MANIFEST_FILE), encoding="utf-8") as f:
+            sources = {entry["source"] for entry in json.load(f)["chunks"].values()}
+        self.assertEqual(sources, {os.path.abspath("resume.pdf")})
+
+    def test_store_without_manifest_is_not_wiped(self):
+        os.makedirs(self.persist_directory)
+        legacy_file = os.path.join(self.persist_directory, "chroma.sqlite3")
+        open(legacy_file, "w").close()
+
+        with self.assertRaises(ValueError):
+            self.sync(make_chunks(["a"]))
+        self.assertTrue(os.path.exists(legacy_file))
+
+        self.assertEqual(self.sync(make_chunks(["a"]), incremental=False)["added"], 1)
+        self.assertFalse(os.path.exists(legacy_file))
+
+
+class TextEmbeddings:
+    """One-hot vector per known text."""
+
+    def __init__(self, texts):
+        self.texts = list(texts)
+
+    def embed_documents(self, texts):
+        return [[float(text == known) for known in self.texts] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+@unittest.skipIf(chucking is None, "langchain is not installed")
+class TestEvaluateRetrieval(unittest.TestCase):
+    """evaluate_retrieval scores against the chunk ids chunk_resume_documents assigns."""
+
+    def test_chunk_ids_as_ground_truth(self):
+        texts = ["python data pipelines", "llm fine-tuning", "graph mining"]
+        chunks = make_chunks(texts)
+        embeddings = TextEmbeddings(texts)
+        store = FlatNumpyStore(embeddings.embed_documents(texts), texts,
+                               metadatas=[chunk.metadata for chunk in chunks], embeddings=embeddings)
+
+        results = evaluate_retrieval([
+            {"query": "llm fine-tuning", "relevant_docs": [chunks[1].metadata["id"]]},
+            {"query": "graph mining", "relevant_docs": [chunks[0].metadata["id"]]},
+        ], store, top_k=1)
+        self.assertEqual([(r["precision"], r["recall"]) for r in results], [(1.0, 1.0), (0.0, 0.0)])
+
+
+class HashEmbeddings:
+    """Deterministic dense vectors from character counts."""
+
+    def embed_documents(self, texts):
+        return [[float(text.count(letter)) + 0.1 for letter in "aeinost"] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+@unittest.skipIf(chucking is None, "langchain is not installed")
+class TestBatchRetrieval(unittest.TestCase):
+    """Batched vector retrieval returns the per-query results in input order."""
+
+    def test_matches_single_queries(self):
+        texts = [f"{a} {b}" for a in ["python", "latency", "graph", "notes"] for b in ["store", "index", "tests"]]
+        embeddings = HashEmbeddings()
+        store = FlatNumpyStore(embeddings.embed_documents(texts), texts,
+                               metadatas=[{"row": i} for i in range(len(texts))], embeddings=embeddings)
+        queries = ["python index", "sane tests", "graph", "latency notes"]
+
+        batched = retrieve_similar_documents_batch(queries, store, top_k=3)
+        self.assertEqual([[doc.page_content for doc in docs] for docs in batched],
+                         [[doc.page_content for doc in retrieve_similar_documents(query, store, top_k=3)]
+                          for query in queries])
+        self.assertEqual(retrieve_similar_documents_batch([], store), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
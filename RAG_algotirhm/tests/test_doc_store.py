@@ -0,0 +1,71 @@
+import os
+import sys
+import unittest
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "chatbot"))
+
+from doc_store import DocumentStore
+from rag_core import ResumeRAGCore
+
+
+def make_frame():
+    return pd.DataFrame({
+        "type": ["Work", "Project", "Work"],
+        "company_organization": ["Baidu Inc.", "NEU", "Baidu Inc."],
+        "position_title": ["AI/ML Engineer", "Researcher", "Intern"],
+        "context": ["LLM fine-tuning", "graph mining", "data pipelines"],
+        "year": [2024, 2023, 2022],
+    }, index=[10, 11, 12])
+
+
+class TestDocumentStore(unittest.TestCase):
+    """The columnar store must expose the same records as the DataFrame it was built from."""
+
+    def setUp(self):
+        self.frame = make_frame()
+        self.store = DocumentStore.from_dataframe(self.frame)
+
+    def test_dataframe_round_trip(self):
+        pd.testing.assert_frame_equal(self.store.to_dataframe(), self.frame.astype(str))
+
+    def test_records(self):
+        for doc_id, (label, row) in enumerate(self.frame.iterrows()):
+            record = self.store.record(doc_id)
+            self.assertEqual(self.store.label(doc_id), label)
+            self.assertEqual(record.to_dict(), {field: str(value) for field, value in row.items()})
+            self.assertEqual(record["context"], row["context"])
+            self.assertEqual(record.get("missing", "default"), "default")
+            self.assertIn("year", record)
+            self.assertEqual(self.store.content(doc_id), " ".join(
+                str(row[field]) for field in ["type", "company_organization", "position_title", "context"]))
+
+    def test_repeated_values_are_shared(self):
+        column = self.store.columns["company_organization"]
+        self.assertIs(column[0], column[2])
+
+    def test_add_and_delete(self):
+        doc_id = self.store.add({"type": "Skill", "context": None, "level": "expert"})
+        self.assertEqual(self.store.label(doc_id), 13)
+        self.assertEqual(self.store.record(doc_id)["context"], "")
+        self.assertEqual(self.store.record(doc_id)["position_title"], "")
+        # New fields are backfilled for existing records
+        self.assertEqual(self.store.record(0)["level"], "")
+        self.assertEqual(self.store.content(doc_id), "Skill   ")
+
+        self.store.delete(self.store.doc_id(11))
+        with self.assertRaises(KeyError):
+            self.store.doc_id(11)
+        self.assertEqual(self.store.to_dataframe().index.tolist(), [10, 12, 13])
+        self.assertEqual(self.store.live_doc_ids(), [0, 2, 3])
+
+    def test_rag_core_data(self):
+        rag_core = ResumeRAGCore(config={"rag": {"snapshot_dir": None}})
+        expected = rag_core.data.astype(str)
+        rag_core._data = None
+        pd.testing.assert_frame_equal(rag_core.data, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
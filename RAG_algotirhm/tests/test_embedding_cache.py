@@ -0,0 +1,60 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "rag_core", "LangChainRag"))
+
+try:
+    from embedding_cache import CachedQueryEmbeddings, embed_query_batch
+except ImportError:  # langchain is not installed
+    CachedQueryEmbeddings = None
+
+
+class InstructionEmbeddings:
+    """Asymmetric model: queries get an instruction prefix, as BGE/E5-style models do."""
+
+    model_name = "instruction-model"
+
+    def __init__(self, prefix=""):
+        self.prefix = prefix
+        self.document_batches = []
+
+    def _embed(self, text):
+        return [float(len(text)), float(text.count(" "))]
+
+    def embed_documents(self, texts):
+        self.document_batches.append(list(texts))
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(self.prefix + text)
+
+
+@unittest.skipIf(CachedQueryEmbeddings is None, "langchain is not installed")
+class TestQueryPath(unittest.TestCase):
+    """Batched query embeddings must equal embed_query, including cache misses."""
+
+    def test_asymmetric_model(self):
+        model = InstructionEmbeddings(prefix="query: ")
+        cache = CachedQueryEmbeddings(model)
+        queries = ["llm fine-tuning", "graph mining", "llm fine-tuning", "data pipelines"]
+        expected = [model.embed_query(query) for query in queries]
+
+        self.assertEqual(cache.embed_queries(queries), expected)
+        self.assertFalse(cache.symmetric)
+        self.assertEqual(cache.embed_queries(queries + ["new query"]), expected + [model.embed_query("new query")])
+        self.assertEqual(embed_query_batch(model, queries), expected)
+
+    def test_symmetric_model_is_batched(self):
+        model = InstructionEmbeddings()
+        cache = CachedQueryEmbeddings(model)
+        queries = ["a b", "c", "d e f"]
+
+        self.assertEqual(cache.embed_queries(queries), [model.embed_query(query) for query in queries])
+        self.assertTrue(cache.symmetric)
+        # One single-text batch for the symmetry check, then the remaining misses together
+        self.assertEqual(model.document_batches, [["a b"], ["c", "d e f"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "chatbot"))
+
+from hybrid_retriever import HybridRetriever, reciprocal_rank_fusion
+
+
+def engine(contents):
+    return lambda query, top_k: [{"content": content, "metadata": {}} for content in contents[:top_k]]
+
+
+class TestHybridRetriever(unittest.TestCase):
+    """Reciprocal rank fusion of the keyword and vector rankings."""
+
+    def retrieve(self, keyword, vector, top_k=5):
+        retriever = HybridRetriever({"keyword": engine(keyword), "vector": engine(vector)},
+                                    config={"rrf_k": 60, "candidate_multiplier": 2, "max_workers": None})
+        self.addCleanup(retriever.close)
+        return retriever.retrieve("query", top_k)
+
+    def test_duplicates_within_an_engine_count_once(self):
+        results = self.retrieve(keyword=["a", "a", "b"], vector=["b", "c"])
+        by_content = {result["content"]: result for result in results}
+
+        self.assertEqual(by_content["a"]["sources"], ["keyword"])
+        self.assertEqual(by_content["b"]["sources"], ["keyword", "vector"])
+        # The duplicate "a" is dropped, so "b" is the keyword engine's second result
+        expected = dict(reciprocal_rank_fusion([["a", "b"], ["b", "c"]]))
+        for content, result in by_content.items():
+            self.assertAlmostEqual(result["score"], expected[content])
+        self.assertEqual([result["content"] for result in results], ["b", "a", "c"])
+
+    def test_documents_found_by_both_engines_rank_first(self):
+        results = self.retrieve(keyword=["a", "b", "c"], vector=["c", "d", "e"], top_k=3)
+        self.assertEqual(results[0]["content"], "c")
+        self.assertEqual([result["rank"] for result in results], [1, 2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
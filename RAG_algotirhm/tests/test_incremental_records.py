@@ -0,0 +1,150 @@
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "chatbot"))
+
+from config import DEFAULT_EXCEL_PATH
+from rag_core import ResumeRAGCore
+
+EXCEL_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "chatbot", DEFAULT_EXCEL_PATH)
+
+VOCABULARY = ["llm", "fine", "tuning", "data", "pipeline", "python", "baidu", "graph", "lora", "数据", "检索"]
+QUERIES = ["llm fine-tuning", "python data", "baidu graph", "ipe", "lor", "检索数据", "zebra", "nonexistentword"]
+
+RECORD = {
+    "type": "Work",
+    "company_organization": "Acme",
+    "position_title": "Engineer",
+    "context": "zebra unicorn pipeline",
+}
+
+
+def random_record(rng):
+    return {
+        "type": rng.choice(["Work", "Project", "Skill"]),
+        "company_organization": rng.choice(["Baidu Inc.", "NEU", "Acme"]),
+        "position_title": rng.choice(["Engineer", "Intern"]),
+        "context": " ".join(rng.choices(VOCABULARY + [f"word{rng.randrange(1000)}"], k=rng.randint(1, 30))),
+    }
+
+
+class TestIncrementalIndex(unittest.TestCase):
+    """
+    After adds, updates and deletes (delta segment plus tombstones), and after
+    compact(), retrieval must match an index rebuilt from the live records.
+    """
+
+    def setUp(self):
+        self.rng = random.Random(31)
+        self.rag_core = self.make_rag_core()
+        self.rag_core.add_records([random_record(self.rng) for _ in range(100)])
+        self.rag_core.keyword_index.compact()
+
+    @staticmethod
+    def make_rag_core():
+        return ResumeRAGCore(config={"rag": {"snapshot_dir": None, "metadata_filter": False}})
+
+    def random_edits(self, num_edits=60):
+        for _ in range(num_edits):
+            labels = [self.rag_core.doc_store.label(doc_id) for doc_id in self.rag_core.doc_store.live_doc_ids()]
+            operation = self.rng.random()
+            if operation < 0.4:
+                self.rag_core.add_records([random_record(self.rng) for _ in range(self.rng.randint(1, 3))])
+            elif operation < 0.7:
+                self.rag_core.update_record(self.rng.choice(labels), {"context": random_record(self.rng)["context"]})
+            else:
+                self.rag_core.delete_record(self.rng.choice(labels))
+
+    def rebuilt(self):
+        rebuilt = self.make_rag_core()
+        rebuilt.data = self.rag_core.doc_store.to_dataframe()
+        rebuilt._preprocess_data()
+        return rebuilt
+
+    def assert_same_as_rebuilt(self):
+        rebuilt = self.rebuilt()
+        self.assertEqual(self.rag_core.keyword_index.num_live_docs, rebuilt.keyword_index.num_docs)
+        for scoring, engine in [("keyword", "python"), ("keyword", "sparse"), ("bm25", "python")]:
+            for rag_core in (self.rag_core, rebuilt):
+                rag_core.rag_config.update(scoring=scoring, engine=engine)
+            for query in QUERIES:
+                expected = rebuilt.retrieve(query, top_k=10)
+                actual = self.rag_core.retrieve(query, top_k=10)
+                self.assertEqual([r["index"] for r in actual], [r["index"] for r in expected], (scoring, query))
+                np.testing.assert_allclose([r["score"] for r in actual], [r["score"] for r in expected])
+
+    def test_delta_and_tombstones(self):
+        self.random_edits()
+        self.assertFalse(self.rag_core.keyword_index.is_compact)
+        self.assertGreater(self.rag_core.keyword_index.num_deleted, 0)
+        self.assert_same_as_rebuilt()
+
+    def test_compact(self):
+        self.random_edits()
+        index = self.rag_core.keyword_index
+        num_docs, num_deleted = index.num_docs, index.num_deleted
+        index.compact()
+        self.assertTrue(index.is_compact)
+        # Document ids are never reused: compaction only drops postings of deleted documents
+        self.assertEqual((index.num_docs, index.num_deleted), (num_docs, num_deleted))
+        self.assertEqual(index.posting_doc_ids.size, index.term_freq_matrix.nnz)
+        self.assertTrue(index.alive[index.posting_doc_ids].all())
+        self.assert_same_as_rebuilt()
+
+        self.random_edits(20)
+        self.assert_same_as_rebuilt()
+
+    def test_deleting_twice(self):
+        label = self.rag_core.doc_store.label(0)
+        self.rag_core.delete_record(label)
+        with self.assertRaises(KeyError):
+            self.rag_core.delete_record(label)
+        with self.assertRaises(KeyError):
+            self.rag_core.keyword_index.delete_document(0)
+
+
+class TestRecordPersistence(unittest.TestCase):
+    """Record edits stay in memory until persist_changes() writes the snapshot."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.xlsx_path = os.path.join(self.directory, "resume.xlsx")
+        shutil.copy(EXCEL_PATH, self.xlsx_path)
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def load(self):
+        return ResumeRAGCore(self.xlsx_path, config={"rag": {"metadata_filter": False}})
+
+    @staticmethod
+    def contents(rag_core):
+        doc_store = rag_core.doc_store
+        return sorted(doc_store.content(doc_id) for doc_id in doc_store.live_doc_ids())
+
+    def test_edits_are_persisted_explicitly(self):
+        rag_core = self.load()
+        original = self.contents(rag_core)
+        rag_core.add_records([RECORD])
+        rag_core.delete_record(rag_core.doc_store.label(0))
+        self.assertEqual(rag_core.unpersisted_changes, 2)
+        self.assertEqual(self.contents(self.load()), original)
+
+        self.assertTrue(rag_core.persist_changes())
+        self.assertEqual(rag_core.unpersisted_changes, 0)
+        reloaded = self.load()
+        self.assertEqual(self.contents(reloaded), self.contents(rag_core))
+        self.assertEqual(reloaded.unpersisted_changes, 0)
+        self.assertEqual([result["index"] for result in reloaded.retrieve("zebra unicorn", top_k=3)],
+                         [result["index"] for result in rag_core.retrieve("zebra unicorn", top_k=3)])
+
+    def test_nothing_to_persist(self):
+        self.assertTrue(self.load().persist_changes())
+
+
+if __name__ == "__main__":
+    unittest.main()
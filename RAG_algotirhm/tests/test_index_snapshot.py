@@ -0,0 +1,137 @@
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "chatbot"))
+
+import index_snapshot
+from index_snapshot import load_snapshot, save_snapshot, source_fingerprint
+from keyword_index import INDEX_ARRAYS
+from rag_core import ResumeRAGCore
+
+VOCABULARY = ["llm", "fine", "tuning", "data", "pipeline", "python", "baidu", "graph", "数据", "检索", "模型"]
+QUERIES = ["llm fine-tuning", "python data", "baidu", "ipe", "检索模型", "数据", "nonexistentword"]
+
+
+def random_record(rng):
+    return {
+        "type": rng.choice(["Work", "Project"]),
+        "company_organization": rng.choice(["Baidu Inc.", "NEU"]),
+        "position_title": rng.choice(["Engineer", "Intern"]),
+        "context": " ".join(rng.choices(VOCABULARY, k=rng.randint(1, 30))),
+    }
+
+
+def index_arrays(index):
+    arrays = {
+        "posting_indptr": index.posting_indptr, "posting_doc_ids": index.posting_doc_ids,
+        "posting_tfs": index.posting_tfs, "doc_indptr": index.term_freq_matrix.indptr,
+        "doc_term_ids": index.term_freq_matrix.indices, "doc_tfs": index.term_freq_matrix.data,
+        "doc_length_array": index.doc_length_array, "alive": index.alive, "idf": index.idf,
+        "gram_indptr": index.gram_indptr, "gram_term_ids": index.gram_term_ids,
+    }
+    return {name: arrays[name] for name in INDEX_ARRAYS}
+
+
+class TestIndexSnapshot(unittest.TestCase):
+    """An index loaded from a snapshot must retrieve exactly like the one that was saved."""
+
+    def setUp(self):
+        self.rng = random.Random(29)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.rag_core = self.make_rag_core()
+        self.rag_core.add_records([random_record(self.rng) for _ in range(150)])
+        for label in self.rng.sample(list(self.rag_core.doc_store.labels), 20):
+            self.rag_core.delete_record(label)
+
+    @staticmethod
+    def make_rag_core():
+        return ResumeRAGCore(config={"rag": {"snapshot_dir": None, "metadata_filter": False}})
+
+    def load(self, fingerprint="fingerprint"):
+        snapshot = load_snapshot(self.directory, fingerprint)
+        self.assertIsNotNone(snapshot)
+        loaded = self.make_rag_core()
+        loaded.doc_store, loaded.keyword_index = snapshot
+        loaded._build_metadata_index()
+        return loaded
+
+    def assert_same_results(self, loaded):
+        for scoring, engine in [("keyword", "python"), ("keyword", "sparse"), ("bm25", "python")]:
+            for rag_core in (self.rag_core, loaded):
+                rag_core.rag_config.update(scoring=scoring, engine=engine)
+            for query in QUERIES:
+                expected = self.rag_core.retrieve(query, top_k=10)
+                actual = loaded.retrieve(query, top_k=10)
+                self.assertEqual([r["index"] for r in actual], [r["index"] for r in expected], (scoring, query))
+                self.assertEqual([r["data"].to_dict() for r in actual], [r["data"].to_dict() for r in expected])
+                np.testing.assert_allclose([r["score"] for r in actual], [r["score"] for r in expected])
+
+    def test_round_trip(self):
+        save_snapshot(self.directory, "fingerprint", self.rag_core.doc_store, self.rag_core.keyword_index)
+        loaded = self.load()
+
+        index, loaded_index = self.rag_core.keyword_index, loaded.keyword_index
+        self.assertEqual(loaded_index.terms, index.terms)
+        self.assertEqual(loaded_index.num_deleted, index.num_deleted)
+        for name, array in index_arrays(loaded_index).items():
+            np.testing.assert_array_equal(array, index_arrays(index)[name], err_msg=name)
+        self.assertIsInstance(loaded_index.posting_doc_ids, np.memmap)
+        self.assertEqual(loaded.doc_store.labels, self.rag_core.doc_store.labels)
+        self.assertEqual(loaded.doc_store.deleted, self.rag_core.doc_store.deleted)
+        self.assert_same_results(loaded)
+
+    def test_loaded_index_accepts_changes(self):
+        save_snapshot(self.directory, "fingerprint", self.rag_core.doc_store, self.rag_core.keyword_index)
+        loaded = self.load()
+        records = [random_record(self.rng) for _ in range(10)]
+        doc_ids = self.rng.sample(self.rag_core.doc_store.live_doc_ids(), 5)
+        for rag_core in (self.rag_core, loaded):
+            rag_core.add_records(records)
+            for doc_id in doc_ids:
+                rag_core.delete_record(rag_core.doc_store.label(doc_id))
+        self.assert_same_results(loaded)
+
+    def test_mismatched_snapshots_are_ignored(self):
+        save_snapshot(self.directory, "fingerprint", self.rag_core.doc_store, self.rag_core.keyword_index)
+        self.assertIsNone(load_snapshot(self.directory, "other"))
+
+        meta_path = os.path.join(self.directory, "fingerprint", index_snapshot.META_FILE)
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({**meta, "format_version": index_snapshot.FORMAT_VERSION - 1}, f)
+        self.assertIsNone(load_snapshot(self.directory, "fingerprint"))
+
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.remove(os.path.join(self.directory, "fingerprint", "idf.npy"))
+        self.assertIsNone(load_snapshot(self.directory, "fingerprint"))
+
+    def test_new_fingerprint_replaces_old_snapshots(self):
+        save_snapshot(self.directory, "old", self.rag_core.doc_store, self.rag_core.keyword_index)
+        save_snapshot(self.directory, "new", self.rag_core.doc_store, self.rag_core.keyword_index)
+        self.assertEqual(os.listdir(self.directory), ["new"])
+        self.assert_same_results(self.load("new"))
+
+    def test_source_fingerprint(self):
+        path = os.path.join(self.directory, "resume.xlsx")
+        with open(path, "wb") as f:
+            f.write(b"resume data")
+        fingerprint = source_fingerprint(path, "word")
+        self.assertEqual(source_fingerprint(path, "word", chunk_size=4), fingerprint)
+        self.assertNotEqual(source_fingerprint(path, "cjk_bigram"), fingerprint)
+        with open(path, "ab") as f:
+            f.write(b"!")
+        self.assertNotEqual(source_fingerprint(path, "word"), fingerprint)
+
+
+if __name__ == "__main__":
+    unittest.main()
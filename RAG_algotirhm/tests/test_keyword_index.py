@@ -0,0 +1,324 @@
+import math
+import os
+import random
+import sys
+import unittest
+from collections import Counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "chatbot"))
+
+from keyword_index import tokenize, tokenize_cjk_bigrams
+from rag_core import ResumeRAGCore
+
+VOCABULARY = [
+    "llm", "fine", "tuning", "data", "pipeline", "model", "python", "baidu", "research",
+    "evaluation", "prompt", "engineering", "deepseek", "lora", "retrieval", "graph",
+    "vision", "agent", "latency", "ranking", "cache", "index", "learning", "deep",
+]
+TYPES = ["Work", "Project", "Undergraduate Research", "Skill"]
+
+
+def random_record(rng):
+    words = rng.choices(VOCABULARY, k=rng.randint(1, 40))
+    # Concatenated words only match their parts as substrings
+    if rng.random() < 0.3:
+        words.append("".join(rng.sample(VOCABULARY, 2)))
+    return {
+        "type": rng.choice(TYPES),
+        "company_organization": rng.choice(["Baidu Inc.", "NEU", "Acme"]),
+        "position_title": rng.choice(["AI/ML Engineer", "Researcher", "Intern"]),
+        "context": " ".join(words),
+    }
+
+
+def random_query_words(rng):
+    words = set(rng.sample(VOCABULARY, rng.randint(1, 5)))
+    # Fragments that only match as substrings, and words no document contains
+    if rng.random() < 0.5:
+        word = rng.choice(VOCABULARY)
+        start = rng.randrange(len(word) - 1)
+        words.add(word[start:start + rng.randint(1, 5)])
+    if rng.random() < 0.3:
+        words.add("nonexistentword")
+    return words
+
+
+def make_rag_core(rng, num_records=200, **rag_config):
+    rag_core = ResumeRAGCore(config={"rag": {"snapshot_dir": None, "metadata_filter": False, **rag_config}})
+    rag_core.add_records([random_record(rng) for _ in range(num_records)])
+    return rag_core
+
+
+def document_words(rag_core, doc_id):
+    content_lower = rag_core.doc_store.content(doc_id).lower()
+    return content_lower, set(rag_core._tokenize(content_lower))
+
+
+def linear_scan(rag_core, query_words, top_k):
+    """Reference retrieval: score every live document with the per-document scorer."""
+    scored = []
+    for doc_id in rag_core.doc_store.live_doc_ids():
+        content_lower, content_words = document_words(rag_core, doc_id)
+        score = rag_core._calculate_similarity_score(query_words, "", content_words, content_lower,
+                                                     len(content_words))
+        if score > rag_core.rag_config["min_score_threshold"]:
+            scored.append((score, doc_id))
+    # Stable sort: ties keep document order
+    scored.sort(key=lambda item: -item[0])
+    return [(rag_core.doc_store.label(doc_id), score) for score, doc_id in scored[:top_k]]
+
+
+class TestInvertedIndex(unittest.TestCase):
+    """Retrieval through the inverted index must match scoring every document."""
+
+    def setUp(self):
+        self.rng = random.Random(11)
+        self.rag_core = make_rag_core(self.rng)
+
+    def assert_matches_linear_scan(self, query_words, top_k):
+        expected = linear_scan(self.rag_core, query_words, top_k)
+        actual = self.rag_core._retrieve_keyword(query_words, top_k)
+        self.assertEqual([r["index"] for r in actual], [label for label, _ in expected], query_words)
+        np.testing.assert_allclose([r["score"] for r in actual], [score for _, score in expected])
+
+    def test_hit_counts(self):
+        index = self.rag_core.keyword_index
+        for _ in range(50):
+            query_words = random_query_words(self.rng)
+            keyword_hits, substring_hits = {}, {}
+            for doc_id in self.rag_core.doc_store.live_doc_ids():
+                content_lower, content_words = document_words(self.rag_core, doc_id)
+                if query_words & content_words:
+                    keyword_hits[doc_id] = len(query_words & content_words)
+                matches = sum(word in content_lower for word in query_words)
+                if matches:
+                    substring_hits[doc_id] = matches
+            self.assertEqual(index.keyword_hit_counts(query_words), keyword_hits, query_words)
+            self.assertEqual(index.substring_hit_counts(query_words), substring_hits, query_words)
+
+    def test_random_queries(self):
+        for _ in range(100):
+            self.assert_matches_linear_scan(random_query_words(self.rng), self.rng.choice([1, 5, 20]))
+
+    def test_sample_queries(self):
+        for query in ["AI/ML Engineer", "LLM fine-tuning at Baidu", "machine learning research", "python"]:
+            self.assert_matches_linear_scan(set(self.rag_core._tokenize(query.lower())), 5)
+
+
+class TestSparseEngine(unittest.TestCase):
+    """The sparse-matrix engine must give the same hit counts and rankings as the python engine."""
+
+    def setUp(self):
+        self.rng = random.Random(17)
+        self.rag_core = make_rag_core(self.rng)
+
+    def assert_same_rankings(self, num_queries=50):
+        for _ in range(num_queries):
+            query_words = random_query_words(self.rng)
+            top_k = self.rng.choice([1, 5, 20])
+            expected = linear_scan(self.rag_core, query_words, top_k)
+            for engine in ("python", "sparse"):
+                self.rag_core.rag_config["engine"] = engine
+                results = self.rag_core.retrieve(" ".join(query_words), top_k=top_k)
+                self.assertEqual([r["index"] for r in results], [label for label, _ in expected],
+                                 (engine, query_words))
+                np.testing.assert_allclose([r["score"] for r in results], [score for _, score in expected])
+
+    def test_match_counts(self):
+        index = self.rag_core.keyword_index
+        for _ in range(50):
+            query_words = random_query_words(self.rng)
+            keyword_hits, exact_hits = index.match_counts(query_words)
+            expected_keyword, expected_exact = np.zeros(index.num_docs), np.zeros(index.num_docs)
+            for doc_id, count in index.keyword_hit_counts(query_words).items():
+                expected_keyword[doc_id] = count
+            for doc_id, count in index.substring_hit_counts(query_words).items():
+                expected_exact[doc_id] = count
+            np.testing.assert_array_equal(keyword_hits, expected_keyword)
+            np.testing.assert_array_equal(exact_hits, expected_exact)
+
+    def test_rankings(self):
+        self.assert_same_rankings()
+
+    def test_rankings_without_candidate_pruning(self):
+        # Documents without any hit can pass the threshold on their length bonus alone
+        self.rag_core.rag_config.update(length_bonus_weight=0.3, min_score_threshold=0.05)
+        self.assert_same_rankings()
+
+    def test_rankings_after_deletes(self):
+        for label in self.rng.sample(list(self.rag_core.doc_store.labels), 60):
+            self.rag_core.delete_record(label)
+        self.assert_same_rankings()
+
+
+def reference_bm25(rag_core, query_words, k1, b):
+    """Reference BM25 over the live documents, computed term by term in Python."""
+    counts = {doc_id: Counter(rag_core._tokenize(rag_core.doc_store.content(doc_id).lower()))
+              for doc_id in rag_core.doc_store.live_doc_ids()}
+    avg_length = sum(sum(c.values()) for c in counts.values()) / len(counts)
+    scores = np.zeros(len(rag_core.doc_store))
+    for word in query_words:
+        doc_freq = sum(word in c for c in counts.values())
+        idf = math.log(1 + (len(counts) - doc_freq + 0.5) / (doc_freq + 0.5))
+        for doc_id, c in counts.items():
+            tf = c[word]
+            length_norm = k1 * (1 - b + b * sum(c.values()) / avg_length)
+            scores[doc_id] += idf * tf * (k1 + 1) / (tf + length_norm)
+    return scores
+
+
+class TestBM25(unittest.TestCase):
+    """BM25 from the precomputed IDF and length arrays must match the textbook formula."""
+
+    def setUp(self):
+        self.rng = random.Random(13)
+        self.rag_core = make_rag_core(self.rng, scoring="bm25")
+
+    def assert_matches_reference(self, top_k=5, k1=1.5, b=0.75):
+        self.rag_core.rag_config.update(bm25_k1=k1, bm25_b=b)
+        for _ in range(30):
+            query_words = random_query_words(self.rng)
+            expected = reference_bm25(self.rag_core, query_words, k1, b)
+            np.testing.assert_allclose(self.rag_core.keyword_index.bm25_scores(query_words, k1, b), expected,
+                                       atol=1e-12, err_msg=str(query_words))
+
+            results = self.rag_core.retrieve(" ".join(query_words), top_k=top_k)
+            top_scores = np.sort(expected[expected > self.rag_core.rag_config["min_score_threshold"]])[::-1]
+            np.testing.assert_allclose([r["score"] for r in results], top_scores[:top_k])
+            for result in results:
+                self.assertAlmostEqual(result["score"], expected[self.rag_core.doc_store.doc_id(result["index"])])
+
+    def test_scores(self):
+        self.assert_matches_reference()
+        self.assert_matches_reference(top_k=20, k1=1.2, b=0.0)
+
+    def test_after_deletes(self):
+        for label in self.rng.sample(list(self.rag_core.doc_store.labels), 50):
+            self.rag_core.delete_record(label)
+        self.assert_matches_reference()
+
+
+class TestSubstringIndex(unittest.TestCase):
+    """The vocabulary n-gram index must find exactly the terms containing a word."""
+
+    def setUp(self):
+        self.rng = random.Random(23)
+        self.rag_core = make_rag_core(self.rng, num_records=100)
+        self.index = self.rag_core.keyword_index
+
+    def fragments(self):
+        fragments = {"", "zzz", "nonexistentword"}
+        for term in self.index.terms:
+            for _ in range(3):
+                start = self.rng.randrange(len(term))
+                fragments.add(term[start:start + self.rng.randint(1, 8)])
+        return fragments
+
+    def assert_matches_vocabulary_scan(self):
+        for word in self.fragments() - {""}:
+            term_ids = self.index.matching_term_ids(word)
+            self.assertEqual(len(term_ids), len(set(term_ids)), word)
+            self.assertEqual(sorted(term_ids),
+                             [term_id for term_id, term in enumerate(self.index.terms) if word in term], word)
+
+    def test_compact_index(self):
+        self.index.compact()
+        self.assertTrue(self.index.is_compact)
+        self.assert_matches_vocabulary_scan()
+
+    def test_delta_terms(self):
+        self.index.compact()
+        # New terms, and new terms sharing n-grams with existing ones
+        self.rag_core.add_records([{"type": "Work", "context": "pipelining lorax zygote indexes deepsearch"}])
+        self.assertFalse(self.index.is_compact)
+        self.assert_matches_vocabulary_scan()
+        self.index.compact()
+        self.assert_matches_vocabulary_scan()
+
+
+class TestRetrieveMany(unittest.TestCase):
+    """Batched retrieval must return what retrieve returns for each query."""
+
+    def setUp(self):
+        self.rng = random.Random(19)
+        self.rag_core = make_rag_core(self.rng)
+        self.queries = [" ".join(random_query_words(self.rng)) for _ in range(40)] + ["", "nonexistentword"]
+
+    def assert_same_as_retrieve(self, **rag_config):
+        self.rag_core.rag_config.update(rag_config)
+        for top_k in (1, 5):
+            expected = [self.rag_core.retrieve(query, top_k=top_k) for query in self.queries]
+            actual = self.rag_core.retrieve_many(self.queries, top_k=top_k, batch_size=16)
+            self.assertEqual([[r["index"] for r in results] for results in actual],
+                             [[r["index"] for r in results] for results in expected], rag_config)
+            for actual_results, expected_results in zip(actual, expected):
+                np.testing.assert_allclose([r["score"] for r in actual_results],
+                                           [r["score"] for r in expected_results])
+
+    def test_keyword_scoring(self):
+        self.assert_same_as_retrieve()
+        self.assert_same_as_retrieve(engine="sparse")
+        self.assert_same_as_retrieve(length_bonus_weight=0.3, min_score_threshold=0.05)
+
+    def test_bm25_scoring(self):
+        self.assert_same_as_retrieve(scoring="bm25")
+
+    def test_after_deletes(self):
+        for label in self.rng.sample(list(self.rag_core.doc_store.labels), 60):
+            self.rag_core.delete_record(label)
+        self.assert_same_as_retrieve()
+        self.assert_same_as_retrieve(scoring="bm25")
+
+
+CJK_WORDS = ["模型", "微调", "数据", "检索", "百度", "研究", "系统", "データ", "한국어", "学"]
+
+
+def random_mixed_text(rng):
+    parts = []
+    for _ in range(rng.randint(1, 8)):
+        if rng.random() < 0.5:
+            parts.append(rng.choice(VOCABULARY))
+        else:
+            # Adjacent CJK words form one run, with or without a latin word attached
+            run = "".join(rng.choices(CJK_WORDS, k=rng.randint(1, 3)))
+            parts.append(run + rng.choice(["", rng.choice(VOCABULARY)]))
+    return " ".join(parts)
+
+
+class TestCjkBigrams(unittest.TestCase):
+    """CJK runs are split into character bigrams without breaking substring matching."""
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize_cjk_bigrams("llm微调模型 at baidu"), ["llm", "微调", "调模", "模型", "at", "baidu"])
+        self.assertEqual(tokenize_cjk_bigrams("学python"), ["学", "python"])
+        self.assertEqual(tokenize_cjk_bigrams("データ, 한국어"), ["デー", "ータ", "한국", "국어"])
+        self.assertEqual(tokenize_cjk_bigrams("ai/ml engineer"), tokenize("ai/ml engineer"))
+        self.assertEqual(tokenize("llm微调模型"), ["llm微调模型"])
+
+    def test_substring_equivalence(self):
+        rng = random.Random(37)
+        for _ in range(300):
+            content = random_mixed_text(rng)
+            content_tokens = tokenize_cjk_bigrams(content)
+            for word in tokenize_cjk_bigrams(random_mixed_text(rng)):
+                self.assertEqual(word in content, any(word in token for token in content_tokens), (word, content))
+
+    def test_retrieval(self):
+        rng = random.Random(41)
+        rag_core = ResumeRAGCore(config={"rag": {"snapshot_dir": None, "metadata_filter": False,
+                                                 "tokenizer": "cjk_bigram"}})
+        rag_core.add_records([{"type": "Work", "context": random_mixed_text(rng)} for _ in range(150)])
+        for query in ["检索模型", "百度的数据研究", "模型微调 llm", "データ", "学", "系统python"]:
+            query_words = set(rag_core._tokenize(query.lower()))
+            expected = linear_scan(rag_core, query_words, 5)
+            for engine in ("python", "sparse"):
+                rag_core.rag_config["engine"] = engine
+                results = rag_core.retrieve(query, top_k=5)
+                self.assertTrue(results, query)
+                self.assertEqual([r["index"] for r in results], [label for label, _ in expected], (engine, query))
+
+
+if __name__ == "__main__":
+    unittest.main()
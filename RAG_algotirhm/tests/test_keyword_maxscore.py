@@ -0,0 +1,88 @@
+import os
+import random
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "chatbot"))
+
+from rag_core import ResumeRAGCore
+
+VOCABULARY = [
+    "llm", "fine", "tuning", "data", "pipeline", "model", "python", "baidu", "research",
+    "evaluation", "prompt", "engineering", "deepseek", "lora", "retrieval", "graph",
+    "vision", "agent", "latency", "ranking", "cache", "index", "learning", "deep",
+]
+TYPES = ["Work", "Project", "Undergraduate Research", "Skill"]
+
+
+def random_record(rng):
+    words = rng.choices(VOCABULARY, k=rng.randint(1, 60))
+    # Concatenated words only match their parts as substrings
+    if rng.random() < 0.3:
+        words.append("".join(rng.sample(VOCABULARY, 2)))
+    return {
+        "type": rng.choice(TYPES),
+        "company_organization": rng.choice(["Baidu Inc.", "NEU", "Acme"]),
+        "position_title": rng.choice(["AI/ML Engineer", "Researcher", "Intern"]),
+        "context": " ".join(words),
+    }
+
+
+class TestKeywordMaxScore(unittest.TestCase):
+    """MaxScore keyword retrieval must return exactly what the linear scorer returns."""
+
+    def setUp(self):
+        self.rng = random.Random(7)
+        self.rag_core = ResumeRAGCore(config={"rag": {"snapshot_dir": None, "metadata_filter": False}})
+        self.rag_core.add_records([random_record(self.rng) for _ in range(300)])
+
+    def random_query_words(self):
+        words = set(self.rng.sample(VOCABULARY, self.rng.randint(1, 6)))
+        # Fragments that only match as substrings, and words no document contains
+        if self.rng.random() < 0.5:
+            word = self.rng.choice(VOCABULARY)
+            words.add(word[:max(2, len(word) - 2)])
+        if self.rng.random() < 0.3:
+            words.add("nonexistentword")
+        return words
+
+    def assert_same_results(self, query_words, top_k, doc_mask=None):
+        expected = self.rag_core._retrieve_keyword_sparse(query_words, top_k, doc_mask)
+        actual = self.rag_core._retrieve_keyword(query_words, top_k, doc_mask)
+        self.assertEqual([r["index"] for r in actual], [r["index"] for r in expected], query_words)
+        np.testing.assert_allclose([r["score"] for r in actual], [r["score"] for r in expected])
+
+    def test_random_queries(self):
+        for _ in range(200):
+            self.assert_same_results(self.random_query_words(), self.rng.choice([1, 3, 5, 20]))
+
+    def test_sample_queries(self):
+        for query in ["AI/ML Engineer", "LLM fine-tuning at Baidu", "machine learning research", "python"]:
+            query_words = set(self.rag_core._tokenize(query.lower()))
+            for top_k in (1, 5, 50):
+                self.assert_same_results(query_words, top_k)
+
+    def test_after_deletes(self):
+        for label in self.rng.sample(list(self.rag_core.doc_store.labels), 80):
+            self.rag_core.delete_record(label)
+        for _ in range(100):
+            self.assert_same_results(self.random_query_words(), self.rng.choice([1, 5, 20]))
+
+    def test_with_doc_mask(self):
+        num_docs = self.rag_core.keyword_index.num_docs
+        for _ in range(100):
+            doc_mask = np.array([self.rng.random() < 0.2 for _ in range(num_docs)])
+            self.assert_same_results(self.random_query_words(), self.rng.choice([1, 5]), doc_mask)
+        # No masked document passes the threshold: both fall back to the unfiltered result
+        self.assert_same_results({"llm", "data"}, 5, np.zeros(num_docs, dtype=bool))
+
+    def test_ties_keep_original_order(self):
+        self.rag_core.add_records([{"type": "Work", "company_organization": "Acme",
+                                    "position_title": "Intern", "context": "cache ranking"}] * 10)
+        self.assert_same_results({"cache", "ranking"}, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
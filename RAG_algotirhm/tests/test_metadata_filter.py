@@ -0,0 +1,88 @@
+import os
+import random
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "chatbot"))
+
+from rag_core import ResumeRAGCore
+# metadata_index puts the LangChainRag directory on sys.path
+from metadata_filter import MetadataBitmaps
+
+
+class TestMetadataFilterQueries(unittest.TestCase):
+    """Which keyword queries narrow the candidates when metadata_filter is enabled (sample data)."""
+
+    def setUp(self):
+        self.rag_core = ResumeRAGCore(config={"rag": {"snapshot_dir": None, "metadata_filter": True}})
+
+    def constraints(self, query):
+        query_lower = query.lower()
+        query_words = set(self.rag_core._tokenize(query_lower))
+        return self.rag_core.metadata_index.match(
+            query_lower, query_words, self.rag_core._tokenize, self.rag_core.keyword_index
+        )
+
+    def test_disabled_by_default(self):
+        rag_core = ResumeRAGCore(config={"rag": {"snapshot_dir": None}})
+        query_words = {"what", "did", "you", "do", "at", "baidu"}
+        self.assertIsNone(rag_core._metadata_mask("what did you do at baidu", query_words))
+
+    def test_company_names_narrow(self):
+        self.assertEqual(self.constraints("What did you do at Baidu?"), {"company_organization": {"Baidu Inc."}})
+        self.assertEqual(self.constraints("Michelin projects"),
+                         {"company_organization": {"Michelin(China) Investment Co. Ltd."}})
+        self.assertEqual(self.constraints("Tell me about Apple Inc."), {"company_organization": {"Apple Inc."}})
+
+    def test_generic_words_do_not_narrow(self):
+        # "Work" and "Project" are type values, but a single common word does not select a type
+        for query in ["Tell me about your work experience", "Which project are you proudest of?",
+                      "What did you learn?", "Inc"]:
+            self.assertEqual(self.constraints(query), {}, query)
+
+    def test_multi_word_values_narrow(self):
+        # "Undergraduate Research" and "Machine Learning Course" are company_organization values in the
+        # sample data, so naming them (or their distinctive words) narrows to them
+        self.assertEqual(self.constraints("undergraduate research experience"),
+                         {"company_organization": {"Undergraduate Research"}})
+        self.assertEqual(self.constraints("research"), {"company_organization": {"Undergraduate Research"}})
+        self.assertEqual(self.constraints("the machine learning course"),
+                         {"company_organization": {"Machine Learning Course"}})
+
+    def test_type_values_by_full_phrase_only(self):
+        rag_core = ResumeRAGCore(config={"rag": {"snapshot_dir": None, "metadata_filter": True}})
+        rag_core.add_records([{"type": "Undergraduate Research", "company_organization": "NEU",
+                               "position_title": "Research Assistant", "context": "graph mining"}])
+        self.rag_core = rag_core
+        self.assertEqual(self.constraints("undergraduate research at NEU")["type"], {"Undergraduate Research"})
+        self.assertNotIn("type", self.constraints("work at neu"))
+
+    def test_filtered_retrieval_only_returns_matching_records(self):
+        results = self.rag_core.retrieve("What did you do at Baidu?")
+        self.assertTrue(results)
+        self.assertEqual({r["data"]["company_organization"] for r in results}, {"Baidu Inc."})
+
+
+class TestMetadataBitmaps(unittest.TestCase):
+    """Packed bitmaps updated in place must match bitmaps built from scratch."""
+
+    def test_incremental_updates_match_bulk_build(self):
+        rng = random.Random(3)
+        metadatas = [{"type": rng.choice("abc"), "page": rng.randrange(4)} for _ in range(50)]
+        bitmaps = MetadataBitmaps(metadatas[:5])
+        for row in range(5, 50):
+            bitmaps.add(row, metadatas[row])
+        deleted = rng.sample(range(50), 10)
+        for row in deleted:
+            bitmaps.delete(row)
+        expected = MetadataBitmaps([{} if row in deleted else metadata for row, metadata in enumerate(metadatas)])
+
+        self.assertEqual(bitmaps.size, 50)
+        for where in [{"type": "a"}, {"type": ["a", "b"], "page": 2}, {"page": [0, 3]}, {"type": "z"}, {}]:
+            np.testing.assert_array_equal(bitmaps.mask(where), expected.mask(where))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "chatbot"))
+
+try:
+    from langchain.memory import ConversationBufferMemory
+    # rag_langchain puts the LangChainRag directory first on sys.path, so "chatbot" is ResumeChatbot's module
+    from rag_langchain import LangChainRAGAdapter
+    from embedding_batcher import EmbeddingMicroBatcher
+    from chatbot import RETRIEVAL_CONFIG, ResumeChatbot
+except ImportError:  # langchain is not installed
+    LangChainRAGAdapter = None
+
+
+class SlowGenerator:
+    """Generator that records how many generations overlap."""
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def generate_response(self, prompt, stream=False):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.05)
+        with self._lock:
+            self.active -= 1
+        question = prompt.split("Current Question: ")[1].split("\n")[0]
+        return f"answer to {question}"
+
+
+@unittest.skipIf(LangChainRAGAdapter is None, "langchain is not installed")
+class TestConcurrentQueries(unittest.TestCase):
+    """Concurrent aquery calls retrieve in parallel but never interleave conversation turns."""
+
+    def setUp(self):
+        chatbot = ResumeChatbot.__new__(ResumeChatbot)
+        chatbot.retrieval_config = dict(RETRIEVAL_CONFIG)
+        chatbot.memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True,
+                                                  output_key="answer")
+        chatbot.conversation_history = []
+        chatbot._chat_lock = threading.Lock()
+        chatbot.generator = SlowGenerator()
+        chatbot.retrieve = lambda query, top_k, query_vector=None: [
+            {"content": f"context for {query}", "metadata": {}, "rank": 1}
+        ]
+
+        self.adapter = LangChainRAGAdapter.__new__(LangChainRAGAdapter)
+        self.adapter.chatbot = chatbot
+        self.adapter.embedding_batcher = mock.Mock(embed_query=mock.AsyncMock(return_value=[0.0, 1.0]))
+
+    def test_history_stays_consistent(self):
+        questions = [f"question {i}" for i in range(4)]
+
+        async def run():
+            return await asyncio.gather(*(self.adapter.aquery(question, mode="vector") for question in questions))
+
+        results = asyncio.run(run())
+        self.assertTrue(all(result["success"] for result in results))
+        for question, result in zip(questions, results):
+            self.assertEqual(result["answer"], f"answer to {question}")
+        self.assertEqual(self.adapter.chatbot.generator.max_active, 1)
+
+        history = self.adapter.get_conversation_history()
+        self.assertEqual(len(history), 2 * len(questions))
+        for user, assistant in zip(history[::2], history[1::2]):
+            self.assertEqual((user["role"], assistant["role"]), ("user", "assistant"))
+            self.assertEqual(assistant["content"], f"answer to {user['content']}")
+        messages = self.adapter.chatbot.memory.load_memory_variables({})["chat_history"]
+        self.assertEqual([message.content for message in messages], [turn["content"] for turn in history])
+
+
+class ConstantEmbeddings:
+    def __init__(self, value):
+        self.value = value
+
+    def embed_documents(self, texts):
+        return [[self.value] for _ in texts]
+
+    def embed_query(self, text):
+        return [self.value]
+
+
+@unittest.skipIf(LangChainRAGAdapter is None, "langchain is not installed")
+class TestBatcherFollowsIndexSwap(unittest.TestCase):
+    """The micro-batcher embeds with the model of the vector store currently served."""
+
+    def test_batches_use_the_current_model(self):
+        vectordb = mock.Mock(embeddings=ConstantEmbeddings(1.0))
+        batcher = EmbeddingMicroBatcher(lambda: vectordb.embeddings, max_wait_ms=0)
+
+        async def run():
+            before = await batcher.embed_query("q")
+            vectordb.embeddings = ConstantEmbeddings(2.0)
+            return before, await batcher.embed_query("q")
+
+        self.assertEqual(asyncio.run(run()), ([1.0], [2.0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,8 +6,8 @@
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, field_validator
+from typing import Optional, List
 import time
 import uuid
 import logging
@@ -62,6 +62,18 @@ class HistoryResponse(BaseModel):
     history: list
     count: int
 
+class ResumeRecordModel(BaseModel):
+    type: Optional[str] = None
+    company_organization: Optional[str] = None
+    position_title: Optional[str] = None
+    context: Optional[str] = None
+    
+    @field_validator("*")
+    @classmethod
+    def null_as_empty(cls, value: Optional[str]) -> str:
+        """显式给出的null按空字符串保存，而不是字符串"None"；未给出的字段不受影响"""
+        return "" if value is None else value
+
 # 初始化RAG系统
 logger.info("正在初始化RAG系统...")
 try:
@@ -282,6 +294,9 @@ async def reload_rag_system(xlsx_path: Optional[str] = None):
     
     try:
         logger.info(f"重新加载RAG系统: xlsx_path={xlsx_path}")
+        if rag_system is not None and rag_system.unpersisted_changes:
+            # 先保存未持久化的记录修改，以同一数据源重新加载时从快照恢复
+            rag_system.persist_changes()
         rag_system = ResumeRAGCore(xlsx_path or DEFAULT_EXCEL_PATH)
         
         return {
@@ -294,6 +309,93 @@ async def reload_rag_system(xlsx_path: Optional[str] = None):
         logger.error(f"重新加载RAG系统失败: {e}")
         raise HTTPException(status_code=500, detail=f"重新加载RAG系统失败: {str(e)}")
 
+# /system/records 的修改只作用于内存中的索引（增量追加和删除标记），响应中的 unpersisted_changes
+# 字段为尚未保存的修改条数。保存会合并索引并重写整份快照，耗时与语料规模成正比，因此不在每次
+# 修改时执行：一批修改之后调用 POST /system/records/persist，/system/reload 和服务关闭前也会
+# 自动保存。保存后的修改在重启和重新加载后仍然有效；数据源Excel文件变化、未启用快照或使用样例数据时
+# 修改只保留在内存中
+
+@app.post("/system/records")
+async def add_records(records: List[ResumeRecordModel]):
+    """
+    增量添加简历记录 (管理功能)
+    """
+    if rag_system is None:
+        raise HTTPException(status_code=503, detail="RAG系统不可用")
+    
+    start_time = time.perf_counter()
+    indexes = rag_system.add_records([record.model_dump(exclude_unset=True) for record in records])
+    return {
+        "message": f"已添加{len(indexes)}条记录",
+        "indexes": indexes,
+        "unpersisted_changes": rag_system.unpersisted_changes,
+        "elapsed_ms": (time.perf_counter() - start_time) * 1000
+    }
+
+@app.put("/system/records/{index}")
+async def update_record(index: int, record: ResumeRecordModel):
+    """
+    增量更新简历记录，只修改请求中给出的字段 (管理功能)
+    """
+    if rag_system is None:
+        raise HTTPException(status_code=503, detail="RAG系统不可用")
+    
+    start_time = time.perf_counter()
+    try:
+        rag_system.update_record(index, record.model_dump(exclude_unset=True))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"记录不存在: {index}")
+    return {
+        "message": "记录已更新",
+        "index": index,
+        "unpersisted_changes": rag_system.unpersisted_changes,
+        "elapsed_ms": (time.perf_counter() - start_time) * 1000
+    }
+
+@app.delete("/system/records/{index}")
+async def delete_record(index: int):
+    """
+    增量删除简历记录 (管理功能)
+    """
+    if rag_system is None:
+        raise HTTPException(status_code=503, detail="RAG系统不可用")
+    
+    start_time = time.perf_counter()
+    try:
+        rag_system.delete_record(index)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"记录不存在: {index}")
+    return {
+        "message": "记录已删除",
+        "index": index,
+        "unpersisted_changes": rag_system.unpersisted_changes,
+        "elapsed_ms": (time.perf_counter() - start_time) * 1000
+    }
+
+@app.post("/system/records/persist")
+async def persist_records():
+    """
+    把 /system/records 的修改写入索引快照 (管理功能)
+    """
+    if rag_system is None:
+        raise HTTPException(status_code=503, detail="RAG系统不可用")
+    
+    start_time = time.perf_counter()
+    changes = rag_system.unpersisted_changes
+    persisted = rag_system.persist_changes()
+    return {
+        "message": f"已保存{changes}条修改" if persisted else "修改未能保存，仅保留在内存中",
+        "persisted": persisted,
+        "unpersisted_changes": rag_system.unpersisted_changes,
+        "elapsed_ms": (time.perf_counter() - start_time) * 1000
+    }
+
+@app.on_event("shutdown")
+def persist_on_shutdown():
+    """服务关闭前保存尚未持久化的记录修改"""
+    if rag_system is not None and rag_system.unpersisted_changes:
+        rag_system.persist_changes()
+
 # 错误处理器
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
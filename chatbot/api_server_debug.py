@@ -266,16 +266,22 @@ async def update_debug_config(new_config: dict):
 @app.get("/debug/test")
 async def debug_test():
     """调试测试端点"""
+    if rag_system is None:
+        raise HTTPException(status_code=503, detail="RAG系统不可用")
+    
     test_queries = [
         "What work experience do you have?",
         "Tell me about your projects",
         "What technologies do you know?"
     ]
     
+    # 一次性批量检索所有测试查询
+    batch_retrieved = rag_system.retrieve_many(test_queries)
+    
     results = []
-    for query in test_queries:
+    for query, retrieved_docs in zip(test_queries, batch_retrieved):
         try:
-            result = rag_system.query(query, stream=False)
+            result = rag_system.query(query, stream=False, retrieved_docs=retrieved_docs)
             results.append({
                 "query": query,
                 "success": result['success'],
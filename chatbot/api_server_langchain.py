@@ -7,7 +7,8 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional
+from typing import Literal, Optional
+import asyncio
 import time
 import uuid
 import logging
@@ -42,6 +43,8 @@ class Message(BaseModel):
     text: str
     session_id: Optional[str] = None
     user_id: Optional[str] = None
+    # 检索模式: vector 向量检索 / keyword 关键词检索 / hybrid 两者并发后RRF融合；未指定时使用配置默认值
+    retrieval_mode: Optional[Literal["vector", "keyword", "hybrid"]] = None
 
 class ChatResponse(BaseModel):
     reply: str
@@ -49,6 +52,7 @@ class ChatResponse(BaseModel):
     conversation_id: Optional[str] = None
     response_time: float
     retrieved_count: int
+    retrieval_mode: Optional[str] = None
     success: bool
 
 class HealthResponse(BaseModel):
@@ -80,6 +84,44 @@ try:
 except ImportError as e:
     logger.warning(f"无法加载管理API路由: {e}")
 
+async def watch_index_versions(interval: float):
+    """定期检查 CURRENT 指针，发现新的索引版本时在线程池中热切换"""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await loop.run_in_executor(None, rag_system.reload_index)
+        except Exception as e:
+            # 新索引加载失败时继续使用当前索引
+            logger.error(f"索引热切换失败: {e}")
+
+async def keep_index_lease(interval: float):
+    """不自动切换索引时定期续约当前索引版本的租约，使其不被清理"""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        await loop.run_in_executor(None, rag_system.renew_index_lease)
+
+@app.on_event("startup")
+async def start_index_watcher():
+    """启动索引版本检查任务（每次检查同时续约索引版本租约）"""
+    if rag_system is None:
+        return
+    interval = API_CONFIG["index_reload_interval"]
+    if interval > 0:
+        app.state.index_watcher = asyncio.create_task(watch_index_versions(interval))
+    else:
+        app.state.index_watcher = asyncio.create_task(keep_index_lease(API_CONFIG["index_lease_interval"]))
+
+@app.on_event("shutdown")
+async def stop_index_watcher():
+    """停止索引版本检查任务并释放索引版本租约"""
+    watcher = getattr(app.state, "index_watcher", None)
+    if watcher is not None:
+        watcher.cancel()
+    if rag_system is not None:
+        rag_system.close()
+
 @app.get("/")
 async def root():
     """
@@ -95,6 +137,7 @@ async def root():
             "chat": "POST /chat - 发送消息给聊天机器人",
             "history": "GET /history/{session_id} - 获取对话历史",
             "health": "GET /health - 检查API健康状态",
+            "reload_index": "POST /reload_index - 切换到最新发布的向量索引版本",
             "admin": "GET /admin/* - 管理功能 (需要权限)"
         },
         "features": [
@@ -191,8 +234,8 @@ async def chat(message: Message):
     try:
         logger.info(f"处理聊天请求: session_id={session_id}, query='{message.text[:50]}...'")
         
-        # 使用 LangChain RAG 系统处理查询
-        rag_result = rag_system.query(message.text, stream=False, top_k=5)
+        # 使用 LangChain RAG 系统处理查询（查询向量与并发请求合并计算，检索和生成不阻塞事件循环）
+        rag_result = await rag_system.aquery(message.text, stream=False, top_k=5, mode=message.retrieval_mode)
         
         if not rag_result['success']:
             logger.error(f"RAG查询失败: {rag_result.get('error', 'Unknown error')}")
@@ -226,6 +269,7 @@ async def chat(message: Message):
             conversation_id=str(conversation_id) if conversation_id else None,
             response_time=total_response_time,
             retrieved_count=rag_result['retrieved_count'],
+            retrieval_mode=rag_result.get('retrieval_mode'),
             success=True
         )
         
@@ -238,6 +282,20 @@ async def chat(message: Message):
             detail=f"处理请求时发生错误: {str(e)}"
         )
 
+@app.post("/reload_index")
+async def reload_index():
+    """
+    切换到最新发布的向量索引版本
+    新索引加载、预热完成后才替换，正在处理的请求继续使用旧索引
+    """
+    if rag_system is None:
+        raise HTTPException(status_code=503, detail="RAG 系统不可用")
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, rag_system.reload_index)
+    except Exception as e:
+        logger.error(f"索引热切换失败: {e}")
+        raise HTTPException(status_code=500, detail=f"索引热切换失败: {str(e)}")
+
 @app.post("/clear_history/{session_id}")
 async def clear_session_history(session_id: str):
     """
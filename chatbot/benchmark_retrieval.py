@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+检索性能基准测试
+使用合成简历数据对比全量线性扫描、倒排索引（python引擎）、稀疏矩阵（sparse引擎）、批量检索、BM25
+和元数据过滤的延迟，并校验keyword打分的各实现结果一致
+"""
+
+import random
+import sys
+import time
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from rag_core import ResumeRAGCore
+
+DEFAULT_SIZES = [10, 10_000, 1_000_000]
+
+BENCHMARK_QUERIES = [
+    "What work experience do you have at Baidu?",
+    "Tell me about your machine learning projects",
+    "What technologies have you used for data analysis?",
+    "Describe your achievements at Apple",
+    "What deep learning experience do you have?",
+    "learn",
+    "skill42 experience",
+    "Have you used Scrapy or PyQt5?",
+    "你在Baidu做了哪些data pipeline的工作？",
+]
+
+TYPES = ["Work", "Project", "Education"]
+COMPANIES = ["Baidu Inc.", "Apple Inc.", "Michelin(China) Investment Co. Ltd.", "Machine Learning Course"]
+TITLES = ["AI/ML Engineer", "Data Scientist", "Information Technology Intern", "Research Assistant"]
+
+
+def make_synthetic_data(n_records: int, base_words: List[str], seed: int = 42) -> pd.DataFrame:
+    """
+    生成合成简历数据
+
+    词汇由样例简历中的真实词汇和大量长尾合成词组成，按Zipf分布抽样模拟多份简历的词频分布
+    """
+    rng = random.Random(seed)
+    rare_words = [f"skill{i}" for i in range(max(n_records // 10, 100))]
+    base_weights = [1 / rank for rank in range(1, len(base_words) + 1)]
+
+    records = []
+    for _ in range(n_records):
+        words = rng.choices(base_words, weights=base_weights, k=25) + rng.choices(rare_words, k=5)
+        records.append({
+            "type": rng.choice(TYPES),
+            "company_organization": rng.choice(COMPANIES),
+            "position_title": rng.choice(TITLES),
+            "context": " ".join(words),
+        })
+    return pd.DataFrame(records)
+
+
+def build_linear_docs(rag: ResumeRAGCore) -> List[Dict[str, Any]]:
+    """为对照组预先计算每个文档的小写文本和词汇集合"""
+    docs = []
+    for doc_id in range(len(rag.doc_store)):
+        content_lower = rag.doc_store.content(doc_id).lower()
+        content_words = set(rag._tokenize(content_lower))
+        docs.append({
+            'index': rag.doc_store.label(doc_id),
+            'content_lower': content_lower,
+            'content_words': content_words,
+            'content_length': len(content_words)
+        })
+    return docs
+
+
+def linear_retrieve(rag: ResumeRAGCore, linear_docs: List[Dict[str, Any]], query: str,
+                    top_k: int) -> List[Dict[str, Any]]:
+    """不使用倒排索引的全量扫描检索，作为对照组"""
+    query_lower = query.lower()
+    query_words = set(rag._tokenize(query_lower))
+
+    results = []
+    for item in linear_docs:
+        score = rag._calculate_similarity_score(
+            query_words,
+            query_lower,
+            item['content_words'],
+            item['content_lower'],
+            item['content_length']
+        )
+        if score > rag.rag_config["min_score_threshold"]:
+            results.append({'score': score, 'index': item['index']})
+
+    results.sort(key=lambda x: x['score'], reverse=True)
+    return results[:top_k]
+
+
+def retrieve_with(rag: ResumeRAGCore, query: str, top_k: int, **rag_config) -> List[Dict[str, Any]]:
+    """使用临时覆盖的检索配置执行一次检索"""
+    previous = {key: rag.rag_config[key] for key in rag_config}
+    rag.update_config({"rag": rag_config})
+    try:
+        return rag.retrieve(query, top_k)
+    finally:
+        rag.update_config({"rag": previous})
+
+
+def time_per_query(fn, queries: List[str], repeat: int) -> float:
+    """返回平均每次查询耗时（毫秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            fn(query)
+    return (time.perf_counter() - start) * 1000 / (repeat * len(queries))
+
+
+def run_benchmark(sizes: List[int], top_k: int = 5):
+    """运行基准测试并打印结果"""
+    rag = ResumeRAGCore()
+    # 线性扫描对照组不做元数据过滤，一致性校验时关闭过滤
+    rag.update_config({"rag": {"metadata_filter": False}})
+    base_words = sorted(rag.keyword_index.term_ids)
+
+    print(f"\n{'记录数':>10} | {'构建(s)':>8} | {'线性扫描(ms)':>12} | {'python(ms)':>10} | "
+          f"{'sparse(ms)':>10} | {'批量(ms)':>8} | {'BM25(ms)':>9} | {'过滤(ms)':>8} | 结果一致")
+    print("-" * 112)
+
+    engines = {
+        "python": lambda q: retrieve_with(rag, q, top_k, engine="python", scoring="keyword"),
+        "sparse": lambda q: retrieve_with(rag, q, top_k, engine="sparse", scoring="keyword"),
+        "bm25": lambda q: retrieve_with(rag, q, top_k, scoring="bm25"),
+        "filtered": lambda q: retrieve_with(rag, q, top_k, engine="python", scoring="keyword", metadata_filter=True),
+    }
+
+    for n_records in sizes:
+        rag.data = make_synthetic_data(n_records, base_words)
+        start = time.perf_counter()
+        rag._preprocess_data()
+        build_time = time.perf_counter() - start
+        linear_docs = build_linear_docs(rag)
+
+        identical = all(
+            [(r['score'], r['index']) for r in engines[engine](q)] ==
+            [(r['score'], r['index']) for r in linear_retrieve(rag, linear_docs, q, top_k)]
+            for q in BENCHMARK_QUERIES
+            for engine in ("python", "sparse")
+        ) and all(
+            [(r['score'], r['index']) for r in batch_result] ==
+            [(r['score'], r['index']) for r in linear_retrieve(rag, linear_docs, q, top_k)]
+            for q, batch_result in zip(BENCHMARK_QUERIES, rag.retrieve_many(BENCHMARK_QUERIES, top_k))
+        )
+
+        # 大语料上减少重复次数，保持总耗时可控
+        repeat = max(1, 1000 // max(n_records, 1))
+        linear_ms = time_per_query(lambda q: linear_retrieve(rag, linear_docs, q, top_k), BENCHMARK_QUERIES, repeat)
+        engine_ms = {name: time_per_query(fn, BENCHMARK_QUERIES, repeat) for name, fn in engines.items()}
+
+        batch_queries = BENCHMARK_QUERIES * repeat
+        start = time.perf_counter()
+        rag.retrieve_many(batch_queries, top_k)
+        batch_ms = (time.perf_counter() - start) * 1000 / len(batch_queries)
+
+        print(f"{n_records:>10} | {build_time:>8.2f} | {linear_ms:>12.3f} | {engine_ms['python']:>10.3f} | "
+              f"{engine_ms['sparse']:>10.3f} | {batch_ms:>8.3f} | {engine_ms['bm25']:>9.3f} | {engine_ms['filtered']:>8.3f} | {'✅' if identical else '❌'}")
+
+
+def main():
+    """主函数"""
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print("🏁 关键词检索基准测试")
+    print("=" * 60)
+    run_benchmark(sizes)
+
+
+if __name__ == "__main__":
+    main()
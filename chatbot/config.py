@@ -18,7 +18,25 @@ RAG_CONFIG = {
     "keyword_weight": 0.6,
     "exact_match_weight": 0.3,
     "length_bonus_weight": 0.1,
-    "min_score_threshold": 0.1
+    "min_score_threshold": 0.1,
+    "engine": "python",  # keyword打分的执行引擎: "python": 逐文档打分; "sparse": 稀疏矩阵向量化打分
+    "scoring": "keyword",  # "keyword": 关键词重叠+子串匹配+长度奖励; "bm25": BM25
+    "bm25_k1": 1.5,
+    "bm25_b": 0.75,
+    "tokenizer": "cjk_bigram",  # "word": 按\w+切分; "cjk_bigram": 拉丁文字按词、中日韩文字按相邻二字组切分
+    "snapshot_dir": ".rag_index",  # 索引快照目录（相对路径时位于数据文件所在目录），为None时不使用快照
+    "metadata_filter": False,  # 查询中提到公司、类型等取值时只在匹配的记录中检索，过滤后无结果时退回全量检索
+    "filter_fields": ["type", "company_organization"],  # 建立位图索引、参与查询实体匹配的字段
+    "alias_fields": ["company_organization"]  # 取值可由单个区分性词触发过滤的字段（如 "baidu"），其他字段须写出完整的多词取值
+}
+
+# Hybrid Retrieval Configuration
+HYBRID_CONFIG = {
+    "default_mode": "vector",  # /chat 未指定时的检索模式: "vector" | "keyword" | "hybrid"
+    "rrf_k": 60,  # 倒数排名融合的平滑常数
+    "candidate_multiplier": 2,  # 融合前每个引擎返回 top_k * candidate_multiplier 个候选
+    "weights": {"keyword": 1.0, "vector": 1.0},  # 各引擎在融合中的权重
+    "max_workers": 4  # 并发检索的线程数，为None时等于引擎数
 }
 
 # Default Excel file path
@@ -38,5 +56,7 @@ API_CONFIG = {
     "cors_origins": ["*"],
     "cors_credentials": True,
     "cors_methods": ["*"],
-    "cors_headers": ["*"]
+    "cors_headers": ["*"],
+    "index_reload_interval": 30,  # 检查向量索引新版本的间隔（秒），0 表示只通过 POST /reload_index 切换
+    "index_lease_interval": 60  # 不自动切换时续约索引版本租约的间隔（秒），须小于租约超时 INDEX_LEASE_TIMEOUT
 }
\ No newline at end of file
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Columnar Document Store for Resume RAG
+列式文档存储：按字段保存驻留字符串，替代每条记录一个 pandas.Series 的存储方式
+"""
+
+import json
+import mmap
+import os
+import sys
+from typing import Any, Dict, Hashable, List, Mapping, Optional, Sequence, Set
+
+import numpy as np
+import pandas as pd
+
+# 拼接检索文本时使用的字段及顺序
+CONTENT_FIELDS = ["type", "company_organization", "position_title", "context"]
+
+
+class ResumeRecord:
+    """
+    单条简历记录的轻量视图
+    提供与 pandas.Series 相同的 get/[] 访问方式，检索结果中的 'data' 字段即为该对象
+    """
+
+    __slots__ = ("_store", "doc_id")
+
+    def __init__(self, store: "DocumentStore", doc_id: int):
+        self._store = store
+        self.doc_id = doc_id
+
+    def get(self, field: str, default: Any = None) -> Any:
+        column = self._store.columns.get(field)
+        return default if column is None else column[self.doc_id]
+
+    def __getitem__(self, field: str) -> Any:
+        return self._store.columns[field][self.doc_id]
+
+    def __contains__(self, field: str) -> bool:
+        return field in self._store.columns
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: column[self.doc_id] for field, column in self._store.columns.items()}
+
+    def __repr__(self) -> str:
+        return f"ResumeRecord({self.to_dict()})"
+
+
+class MappedStringColumn:
+    """
+    以只读 mmap 方式加载的字符串列
+    所有值的 UTF-8 编码首尾相接存放在一个文件中，offsets[i]:offsets[i + 1] 为第 i 个值的字节区间，
+    多个进程加载同一文件时共享操作系统页缓存
+    """
+
+    def __init__(self, blob_path: str, offsets: np.ndarray):
+        self.offsets = offsets
+        self._num_mapped = len(offsets) - 1
+        # 加载后新增的值保存在内存中
+        self._appended: List[str] = []
+        with open(blob_path, "rb") as f:
+            # 空文件不能被 mmap
+            self._blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if offsets[-1] else b""
+
+    def __len__(self) -> int:
+        return self._num_mapped + len(self._appended)
+
+    def __getitem__(self, doc_id: int) -> str:
+        if doc_id >= self._num_mapped:
+            return self._appended[doc_id - self._num_mapped]
+        return self._blob[self.offsets[doc_id]:self.offsets[doc_id + 1]].decode("utf-8")
+
+    def append(self, value: str):
+        self._appended.append(value)
+
+
+class DocumentStore:
+    """
+    列式文档存储
+    columns[field][doc_id] 为该记录字段值的字符串形式；重复出现的值（公司、职位等）
+    通过 sys.intern 共享同一对象。
+    文档id与倒排索引一致，删除的记录只记入 deleted，id不会被复用
+    """
+
+    def __init__(self):
+        self.columns: Dict[str, Sequence[str]] = {}
+        self.labels: List[Hashable] = []
+        self.deleted: Set[int] = set()
+        # 原始索引 -> 未删除记录的文档id，首次按索引查找时建立
+        self._label_ids: Optional[Dict[Hashable, int]] = None
+        self._next_label: Optional[int] = None
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "DocumentStore":
+        """按列从 DataFrame 构建文档存储，避免逐行 iterrows"""
+        store = cls()
+        store.labels = df.index.tolist()
+        for field in df.columns:
+            store.columns[str(field)] = [sys.intern(f"{value}") for value in df[field].tolist()]
+        return store
+
+    def save(self, directory: str):
+        """
+        将文档存储写入目录：每个字段保存为 UTF-8 拼接文件和 .npy 偏移数组，
+        字段名与记录索引保存在 doc_store.json 中
+
+        Args:
+            directory: 已存在的目标目录
+        """
+        fields = list(self.columns)
+        for field_id, field in enumerate(fields):
+            encoded = [value.encode("utf-8") for value in self.columns[field]]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(value) for value in encoded], out=offsets[1:])
+            with open(os.path.join(directory, f"column_{field_id}.bin"), "wb") as f:
+                f.write(b"".join(encoded))
+            np.save(os.path.join(directory, f"column_{field_id}_offsets.npy"), offsets)
+
+        with open(os.path.join(directory, "doc_store.json"), "w", encoding="utf-8") as f:
+            json.dump({"fields": fields, "labels": self.labels, "deleted": sorted(self.deleted)},
+                      f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory: str) -> "DocumentStore":
+        """从 save() 写出的目录以 mmap 方式加载文档存储"""
+        with open(os.path.join(directory, "doc_store.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+
+        store = cls()
+        store.labels = meta["labels"]
+        store.deleted = set(meta.get("deleted", []))
+        for field_id, field in enumerate(meta["fields"]):
+            offsets = np.load(os.path.join(directory, f"column_{field_id}_offsets.npy"), mmap_mode="r")
+            store.columns[field] = MappedStringColumn(os.path.join(directory, f"column_{field_id}.bin"), offsets)
+        return store
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """还原为 DataFrame（不含已删除记录），字段值均为字符串形式"""
+        doc_ids = self.live_doc_ids()
+        return pd.DataFrame(
+            {field: [column[doc_id] for doc_id in doc_ids] for field, column in self.columns.items()},
+            index=[self.labels[doc_id] for doc_id in doc_ids]
+        )
+
+    def live_doc_ids(self) -> List[int]:
+        """未删除记录的文档id"""
+        return [doc_id for doc_id in range(len(self)) if doc_id not in self.deleted]
+
+    def add(self, record: Mapping[str, Any], label: Optional[Hashable] = None) -> int:
+        """
+        追加一条记录
+
+        Args:
+            record: 字段 -> 值，缺失的已有字段和值为None的字段记为空字符串，新字段会补齐为新列
+            label: 记录索引，为None时使用现有整数索引的最大值加一
+
+        Returns:
+            新记录的文档id
+        """
+        doc_id = len(self)
+        for field in record:
+            if str(field) not in self.columns:
+                self.columns[str(field)] = [""] * doc_id
+        values = {str(field): "" if value is None else value for field, value in record.items()}
+        for field, column in self.columns.items():
+            column.append(sys.intern(f"{values[field]}") if field in values else "")
+
+        if label is None:
+            if self._next_label is None:
+                self._next_label = max((l for l in self.labels if isinstance(l, int)), default=-1) + 1
+            label = self._next_label
+            self._next_label += 1
+        self.labels.append(label)
+        if self._label_ids is not None:
+            self._label_ids[label] = doc_id
+        return doc_id
+
+    def delete(self, doc_id: int):
+        """标记记录为已删除"""
+        self.deleted.add(doc_id)
+        if self._label_ids is not None and self._label_ids.get(self.labels[doc_id]) == doc_id:
+            del self._label_ids[self.labels[doc_id]]
+
+    def doc_id(self, label: Hashable) -> int:
+        """
+        按原始索引查找未删除记录的文档id
+
+        Raises:
+            KeyError: 记录不存在或已删除
+        """
+        if self._label_ids is None:
+            self._label_ids = {self.labels[doc_id]: doc_id for doc_id in self.live_doc_ids()}
+        return self._label_ids[label]
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def record(self, doc_id: int) -> ResumeRecord:
+        """获取记录视图"""
+        return ResumeRecord(self, doc_id)
+
+    def label(self, doc_id: int) -> Hashable:
+        """获取记录在原始数据中的索引"""
+        return self.labels[doc_id]
+
+    def content(self, doc_id: int) -> str:
+        """拼接用于检索的文本，缺失字段按空字符串处理"""
+        return " ".join(self._field_or_empty(field, doc_id) for field in CONTENT_FIELDS)
+
+    def _field_or_empty(self, field: str, doc_id: int) -> str:
+        column: Optional[Sequence[str]] = self.columns.get(field)
+        return "" if column is None else column[doc_id]
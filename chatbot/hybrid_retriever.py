@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Hybrid Retriever for Resume RAG
+混合检索：并发运行关键词检索和向量检索，用倒数排名融合（RRF）合并为一个 top k 结果
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from config import HYBRID_CONFIG
+
+logger = logging.getLogger(__name__)
+
+RETRIEVAL_MODES = ("vector", "keyword", "hybrid")
+
+# 检索函数: (query, top_k, **engine_kwargs) -> 文档列表，每个文档至少包含content字段
+SearchFn = Callable[[str, int], List[Dict[str, Any]]]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], k: int = 60,
+                           weights: Optional[Sequence[float]] = None) -> List[Tuple[Hashable, float]]:
+    """
+    倒数排名融合
+
+    每个排名列表中位置为rank（从1开始）的条目得分 weight / (k + rank)，各列表得分相加。
+    只依赖名次，不需要对不同引擎的分数做校准
+
+    Args:
+        rankings: 多个排名列表，列表内为文档键，按相关度降序
+        k: 平滑常数，越大排名靠后的文档权重衰减越慢
+        weights: 每个排名列表的权重，默认均为1
+
+    Returns:
+        (文档键, 融合得分)列表，按得分降序，同分按首次出现顺序
+    """
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[Hashable, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + weight / (k + rank)
+    # sorted 是稳定排序，字典保留插入顺序
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridRetriever:
+    """
+    混合检索器
+    并发调用多个检索引擎，延迟约为最慢引擎的耗时而不是各引擎耗时之和
+    """
+
+    def __init__(self, engines: Dict[str, SearchFn], config: Optional[Dict] = None):
+        """
+        初始化混合检索器
+
+        Args:
+            engines: 引擎名称到检索函数的映射，如{"keyword": ..., "vector": ...}
+            config: 可选配置，覆盖HYBRID_CONFIG中的值
+        """
+        self.engines = engines
+        self.config = {**HYBRID_CONFIG, **(config or {})}
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.config["max_workers"] or len(engines),
+            thread_name_prefix="hybrid-retriever"
+        )
+
+    def retrieve(self, query: str, top_k: int = 5, mode: str = "hybrid",
+                 engine_kwargs: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """
+        检索相关文档
+
+        Args:
+            query: 查询字符串
+            top_k: 返回数量
+            mode: "hybrid"时融合全部引擎，否则只使用同名引擎
+            engine_kwargs: 引擎名称到额外参数的映射，如{"vector": {"query_vector": ...}}
+
+        Returns:
+            文档列表，每个文档包含content、metadata、rank、score、sources字段
+        """
+        engine_kwargs = engine_kwargs or {}
+        if mode != "hybrid":
+            if mode not in self.engines:
+                raise ValueError(f"未知的检索模式: {mode}，可选: {RETRIEVAL_MODES}")
+            docs = self.engines[mode](query, top_k, **engine_kwargs.get(mode, {}))
+            return [{**doc, 'rank': rank, 'sources': [mode]} for rank, doc in enumerate(docs, start=1)]
+
+        start_time = time.time()
+        # 每个引擎多取一些候选，融合后排名靠前的文档更稳定
+        n_candidates = top_k * self.config["candidate_multiplier"]
+        futures = {
+            name: self._executor.submit(search, query, n_candidates, **engine_kwargs.get(name, {}))
+            for name, search in self.engines.items()
+        }
+
+        results: Dict[str, List[Dict[str, Any]]] = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                # 单个引擎失败时退化为其余引擎的结果
+                logger.warning(f"{name}检索失败，忽略该引擎: {e}")
+
+        docs_by_key: Dict[str, Dict[str, Any]] = {}
+        sources: Dict[str, List[str]] = {}
+        rankings = []
+        weights = []
+        for name, docs in results.items():
+            ranking = []
+            seen = set()
+            for doc in docs:
+                # 两个引擎返回的相同文本视为同一文档
+                key = doc['content']
+                # 同一引擎返回的重复文本（如内容相同的多条记录）只保留排名最靠前的一条，避免在融合中重复计分
+                if key in seen:
+                    continue
+                seen.add(key)
+                docs_by_key.setdefault(key, doc)
+                sources.setdefault(key, []).append(name)
+                ranking.append(key)
+            rankings.append(ranking)
+            weights.append(self.config["weights"].get(name, 1.0))
+
+        fused = reciprocal_rank_fusion(rankings, self.config["rrf_k"], weights)[:top_k]
+        logger.debug(f"混合检索完成，耗时{time.time() - start_time:.3f}s，"
+                     f"各引擎结果数: { {name: len(docs) for name, docs in results.items()} }")
+
+        return [
+            {**docs_by_key[key], 'rank': rank, 'score': score, 'sources': sources[key]}
+            for rank, (key, score) in enumerate(fused, start=1)
+        ]
+
+    def close(self):
+        """关闭线程池"""
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Retrieval Index Snapshot for Resume RAG
+检索索引快照：把文档存储和倒排索引按数据源文件的哈希持久化到磁盘，
+启动时以 mmap 方式加载，数据源未变化时跳过 Excel 解析和分词
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from typing import Optional, Tuple
+
+from doc_store import DocumentStore
+from keyword_index import KeywordIndex
+
+logger = logging.getLogger(__name__)
+
+# 快照文件格式版本，索引结构或分词规则变化时递增，旧快照自动失效
+FORMAT_VERSION = 2
+
+META_FILE = "meta.json"
+TMP_PREFIX = ".tmp-"
+
+
+def source_fingerprint(source_path: str, tokenizer: str, chunk_size: int = 1 << 20) -> str:
+    """
+    计算数据源文件的指纹：文件内容、分词器与快照格式版本的 SHA-256
+
+    Args:
+        source_path: 数据源文件路径
+        tokenizer: 构建索引使用的分词器名称
+        chunk_size: 分块读取的字节数
+
+    Returns:
+        十六进制指纹字符串
+    """
+    digest = hashlib.sha256(f"v{FORMAT_VERSION}:{tokenizer}:".encode("utf-8"))
+    with open(source_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def resolve_snapshot_dir(snapshot_dir: str, source_path: str) -> str:
+    """相对路径的快照目录放在数据源文件所在目录下"""
+    if os.path.isabs(snapshot_dir):
+        return snapshot_dir
+    return os.path.join(os.path.dirname(os.path.abspath(source_path)), snapshot_dir)
+
+
+def load_snapshot(snapshot_dir: str, fingerprint: str) -> Optional[Tuple[DocumentStore, KeywordIndex]]:
+    """
+    加载与指纹匹配的快照
+
+    Args:
+        snapshot_dir: 快照根目录
+        fingerprint: 数据源指纹
+
+    Returns:
+        (doc_store, keyword_index)；快照不存在或已损坏时返回None
+    """
+    path = os.path.join(snapshot_dir, fingerprint)
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION or meta.get("fingerprint") != fingerprint:
+            return None
+        return DocumentStore.load(path), KeywordIndex.load(path)
+    except Exception as e:
+        logger.warning(f"加载索引快照失败，将重新构建: {e}")
+        return None
+
+
+def save_snapshot(snapshot_dir: str, fingerprint: str, doc_store: DocumentStore,
+                  keyword_index: KeywordIndex, replace: bool = False):
+    """
+    保存快照
+
+    先写入临时目录，再原子重命名为以指纹命名的目录，多个进程同时构建时
+    读者只会看到完整的快照；重命名成功后清理其他指纹的旧快照
+
+    Args:
+        snapshot_dir: 快照根目录
+        fingerprint: 数据源指纹
+        doc_store: 文档存储
+        keyword_index: finalize 后的倒排索引
+        replace: 覆盖同一指纹的已有快照（保存增量修改后的索引）；为False时保留已有快照
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    final_path = os.path.join(snapshot_dir, fingerprint)
+    tmp_path = tempfile.mkdtemp(prefix=TMP_PREFIX, dir=snapshot_dir)
+    try:
+        doc_store.save(tmp_path)
+        keyword_index.save(tmp_path)
+        # meta.json 最后写入，作为快照完整的标记
+        with open(os.path.join(tmp_path, META_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "format_version": FORMAT_VERSION,
+                "fingerprint": fingerprint,
+                "num_docs": len(doc_store),
+                "num_terms": len(keyword_index),
+            }, f)
+        if replace and os.path.exists(final_path):
+            # 目录不能原子覆盖：旧快照先移到临时名再删除，已 mmap 的文件在删除后仍可读取
+            stale_path = tempfile.mkdtemp(prefix=TMP_PREFIX, dir=snapshot_dir)
+            os.replace(final_path, os.path.join(stale_path, fingerprint))
+            os.replace(tmp_path, final_path)
+            shutil.rmtree(stale_path, ignore_errors=True)
+        else:
+            try:
+                os.replace(tmp_path, final_path)
+            except OSError:
+                # 其他进程已经写好了同一份快照
+                if not os.path.exists(os.path.join(final_path, META_FILE)):
+                    raise
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+    for name in os.listdir(snapshot_dir):
+        if name != fingerprint and not name.startswith(TMP_PREFIX):
+            shutil.rmtree(os.path.join(snapshot_dir, name), ignore_errors=True)
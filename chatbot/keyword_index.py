@@ -0,0 +1,697 @@
+#!/usr/bin/env python3
+"""
+Keyword Inverted Index for Resume RAG
+关键词倒排索引：词项 -> 文档id列表，检索时只对共享查询词的文档打分
+"""
+
+import os
+import re
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from scipy import sparse
+
+# 与 ResumeRAGCore 保持一致的分词规则
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# 中日韩文字范围：假名、CJK统一汉字（含扩展A）、兼容汉字、韩文音节
+CJK_RANGES = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+# 第一组匹配连续的CJK字符，否则匹配不含CJK字符的 \w 串
+MIXED_TOKEN_PATTERN = re.compile(f"([{CJK_RANGES}]+)|[^\\W{CJK_RANGES}]+")
+
+# 词表 n-gram 子串索引的最大 n：长度不超过该值的查询词可直接查表得到精确结果
+MAX_GRAM_SIZE = 3
+
+# save()/load() 持久化的数组，每个数组对应目录下的一个 .npy 文件
+INDEX_ARRAYS = [
+    "posting_indptr", "posting_doc_ids", "posting_tfs",
+    "doc_indptr", "doc_term_ids", "doc_tfs",
+    "doc_length_array", "alive", "idf",
+    "gram_indptr", "gram_term_ids",
+]
+
+
+def tokenize(text_lower: str) -> List[str]:
+    """对已小写的文本分词"""
+    return TOKEN_PATTERN.findall(text_lower)
+
+
+def tokenize_cjk_bigrams(text_lower: str) -> List[str]:
+    """
+    对已小写的中英文混合文本分词：拉丁文字等按 \\w 串切分为词，连续的CJK字符切分为相邻二字组
+    （只有一个字时保留单字）
+
+    查询词仍满足子串匹配的等价性：拉丁词是内容的子串当且仅当它包含在某个非CJK词中，
+    长度不超过2的CJK串是内容的子串当且仅当它包含在某个二字组或单字中
+    """
+    tokens = []
+    for match in MIXED_TOKEN_PATTERN.finditer(text_lower):
+        run = match.group(1)
+        if run is None:
+            tokens.append(match.group())
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+# 可在 RAG_CONFIG["tokenizer"] 中选择的分词器
+TOKENIZERS: Dict[str, Callable[[str], List[str]]] = {
+    "word": tokenize,
+    "cjk_bigram": tokenize_cjk_bigrams,
+}
+
+
+def get_tokenizer(name: str) -> Callable[[str], List[str]]:
+    """按名称获取分词器"""
+    if name not in TOKENIZERS:
+        raise ValueError(f"未知的分词器: {name}，可选: {', '.join(TOKENIZERS)}")
+    return TOKENIZERS[name]
+
+
+def top_k_indices(scores: np.ndarray, threshold: float, top_k: int) -> np.ndarray:
+    """
+    选出分数高于阈值的前 top_k 个文档id
+
+    先用 argpartition 找到第 k 大的分数，再只对不低于它的文档做稳定排序，
+    同分文档按id升序排列，与对全部结果做稳定排序后截断的结果一致
+
+    Args:
+        scores: 每个文档的分数
+        threshold: 最低分数阈值（不含）
+        top_k: 返回数量
+
+    Returns:
+        按分数降序排列的文档id数组
+    """
+    hits = np.flatnonzero(scores > threshold)
+    if top_k <= 0:
+        return hits[:0]
+    if len(hits) > top_k:
+        hit_scores = scores[hits]
+        kth_score = hit_scores[np.argpartition(-hit_scores, top_k - 1)[top_k - 1]]
+        hits = hits[hit_scores >= kth_score]
+    order = np.argsort(-scores[hits], kind='stable')[:top_k]
+    return hits[order]
+
+
+def _count_hits(doc_id_groups: List[np.ndarray]) -> Dict[int, int]:
+    """每组为某个查询词命中的去重文档id，统计每个文档被多少组命中"""
+    if not doc_id_groups:
+        return {}
+    doc_ids, counts = np.unique(np.concatenate(doc_id_groups), return_counts=True)
+    return dict(zip(doc_ids.tolist(), counts.tolist()))
+
+
+def _reserve(buffer: np.ndarray, size: int) -> np.ndarray:
+    """保证缓冲区容量不小于 size，不足时按倍数扩容（返回可写的新数组）"""
+    if len(buffer) >= size and buffer.flags.writeable:
+        return buffer
+    grown = np.zeros(max(size, 2 * len(buffer), 16), dtype=buffer.dtype)
+    grown[:len(buffer)] = buffer
+    return grown
+
+
+class KeywordIndex:
+    """
+    倒排索引
+
+    由两部分组成：
+    - 主段：连续的 NumPy 数组，词项 t 的升序文档id为
+      posting_doc_ids[posting_indptr[t]:posting_indptr[t + 1]]，posting_tfs 为对应词频，
+      可以通过 save()/load() 持久化并以 mmap 方式加载
+    - 增量段：add_document 新加入的文档，以 Python 列表保存，compact() 时并入主段
+
+    删除文档只在 alive 掩码中标记，倒排表中的记录在 compact() 时清除；
+    文档id一经分配不再改变。所有计数和打分方法都会跳过已删除文档
+    """
+
+    def __init__(self):
+        self.term_ids: Dict[str, int] = {}
+        self.terms: List[str] = []
+        self.num_docs = 0
+        self.num_deleted = 0
+
+        # 主段
+        self.posting_indptr = np.zeros(1, dtype=np.int64)
+        self.posting_doc_ids = np.zeros(0, dtype=np.int32)
+        self.posting_tfs = np.zeros(0, dtype=np.float64)
+        self.term_freq_matrix = sparse.csr_matrix((0, 0), dtype=np.float64)
+        self.doc_term_matrix = sparse.csr_matrix((0, 0), dtype=np.float64)
+        # 词表子串索引：长度 1..MAX_GRAM_SIZE 的子串 -> gram_term_ids 中的区间（词项id升序）
+        self._gram_slots: Dict[str, Tuple[int, int]] = {}
+        self.gram_indptr = np.zeros(1, dtype=np.int64)
+        self.gram_term_ids = np.zeros(0, dtype=np.int32)
+
+        # 增量段：按词项id索引的 (文档id列表, 词频列表)，没有增量记录的词项为None；
+        # _delta_term_ids 按创建顺序记录有增量记录的词项；子串 -> 新词项id列表
+        self._delta_postings: List[Optional[Tuple[List[int], List[int]]]] = []
+        self._delta_term_ids: List[int] = []
+        self._delta_grams: Dict[str, List[int]] = {}
+        # 倒排表中是否含有已删除文档
+        self._has_stale_postings = False
+
+        # 按文档和按词项的统计量，带预留容量，对外通过同名属性暴露有效部分
+        self._doc_lengths = np.zeros(0, dtype=np.float64)
+        self._unique_term_counts = np.zeros(0, dtype=np.int64)
+        self._alive = np.zeros(0, dtype=bool)
+        # 主段词项的文档频率（不含已删除文档），增量段的文档频率在计算 IDF 时累加
+        self._doc_freqs = np.zeros(0, dtype=np.float64)
+        self._idf: Optional[np.ndarray] = None
+
+        self._length_norm: Optional[np.ndarray] = None
+        self._length_norm_params: Optional[Tuple[float, float]] = None
+        self._bm25_matrix: Optional[sparse.csr_matrix] = None
+        self._bm25_matrix_params: Optional[Tuple[float, float]] = None
+
+    def __len__(self) -> int:
+        return len(self.term_ids)
+
+    @property
+    def num_live_docs(self) -> int:
+        return self.num_docs - self.num_deleted
+
+    @property
+    def doc_length_array(self) -> np.ndarray:
+        """每个文档的词数"""
+        return self._doc_lengths[:self.num_docs]
+
+    @property
+    def unique_term_counts(self) -> np.ndarray:
+        """每个文档的去重词数"""
+        return self._unique_term_counts[:self.num_docs]
+
+    @property
+    def alive(self) -> np.ndarray:
+        """文档是否未被删除"""
+        return self._alive[:self.num_docs]
+
+    @property
+    def idf(self) -> np.ndarray:
+        """每个词项的 BM25 IDF，只统计未删除的文档，索引变化后按需重新计算"""
+        if self._idf is None:
+            doc_freqs = np.zeros(len(self.terms), dtype=np.float64)
+            doc_freqs[:len(self._doc_freqs)] = self._doc_freqs
+            for term_id in self._delta_term_ids:
+                docs = self._delta_postings[term_id][0]
+                doc_freqs[term_id] += np.count_nonzero(self.alive[docs]) if self._has_stale_postings else len(docs)
+            self._idf = np.log1p((self.num_live_docs - doc_freqs + 0.5) / (doc_freqs + 0.5))
+        return self._idf
+
+    def add_document(self, tokens: Iterable[str]) -> int:
+        """
+        将一个文档加入索引的增量段，finalize 前后均可调用
+
+        Args:
+            tokens: 文档分词结果（含重复词，用于统计词频和文档长度）
+
+        Returns:
+            新文档的id
+        """
+        return self.add_documents([tokens])[0]
+
+    def add_documents(self, token_lists: Iterable[Iterable[str]]) -> range:
+        """
+        批量加入文档，按文档的统计量在最后一次性写入数组
+
+        Args:
+            token_lists: 每个文档的分词结果
+
+        Returns:
+            新文档的id区间
+        """
+        first_doc_id = doc_id = self.num_docs
+        delta_postings = self._delta_postings
+        doc_lengths, unique_counts = [], []
+        for tokens in token_lists:
+            counts = Counter(tokens)
+            for word, tf in counts.items():
+                term_id = self.term_ids.get(word)
+                if term_id is None:
+                    term_id = self._add_term(word)
+                delta = delta_postings[term_id]
+                if delta is None:
+                    delta = delta_postings[term_id] = ([], [])
+                    self._delta_term_ids.append(term_id)
+                delta[0].append(doc_id)
+                delta[1].append(tf)
+            doc_lengths.append(sum(counts.values()))
+            unique_counts.append(len(counts))
+            doc_id += 1
+
+        self._doc_lengths = _reserve(self._doc_lengths, doc_id)
+        self._unique_term_counts = _reserve(self._unique_term_counts, doc_id)
+        self._alive = _reserve(self._alive, doc_id)
+        self._doc_lengths[first_doc_id:doc_id] = doc_lengths
+        self._unique_term_counts[first_doc_id:doc_id] = unique_counts
+        self._alive[first_doc_id:doc_id] = True
+        self.num_docs = doc_id
+        self._invalidate_stats()
+        return range(first_doc_id, doc_id)
+
+    def delete_document(self, doc_id: int):
+        """
+        删除文档：标记为已删除并更新文档频率，倒排表中的记录在 compact() 时清除
+
+        Args:
+            doc_id: 文档id
+        """
+        if not self.alive[doc_id]:
+            raise KeyError(doc_id)
+
+        if doc_id < self.term_freq_matrix.shape[0]:
+            # 主段文档：按 CSR 行找到其词项，更新主段文档频率
+            start, end = self.term_freq_matrix.indptr[doc_id], self.term_freq_matrix.indptr[doc_id + 1]
+            self._doc_freqs[self.term_freq_matrix.indices[start:end]] -= 1
+        self._has_stale_postings = True
+        self._alive = _reserve(self._alive, self.num_docs)
+        self._alive[doc_id] = False
+        self.num_deleted += 1
+        self._invalidate_stats()
+
+    def _add_term(self, term: str) -> int:
+        """登记新词项，并把它的所有短子串加入增量段的子串索引"""
+        term_id = self.term_ids[term] = len(self.terms)
+        self.terms.append(term)
+        self._delta_postings.append(None)
+
+        grams = {
+            term[start:start + size]
+            for size in range(1, MAX_GRAM_SIZE + 1)
+            for start in range(len(term) - size + 1)
+        }
+        for gram in grams:
+            self._delta_grams.setdefault(gram, []).append(term_id)
+        return term_id
+
+    def _invalidate_stats(self):
+        """文档集合变化后清除依赖全局统计量的缓存"""
+        self._idf = None
+        self._length_norm = None
+        self._length_norm_params = None
+        self._bm25_matrix = None
+        self._bm25_matrix_params = None
+
+    def finalize(self):
+        """在初始文档全部加入后调用一次，把增量段并入连续数组"""
+        self.compact()
+
+    @property
+    def is_compact(self) -> bool:
+        """主段是否已包含全部文档且不含已删除文档的记录"""
+        return not self._delta_term_ids and not self._delta_grams and not self._has_stale_postings
+
+    def compact(self):
+        """
+        把增量段并入主段，并从倒排表中清除已删除文档，重建文档-词项 CSR 矩阵
+
+        耗时与索引总大小成正比；稀疏矩阵检索和 save() 会在索引有变化时自动调用
+        """
+        if self.is_compact and self.term_freq_matrix.shape == (self.num_docs, len(self.terms)):
+            return
+
+        base_lengths = np.diff(self.posting_indptr)
+        base_terms = np.repeat(np.arange(len(base_lengths), dtype=np.int32), base_lengths)
+        delta_terms, delta_docs, delta_tfs = [], [], []
+        # 每个词项内文档id升序；主段没有词项时，增量段词项的创建顺序即id升序
+        for term_id in self._delta_term_ids:
+            docs, tfs = self._delta_postings[term_id]
+            delta_terms.extend([term_id] * len(docs))
+            delta_docs.extend(docs)
+            delta_tfs.extend(tfs)
+
+        term_ids = np.concatenate((base_terms, np.asarray(delta_terms, dtype=np.int32)))
+        doc_ids = np.concatenate((self.posting_doc_ids, np.asarray(delta_docs, dtype=np.int32)))
+        tfs = np.concatenate((self.posting_tfs, np.asarray(delta_tfs, dtype=np.float64)))
+        if self.num_deleted:
+            keep = self.alive[doc_ids]
+            term_ids, doc_ids, tfs = term_ids[keep], doc_ids[keep], tfs[keep]
+        if len(base_lengths) and delta_terms:
+            # 增量段的文档id都大于主段，按词项稳定排序后每个词项内文档id仍然升序
+            order = np.argsort(term_ids, kind='stable')
+            term_ids, doc_ids, tfs = term_ids[order], doc_ids[order], tfs[order]
+
+        n_terms = len(self.terms)
+        self.posting_indptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=n_terms), out=self.posting_indptr[1:])
+        self.posting_doc_ids = doc_ids
+        self.posting_tfs = tfs
+
+        # 倒排表按词项存储，正好是文档-词项矩阵的 CSC 形式，转置为 CSR 便于按文档做矩阵乘
+        term_freq_matrix = sparse.csc_matrix(
+            (self.posting_tfs, self.posting_doc_ids, self.posting_indptr),
+            shape=(self.num_docs, n_terms)
+        ).tocsr()
+        term_freq_matrix.sort_indices()
+
+        grams, gram_indptr, gram_term_ids = self._merge_grams()
+        self._delta_postings = [None] * n_terms
+        self._delta_term_ids, self._delta_grams = [], {}
+        self._has_stale_postings = False
+        self._doc_freqs = np.diff(self.posting_indptr).astype(np.float64)
+        self._set_arrays(
+            term_freq_matrix.indptr, term_freq_matrix.indices, term_freq_matrix.data,
+            grams, gram_indptr, gram_term_ids
+        )
+
+    def _merge_grams(self) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """合并主段与增量段的子串索引，返回 (子串列表, gram_indptr, gram_term_ids)"""
+        if not self._delta_grams:
+            return list(self._gram_slots), self.gram_indptr, self.gram_term_ids
+
+        merged = {
+            gram: self.gram_term_ids[start:end].tolist()
+            for gram, (start, end) in self._gram_slots.items()
+        }
+        # 新词项id都大于主段词项id，追加后仍然升序
+        for gram, term_ids in self._delta_grams.items():
+            merged.setdefault(gram, []).extend(term_ids)
+
+        grams = sorted(merged)
+        gram_indptr = np.zeros(len(grams) + 1, dtype=np.int64)
+        np.cumsum([len(merged[gram]) for gram in grams], out=gram_indptr[1:])
+        gram_term_ids = np.fromiter(
+            (term_id for gram in grams for term_id in merged[gram]),
+            dtype=np.int32, count=int(gram_indptr[-1])
+        )
+        return grams, gram_indptr, gram_term_ids
+
+    def _set_arrays(self, doc_indptr: np.ndarray, doc_term_ids: np.ndarray, doc_tfs: np.ndarray,
+                    grams: List[str], gram_indptr: np.ndarray, gram_term_ids: np.ndarray):
+        """由按文档存储的 CSR 数组和子串索引数组设置主段，compact() 与 load() 共用"""
+        shape = (self.num_docs, len(self.terms))
+        self.term_freq_matrix = sparse.csr_matrix((doc_tfs, doc_term_ids, doc_indptr), shape=shape)
+        # 0/1 矩阵与词频矩阵共享索引数组
+        self.doc_term_matrix = sparse.csr_matrix(
+            (np.ones(len(doc_tfs), dtype=np.float64), doc_term_ids, doc_indptr),
+            shape=shape
+        )
+
+        self.gram_indptr = gram_indptr
+        self.gram_term_ids = gram_term_ids
+        bounds = gram_indptr.tolist()
+        self._gram_slots = {gram: (bounds[i], bounds[i + 1]) for i, gram in enumerate(grams)}
+        self._invalidate_stats()
+
+    def save(self, directory: str):
+        """
+        将索引写入目录：数组保存为 .npy 文件，词表和子串表保存为按行分隔的文本
+        （词项和子串都只由 \\w 字符组成，不含换行符）。有未合并的变更时先执行 compact()
+
+        Args:
+            directory: 已存在的目标目录
+        """
+        self.compact()
+        arrays = {
+            "posting_indptr": self.posting_indptr,
+            "posting_doc_ids": self.posting_doc_ids,
+            "posting_tfs": self.posting_tfs,
+            "doc_indptr": self.term_freq_matrix.indptr,
+            "doc_term_ids": self.term_freq_matrix.indices,
+            "doc_tfs": self.term_freq_matrix.data,
+            "doc_length_array": self.doc_length_array,
+            "alive": self.alive,
+            "idf": self.idf,
+            "gram_indptr": self.gram_indptr,
+            "gram_term_ids": self.gram_term_ids,
+        }
+        for name in INDEX_ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), arrays[name])
+
+        # _gram_slots 的插入顺序即子串在 gram_indptr 中的顺序
+        with open(os.path.join(directory, "terms.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(self.terms))
+        with open(os.path.join(directory, "grams.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(self._gram_slots))
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "KeywordIndex":
+        """
+        从 save() 写出的目录加载索引
+
+        Args:
+            directory: 索引目录
+            mmap: 是否以只读 mmap 方式加载数组；多个进程加载同一份快照时共享操作系统页缓存。
+                之后的增删操作只会复制按文档和按词项的小数组，倒排表本身保持映射
+
+        Returns:
+            可直接检索的索引
+        """
+        mmap_mode = "r" if mmap else None
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in INDEX_ARRAYS
+        }
+        with open(os.path.join(directory, "terms.txt"), encoding="utf-8") as f:
+            terms = f.read().split("\n") if len(arrays["idf"]) else []
+        with open(os.path.join(directory, "grams.txt"), encoding="utf-8") as f:
+            grams = f.read().split("\n") if len(arrays["gram_indptr"]) > 1 else []
+
+        index = cls()
+        index.terms = terms
+        index.term_ids = {term: term_id for term_id, term in enumerate(terms)}
+        index._delta_postings = [None] * len(terms)
+        index.num_docs = len(arrays["doc_length_array"])
+        index.posting_indptr = arrays["posting_indptr"]
+        index.posting_doc_ids = arrays["posting_doc_ids"]
+        index.posting_tfs = arrays["posting_tfs"]
+        index._doc_lengths = arrays["doc_length_array"]
+        index._alive = arrays["alive"]
+        index.num_deleted = index.num_docs - int(np.count_nonzero(index._alive))
+        index._unique_term_counts = np.diff(arrays["doc_indptr"])
+        index._doc_freqs = np.diff(index.posting_indptr).astype(np.float64)
+        index._set_arrays(
+            arrays["doc_indptr"], arrays["doc_term_ids"], arrays["doc_tfs"],
+            grams, arrays["gram_indptr"], arrays["gram_term_ids"]
+        )
+        index._idf = arrays["idf"]
+        return index
+
+    def posting(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        返回词项的 (文档id数组, 词频数组)，包含增量段，文档id升序
+
+        主段中可能含有已删除文档，调用方需要时用 alive 过滤
+        """
+        if term_id < len(self.posting_indptr) - 1:
+            start, end = self.posting_indptr[term_id], self.posting_indptr[term_id + 1]
+            docs, tfs = self.posting_doc_ids[start:end], self.posting_tfs[start:end]
+        else:
+            docs, tfs = self.posting_doc_ids[:0], self.posting_tfs[:0]
+
+        delta = self._delta_postings[term_id]
+        if delta:
+            docs = np.concatenate((docs, np.asarray(delta[0], dtype=docs.dtype)))
+            tfs = np.concatenate((tfs, np.asarray(delta[1], dtype=tfs.dtype)))
+        return docs, tfs
+
+    def _live_posting(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """返回去掉已删除文档后的倒排数组"""
+        docs, tfs = self.posting(term_id)
+        if self._has_stale_postings:
+            keep = self.alive[docs]
+            docs, tfs = docs[keep], tfs[keep]
+        return docs, tfs
+
+    def matching_term_ids(self, word: str) -> List[int]:
+        """
+        返回词表中包含 word 作为子串的所有词项id
+
+        word 由 \\w 字符组成，因此 `word in content_lower` 成立当且仅当
+        文档中某个词项包含 word，子串匹配可以完全在词表上完成。
+        短查询词直接查 n-gram 子串索引；长查询词取其最稀有的 n-gram，
+        只对包含该 n-gram 的词项做一次子串校验
+        """
+        if len(word) <= MAX_GRAM_SIZE:
+            return self._gram_term_ids(word)
+
+        rarest: Optional[List[int]] = None
+        for start in range(len(word) - MAX_GRAM_SIZE + 1):
+            term_ids = self._gram_term_ids(word[start:start + MAX_GRAM_SIZE])
+            if not term_ids:
+                return []
+            if rarest is None or len(term_ids) < len(rarest):
+                rarest = term_ids
+        return [term_id for term_id in rarest if word in self.terms[term_id]]
+
+    def _gram_term_ids(self, gram: str) -> List[int]:
+        """包含该子串的词项id（主段与增量段合并）"""
+        slot = self._gram_slots.get(gram)
+        term_ids = self.gram_term_ids[slot[0]:slot[1]].tolist() if slot else []
+        delta = self._delta_grams.get(gram)
+        return term_ids + delta if delta else term_ids
+
+    def keyword_hit_counts(self, query_words: Set[str]) -> Dict[int, int]:
+        """
+        统计每个文档中完全匹配的查询词数量，只返回至少命中一个查询词的文档
+
+        Args:
+            query_words: 查询词汇集合
+
+        Returns:
+            文档id -> 完全匹配的查询词数
+        """
+        groups = []
+        for word in query_words:
+            term_id = self.term_ids.get(word)
+            if term_id is not None:
+                groups.append(self._live_posting(term_id)[0])
+        return _count_hits(groups)
+
+    def substring_hit_counts(self, query_words: Set[str]) -> Dict[int, int]:
+        """
+        统计每个文档中作为子串出现的查询词数量，只返回至少命中一个查询词的文档
+
+        完全匹配的词项也包含查询词本身，因此结果的键同时覆盖了所有关键词命中的文档
+
+        Args:
+            query_words: 查询词汇集合
+
+        Returns:
+            文档id -> 子串命中的查询词数
+        """
+        groups = []
+        for word in query_words:
+            term_ids = self.matching_term_ids(word)
+            if term_ids:
+                groups.append(np.unique(np.concatenate([self._live_posting(t)[0] for t in term_ids])))
+        return _count_hits(groups)
+
+    def match_counts(self, query_words: Set[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        用稀疏矩阵乘法统计每个文档命中的查询词数量
+
+        Args:
+            query_words: 查询词汇集合
+
+        Returns:
+            (keyword_hits, exact_hits)：每个文档完全匹配的查询词数，
+            以及作为子串出现在文档中的查询词数
+        """
+        keyword_hits, exact_hits = self.match_counts_many([query_words])
+        return keyword_hits.toarray().ravel(), exact_hits.toarray().ravel()
+
+    def match_counts_many(self, queries: List[Set[str]]) -> Tuple[sparse.csc_matrix, sparse.csc_matrix]:
+        """
+        一次稀疏矩阵乘法统计一批查询在每个文档上的命中数
+
+        Args:
+            queries: 每个查询的词汇集合
+
+        Returns:
+            (keyword_hits, exact_hits)：形状均为 (文档数, 查询数)，第 j 列对应第 j 个查询
+        """
+        self.compact()
+        keyword_rows, keyword_cols = [], []
+        substring_rows, substring_cols = [], []
+        word_queries = []
+        for query_idx, query_words in enumerate(queries):
+            for word in query_words:
+                term_id = self.term_ids.get(word)
+                if term_id is not None:
+                    keyword_rows.append(term_id)
+                    keyword_cols.append(query_idx)
+                for term_id in self.matching_term_ids(word):
+                    substring_rows.append(term_id)
+                    substring_cols.append(len(word_queries))
+                word_queries.append(query_idx)
+
+        n_terms, n_queries, n_words = len(self.terms), len(queries), len(word_queries)
+        keyword_matrix = sparse.csc_matrix(
+            (np.ones(len(keyword_rows), dtype=np.float64), (keyword_rows, keyword_cols)),
+            shape=(n_terms, n_queries)
+        )
+        # 词项-查询词子串关系矩阵：每列标记包含该查询词的所有词项
+        substring_matrix = sparse.csc_matrix(
+            (np.ones(len(substring_rows), dtype=np.float64), (substring_rows, substring_cols)),
+            shape=(n_terms, n_words)
+        )
+        # 查询词-查询归属矩阵：把每个查询词的命中汇总到所属查询
+        word_query_matrix = sparse.csc_matrix(
+            (np.ones(n_words, dtype=np.float64), (np.arange(n_words), word_queries)),
+            shape=(n_words, n_queries)
+        )
+
+        keyword_hits = (self.doc_term_matrix @ keyword_matrix).tocsc()
+        word_hits = (self.doc_term_matrix @ substring_matrix) > 0
+        exact_hits = (word_hits.astype(np.float64) @ word_query_matrix).tocsc()
+        return keyword_hits, exact_hits
+
+    def _get_length_norm(self, k1: float, b: float) -> np.ndarray:
+        """BM25 的文档长度归一化项 k1 * (1 - b + b * dl / avgdl)，按参数缓存"""
+        if self._length_norm is None or self._length_norm_params != (k1, b):
+            live_lengths = self.doc_length_array[self.alive] if self.num_deleted else self.doc_length_array
+            avg_length = live_lengths.mean() if len(live_lengths) else 0.0
+            relative_length = self.doc_length_array / avg_length if avg_length else self.doc_length_array
+            self._length_norm = k1 * (1 - b + b * relative_length)
+            self._length_norm_params = (k1, b)
+        return self._length_norm
+
+    def bm25_scores(self, query_words: Set[str], k1: float, b: float) -> np.ndarray:
+        """
+        计算所有文档的 BM25 分数
+
+        只对查询词的倒排数组做查表和累加，不做逐文档的 Python 集合运算
+
+        Args:
+            query_words: 查询词汇集合
+            k1: 词频饱和参数
+            b: 长度归一化参数
+
+        Returns:
+            长度为文档数的分数数组，已删除文档为0
+        """
+        length_norm = self._get_length_norm(k1, b)
+        idf = self.idf
+        scores = np.zeros(self.num_docs, dtype=np.float64)
+        for word in query_words:
+            term_id = self.term_ids.get(word)
+            if term_id is None:
+                continue
+            docs, tfs = self._live_posting(term_id)
+            scores[docs] += idf[term_id] * tfs * (k1 + 1) / (tfs + length_norm[docs])
+        return scores
+
+    def _get_bm25_matrix(self, k1: float, b: float) -> sparse.csr_matrix:
+        """文档-词项 BM25 权重矩阵，按参数缓存"""
+        self.compact()
+        if self._bm25_matrix is None or self._bm25_matrix_params != (k1, b):
+            length_norm = self._get_length_norm(k1, b)
+            tf_matrix = self.term_freq_matrix
+            row_ids = np.repeat(np.arange(self.num_docs), np.diff(tf_matrix.indptr))
+            tfs = tf_matrix.data
+            weights = self.idf[tf_matrix.indices] * tfs * (k1 + 1) / (tfs + length_norm[row_ids])
+            self._bm25_matrix = sparse.csr_matrix(
+                (weights, tf_matrix.indices, tf_matrix.indptr),
+                shape=tf_matrix.shape
+            )
+            self._bm25_matrix_params = (k1, b)
+        return self._bm25_matrix
+
+    def bm25_scores_many(self, queries: List[Set[str]], k1: float, b: float) -> sparse.csc_matrix:
+        """
+        一次稀疏矩阵乘法计算一批查询的 BM25 分数
+
+        Args:
+            queries: 每个查询的词汇集合
+            k1: 词频饱和参数
+            b: 长度归一化参数
+
+        Returns:
+            形状为 (文档数, 查询数) 的分数矩阵
+        """
+        bm25_matrix = self._get_bm25_matrix(k1, b)
+        rows, cols = [], []
+        for query_idx, query_words in enumerate(queries):
+            for word in query_words:
+                term_id = self.term_ids.get(word)
+                if term_id is not None:
+                    rows.append(term_id)
+                    cols.append(query_idx)
+        query_matrix = sparse.csc_matrix(
+            (np.ones(len(rows), dtype=np.float64), (rows, cols)),
+            shape=(len(self.terms), len(queries))
+        )
+        return (bm25_matrix @ query_matrix).tocsc()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Metadata Bitmap Index for Resume RAG
+元数据位图索引：为 type、company_organization 等字段的每个取值维护一个文档位图，
+并根据查询中出现的实体（如公司名）生成过滤条件，检索时只对满足条件的文档打分
+"""
+
+import os
+import re
+import sys
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Pattern, Set, Tuple
+
+import numpy as np
+
+from doc_store import DocumentStore
+from keyword_index import KeywordIndex
+
+# 位图实现与 LangChain RAG 的元数据预过滤共用；Docker 镜像中该目录已在 PYTHONPATH 上
+LANGCHAIN_RAG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  "RAG_algotirhm", "rag_core", "LangChainRag")
+if os.path.isdir(LANGCHAIN_RAG_PATH) and LANGCHAIN_RAG_PATH not in sys.path:
+    sys.path.append(LANGCHAIN_RAG_PATH)
+
+from metadata_filter import MetadataBitmaps
+
+# 别名判定：包含该词的存活文档中，至少有这个比例取该字段值
+ALIAS_MIN_PRECISION = 0.8
+# 拉丁文字别名的最短长度，避免 "co"、"ai" 之类的短词触发过滤
+ALIAS_MIN_LENGTH = 3
+
+
+class MetadataIndex:
+    """
+    元数据位图索引
+    每个字段取值对应一个按位压缩的文档位图（metadata_filter.MetadataBitmaps），多个条件用按位与/或组合
+    
+    查询侧匹配分两种：alias_fields 中字段（如公司）的取值可以由一个区分性的词触发（"baidu"）；
+    其他字段只在查询包含完整的多词取值时触发（"undergraduate research"），
+    "work"、"project" 这类单个常见词即使恰好是某个取值也不会收窄检索范围
+    """
+
+    def __init__(self, fields: Iterable[str], alias_fields: Optional[Iterable[str]] = None):
+        """
+        Args:
+            fields: 建立位图的字段
+            alias_fields: 可由单个词触发过滤的字段，为None时与fields相同
+        """
+        self.fields = list(fields)
+        self.alias_fields = set(self.fields if alias_fields is None else alias_fields)
+        self.bitmaps = MetadataBitmaps(fields=self.fields)
+        # 查询词 -> [(字段, 取值)] 以及完整取值的匹配模式，数据变化后按需重建
+        self._aliases: Optional[Dict[str, List[Tuple[str, str]]]] = None
+        self._phrases: List[Tuple[Pattern, str, str]] = []
+
+    @property
+    def num_docs(self) -> int:
+        return self.bitmaps.size
+
+    @classmethod
+    def from_doc_store(cls, doc_store: DocumentStore, fields: Iterable[str],
+                       alias_fields: Optional[Iterable[str]] = None) -> "MetadataIndex":
+        """
+        由文档存储构建位图索引，已删除的文档不置位
+
+        Args:
+            doc_store: 文档存储
+            fields: 建立位图的字段，文档存储中不存在的字段被忽略
+            alias_fields: 可由单个词触发过滤的字段，为None时与fields相同
+        """
+        index = cls((field for field in fields if field in doc_store.columns), alias_fields)
+        columns = [(field, doc_store.columns[field]) for field in index.fields]
+        index.bitmaps = MetadataBitmaps([
+            {} if doc_id in doc_store.deleted else {field: column[doc_id] for field, column in columns}
+            for doc_id in range(len(doc_store))
+        ], index.fields)
+        return index
+
+    def add(self, doc_id: int, record: Mapping[str, object]):
+        """
+        为新文档置位
+
+        Args:
+            doc_id: 文档id（与文档存储一致）
+            record: 记录字段
+        """
+        # 文档存储中的字段值均为字符串
+        self.bitmaps.add(doc_id, {field: str(record.get(field, "")) for field in self.fields})
+        self._aliases = None
+
+    def delete(self, doc_id: int):
+        """清除文档在所有位图中的位"""
+        self.bitmaps.delete(doc_id)
+        self._aliases = None
+
+    def mask(self, constraints: Mapping[str, Iterable[str]]) -> np.ndarray:
+        """
+        计算过滤条件对应的文档位图
+
+        Args:
+            constraints: 字段 -> 允许的取值，字段之间为与，同一字段的取值之间为或
+
+        Returns:
+            长度为num_docs的布尔数组
+        """
+        return self.bitmaps.mask(constraints)
+
+    def _build_aliases(self, tokenize: Callable[[str], List[str]],
+                       keyword_index: KeywordIndex) -> Dict[str, List[Tuple[str, str]]]:
+        """
+        从数据中学习查询词到 alias_fields 字段取值的映射
+
+        取值分词后的每个词，如果包含它的文档绝大多数都取该值（如 "baidu" 只出现在
+        Baidu Inc. 的记录中），就作为该取值的别名；"inc"、"machine" 这类在多个取值
+        或正文中都常见的词达不到精度要求，不会触发过滤
+        """
+        aliases: Dict[str, List[Tuple[str, str]]] = {}
+        for field in self.fields:
+            if field not in self.alias_fields:
+                continue
+            for value in self.bitmaps.values(field):
+                bitmap = self.bitmaps.mask({field: value})
+                for token in set(tokenize(value.lower())):
+                    if token.isascii() and len(token) < ALIAS_MIN_LENGTH:
+                        continue
+                    term_id = keyword_index.term_ids.get(token)
+                    if term_id is None:
+                        continue
+                    docs, _ = keyword_index.posting(term_id)
+                    docs = docs[keyword_index.alive[docs]]
+                    if len(docs) and bitmap[docs].mean() >= ALIAS_MIN_PRECISION:
+                        aliases.setdefault(token, []).append((field, value))
+        return aliases
+
+    def match(self, query_lower: str, query_words: Set[str], tokenize: Callable[[str], List[str]],
+              keyword_index: KeywordIndex) -> Dict[str, Set[str]]:
+        """
+        查询侧实体匹配：找出查询中提到的字段取值
+
+        Args:
+            query_lower: 小写查询
+            query_words: 查询分词结果
+            tokenize: 构建倒排索引使用的分词函数
+            keyword_index: 倒排索引，用于计算别名精度
+
+        Returns:
+            字段 -> 查询中提到的取值；没有匹配时为空字典
+        """
+        if self._aliases is None:
+            self._aliases = self._build_aliases(tokenize, keyword_index)
+            self._phrases = [
+                (self._phrase_pattern(value), field, value)
+                for field in self.fields for value in self.bitmaps.values(field)
+                if value.strip() and (field in self.alias_fields or len(tokenize(value.lower())) > 1)
+            ]
+
+        constraints: Dict[str, Set[str]] = {}
+        for word in query_words:
+            for field, value in self._aliases.get(word, ()):
+                constraints.setdefault(field, set()).add(value)
+        # 完整取值出现在查询中（如 "Machine Learning Course"）时直接匹配
+        for pattern, field, value in self._phrases:
+            if pattern.search(query_lower):
+                constraints.setdefault(field, set()).add(value)
+        return constraints
+
+    @staticmethod
+    def _phrase_pattern(value: str) -> Pattern:
+        """完整取值的匹配模式；拉丁文字要求词边界，避免 intern 命中 international"""
+        escaped = re.escape(value.lower())
+        if value.isascii():
+            return re.compile(rf"(?<!\w){escaped}(?!\w)")
+        return re.compile(escaped)
@@ -6,13 +6,18 @@ Core RAG (Retrieval-Augmented Generation) System for Resume QA
 
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Hashable
 import os
 import re
 import time
+import heapq
 import logging
 from openai import OpenAI
 from config import MODEL_CONFIG, RAG_CONFIG, DEFAULT_EXCEL_PATH, LOGGING_CONFIG
+from keyword_index import KeywordIndex, get_tokenizer, top_k_indices
+from doc_store import DocumentStore
+from metadata_index import MetadataIndex
+from index_snapshot import source_fingerprint, resolve_snapshot_dir, load_snapshot, save_snapshot
 
 # 设置日志
 logging.basicConfig(
@@ -21,6 +26,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# MaxScore剪枝比较分数上限时留出的浮点误差余量
+MAXSCORE_EPSILON = 1e-9
+
 class ResumeRAGCore:
     """
     Resume RAG 核心算法类
@@ -44,12 +52,102 @@ class ResumeRAGCore:
             api_key=self.model_config["api_key"]
         )
         
+        self._tokenize = get_tokenizer(self.rag_config["tokenizer"])
+        self._data: Optional[pd.DataFrame] = None
+        # 成功读取的数据源文件路径，使用样例数据时为None
+        self.data_source: Optional[str] = None
+        # 尚未写入快照的增量修改条数，由 persist_changes() 清零
+        self.unpersisted_changes = 0
+        
+        # 数据源未变化时直接加载索引快照，跳过Excel解析和预处理
+        if self._load_snapshot(xlsx_path):
+            return
+        
         # 加载数据
         self.data = self._load_data(xlsx_path)
         logger.info(f"数据加载成功，共{len(self.data)}条记录")
         
         # 预处理数据以提高检索效率
         self._preprocess_data()
+        self._save_snapshot()
+    
+    @property
+    def data(self) -> pd.DataFrame:
+        """原始记录表；从快照启动时按需由文档存储还原"""
+        if self._data is None:
+            self._data = self.doc_store.to_dataframe()
+        return self._data
+    
+    @data.setter
+    def data(self, value: pd.DataFrame):
+        self._data = value
+    
+    def _snapshot_location(self, xlsx_path: Optional[str]) -> Optional[Tuple[str, str]]:
+        """返回(快照目录, 数据源指纹)，未启用快照或数据源不存在时返回None"""
+        snapshot_dir = self.rag_config.get("snapshot_dir")
+        if not snapshot_dir or not xlsx_path or not os.path.exists(xlsx_path):
+            return None
+        fingerprint = source_fingerprint(xlsx_path, self.rag_config["tokenizer"])
+        return resolve_snapshot_dir(snapshot_dir, xlsx_path), fingerprint
+    
+    def _load_snapshot(self, xlsx_path: Optional[str]) -> bool:
+        """尝试从索引快照加载文档存储和倒排索引"""
+        try:
+            location = self._snapshot_location(xlsx_path)
+        except OSError as e:
+            logger.warning(f"计算数据源指纹失败: {e}")
+            return False
+        if location is None:
+            return False
+        
+        start_time = time.time()
+        snapshot = load_snapshot(*location)
+        if snapshot is None:
+            return False
+        
+        self.doc_store, self.keyword_index = snapshot
+        self.data_source = xlsx_path
+        self._build_metadata_index()
+        logger.info(f"从索引快照加载成功，共{len(self.doc_store)}条记录，"
+                    f"{len(self.keyword_index)}个词项，耗时{time.time() - start_time:.3f}s")
+        return True
+    
+    def _save_snapshot(self, replace: bool = False) -> bool:
+        """
+        把当前索引保存为快照，失败时只记录警告，不影响服务
+        
+        Returns:
+            是否已保存；未启用快照、使用样例数据或保存失败时为False
+        """
+        try:
+            location = self._snapshot_location(self.data_source)
+            if location is None:
+                return False
+            save_snapshot(*location, self.doc_store, self.keyword_index, replace=replace)
+            logger.info(f"索引快照已保存: {location[0]}")
+            return True
+        except Exception as e:
+            logger.warning(f"保存索引快照失败: {e}")
+            return False
+    
+    def persist_changes(self) -> bool:
+        """
+        把增量修改（add_records / update_record / delete_record）写入数据源对应的索引快照
+        
+        写入前执行 compact() 并重写整份快照，耗时与语料规模成正比，因此增删改操作本身不会调用它，
+        由调用方在一批修改之后显式执行。重启或以同一数据源重新加载时从快照恢复这些修改。
+        数据源Excel文件本身不会被修改，文件内容变化后快照按指纹失效，修改随之丢失
+        
+        Returns:
+            是否已持久化；没有未保存的修改时直接返回True。未启用快照、使用样例数据或写入失败时
+            为False，修改只保留在内存中
+        """
+        if not self.unpersisted_changes:
+            return True
+        if not self._save_snapshot(replace=True):
+            return False
+        self.unpersisted_changes = 0
+        return True
         
     def _load_data(self, xlsx_path: Optional[str] = None) -> pd.DataFrame:
         """加载Excel数据或使用样例数据"""
@@ -57,6 +155,7 @@ class ResumeRAGCore:
             try:
                 df = pd.read_excel(xlsx_path)
                 logger.info(f"从文件加载数据: {xlsx_path}")
+                self.data_source = xlsx_path
                 return df
             except Exception as e:
                 logger.error(f"加载文件失败: {e}")
@@ -151,21 +250,120 @@ class ResumeRAGCore:
         """预处理数据以提高检索效率"""
         logger.info("预处理数据...")
         
-        # 为每行数据预计算词汇集合，提高检索速度
-        self.processed_data = []
-        for idx, row in self.data.iterrows():
-            content = f"{row.get('type', '')} {row.get('company_organization', '')} {row.get('position_title', '')} {row.get('context', '')}"
-            content_lower = content.lower()
-            content_words = set(re.findall(r'\w+', content_lower))
+        # 列式存储记录字段，检索和prompt生成都从文档存储读取
+        self.doc_store = DocumentStore.from_dataframe(self.data)
+        
+        # 建立倒排索引，文档的词汇集合以词项id的形式保存在索引中
+        self.keyword_index = KeywordIndex()
+        self.keyword_index.add_documents(
+            self._tokenize(self.doc_store.content(doc_id).lower()) for doc_id in range(len(self.doc_store))
+        )
+        
+        # 预计算IDF、文档长度等统计量
+        self.keyword_index.finalize()
+        logger.info(f"倒排索引构建完成，共{len(self.keyword_index)}个词项")
+        
+        self._build_metadata_index()
+    
+    def _build_metadata_index(self):
+        """为过滤字段建立位图索引，数据量小，启动时由文档存储直接构建"""
+        self.metadata_index = MetadataIndex.from_doc_store(
+            self.doc_store, self.rag_config["filter_fields"], self.rag_config["alias_fields"]
+        )
+    
+    def add_records(self, records: List[Dict[str, Any]]) -> List[Hashable]:
+        """
+        增量添加记录，只对新记录分词并追加到倒排索引，不重新加载数据
+        
+        Args:
+            records: 记录列表，字段与Excel列一致（type, company_organization, position_title, context）
             
-            self.processed_data.append({
-                'index': idx,
-                'row': row,
-                'content': content,
-                'content_lower': content_lower,
-                'content_words': content_words,
-                'content_length': len(content_words)
-            })
+        Returns:
+            新记录的索引列表
+        """
+        labels = [self.doc_store.label(self._add_record(record)) for record in records]
+        self._data = None
+        self.unpersisted_changes += len(labels)
+        logger.info(f"新增{len(labels)}条记录")
+        return labels
+    
+    def update_record(self, index: Hashable, fields: Dict[str, Any]) -> Hashable:
+        """
+        增量更新一条记录，未给出的字段保持不变
+        
+        旧文档在索引中标记为删除，更新后的内容以相同的索引作为新文档追加
+        
+        Args:
+            index: 记录索引（检索结果中的index字段）
+            fields: 需要修改的字段
+            
+        Returns:
+            记录索引
+            
+        Raises:
+            KeyError: 记录不存在
+        """
+        doc_id = self.doc_store.doc_id(index)
+        record = {**self.doc_store.record(doc_id).to_dict(), **fields}
+        self._delete_doc(doc_id)
+        self._add_record(record, index)
+        self._data = None
+        self.unpersisted_changes += 1
+        logger.info(f"记录{index}已更新")
+        return index
+    
+    def delete_record(self, index: Hashable):
+        """
+        增量删除一条记录
+        
+        Args:
+            index: 记录索引（检索结果中的index字段）
+            
+        Raises:
+            KeyError: 记录不存在
+        """
+        self._delete_doc(self.doc_store.doc_id(index))
+        self._data = None
+        self.unpersisted_changes += 1
+        logger.info(f"记录{index}已删除")
+    
+    def _add_record(self, record: Dict[str, Any], label: Optional[Hashable] = None) -> int:
+        """把记录追加到文档存储和倒排索引，两者的文档id保持一致"""
+        doc_id = self.doc_store.add(record, label)
+        self.keyword_index.add_document(self._tokenize(self.doc_store.content(doc_id).lower()))
+        self.metadata_index.add(doc_id, self.doc_store.record(doc_id))
+        return doc_id
+    
+    def _delete_doc(self, doc_id: int):
+        """从文档存储和倒排索引中删除文档"""
+        self.doc_store.delete(doc_id)
+        self.keyword_index.delete_document(doc_id)
+        self.metadata_index.delete(doc_id)
+    
+    def _can_prune_candidates(self) -> bool:
+        """
+        判断是否可以只对倒排索引中的候选文档打分
+        
+        未命中任何查询词的文档只有长度奖励分数，其上限为length_bonus_weight；
+        当阈值不低于该上限时这些文档不可能入选，跳过它们不会改变检索结果
+        """
+        max_length_bonus = max(self.rag_config["length_bonus_weight"], 0)
+        return self.rag_config["min_score_threshold"] >= max_length_bonus
+    
+    def _metadata_mask(self, query_lower: str, query_words: set) -> Optional[np.ndarray]:
+        """
+        查询中提到的字段取值对应的文档位图
+        
+        Returns:
+            满足过滤条件的存活文档位图；未启用过滤或查询没有提到任何取值时返回None
+        """
+        if not self.rag_config["metadata_filter"]:
+            return None
+        constraints = self.metadata_index.match(query_lower, query_words, self._tokenize, self.keyword_index)
+        if not constraints:
+            return None
+        logger.debug(f"元数据过滤条件: {constraints}")
+        return self.metadata_index.mask(constraints) & self.keyword_index.alive
     
     def retrieve(self, query: str, top_k: Optional[int] = None) -> List[Dict[str, Any]]:
         """
@@ -186,39 +384,347 @@ class ResumeRAGCore:
         
         # 预处理查询
         query_lower = query.lower()
-        query_words = set(re.findall(r'\w+', query_lower))
-        
-        results = []
-        for item in self.processed_data:
-            score = self._calculate_similarity_score(
-                query_words, 
-                query_lower,
-                item['content_words'],
-                item['content_lower'],
-                item['content_length']
-            )
-            
-            if score > self.rag_config["min_score_threshold"]:
-                results.append({
-                    'score': score,
-                    'data': item['row'],
-                    'index': item['index']
-                })
+        query_words = set(self._tokenize(query_lower))
+        doc_mask = self._metadata_mask(query_lower, query_words)
         
-        # 按分数排序并返回top k
-        results.sort(key=lambda x: x['score'], reverse=True)
-        top_results = results[:top_k]
+        if self.rag_config["scoring"] == "bm25":
+            top_results = self._retrieve_bm25(query_words, top_k, doc_mask)
+        elif self.rag_config["engine"] == "sparse":
+            top_results = self._retrieve_keyword_sparse(query_words, top_k, doc_mask)
+        else:
+            top_results = self._retrieve_keyword(query_words, top_k, doc_mask)
         
         retrieval_time = time.time() - start_time
         logger.debug(f"检索完成，耗时{retrieval_time:.3f}s，找到{len(top_results)}个相关文档")
         
         return top_results
     
+    def retrieve_many(self, queries: List[str], top_k: Optional[int] = None,
+                      batch_size: int = 64) -> List[List[Dict[str, Any]]]:
+        """
+        批量检索相关文档
+        
+        每批查询统一分词，并通过一次稀疏矩阵乘法完成打分，适用于离线评测和缓存预热。
+        keyword打分的结果与逐条调用retrieve一致
+        
+        Args:
+            queries: 查询字符串列表
+            top_k: 每个查询返回top k个结果，默认使用配置中的值
+            batch_size: 每次矩阵乘法处理的查询数，用于控制内存占用
+            
+        Returns:
+            与queries一一对应的检索结果列表
+        """
+        if top_k is None:
+            top_k = self.rag_config["similarity_top_k"]
+        
+        start_time = time.time()
+        all_results = []
+        for batch_start in range(0, len(queries), batch_size):
+            batch_queries = [query.lower() for query in queries[batch_start:batch_start + batch_size]]
+            batch = [set(self._tokenize(query_lower)) for query_lower in batch_queries]
+            doc_masks = [self._metadata_mask(query_lower, words) for query_lower, words in zip(batch_queries, batch)]
+            
+            if self.rag_config["scoring"] == "bm25":
+                score_matrix = self.keyword_index.bm25_scores_many(
+                    batch,
+                    self.rag_config["bm25_k1"],
+                    self.rag_config["bm25_b"]
+                )
+                score_matrix.sort_indices()
+                # 未命中任何查询词的文档BM25分数为0，只需在每列的非零项中选top k
+                for col in range(len(batch)):
+                    start, end = score_matrix.indptr[col], score_matrix.indptr[col + 1]
+                    all_results.append(self._collect_top_k(
+                        score_matrix.data[start:end], top_k, score_matrix.indices[start:end], doc_masks[col]
+                    ))
+            else:
+                keyword_hits, exact_hits = self.keyword_index.match_counts_many(batch)
+                prune = self._can_prune_candidates()
+                if prune:
+                    keyword_hits.sort_indices()
+                    exact_hits.sort_indices()
+                for col, query_words in enumerate(batch):
+                    if prune:
+                        # 子串命中覆盖关键词命中，候选文档即exact_hits该列的非零行
+                        start, end = exact_hits.indptr[col], exact_hits.indptr[col + 1]
+                        doc_ids = exact_hits.indices[start:end]
+                        kw_start, kw_end = keyword_hits.indptr[col], keyword_hits.indptr[col + 1]
+                        keyword_counts = np.zeros(len(doc_ids), dtype=np.float64)
+                        keyword_counts[np.searchsorted(doc_ids, keyword_hits.indices[kw_start:kw_end])] = \
+                            keyword_hits.data[kw_start:kw_end]
+                        scores = self._keyword_scores(keyword_counts, exact_hits.data[start:end], len(query_words), doc_ids)
+                        all_results.append(self._collect_top_k(scores, top_k, doc_ids, doc_masks[col]))
+                    else:
+                        scores = self._keyword_scores(
+                            keyword_hits[:, col].toarray().ravel(),
+                            exact_hits[:, col].toarray().ravel(),
+                            len(query_words)
+                        )
+                        all_results.append(self._collect_top_k(scores, top_k, doc_mask=doc_masks[col]))
+        
+        retrieval_time = time.time() - start_time
+        logger.debug(f"批量检索完成，{len(queries)}个查询，耗时{retrieval_time:.3f}s")
+        
+        return all_results
+    
+    def _retrieve_keyword(self, query_words: set, top_k: int,
+                          doc_mask: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """
+        关键词重叠+子串匹配+长度奖励的综合打分检索，按MaxScore动态剪枝
+        
+        每个查询词对总分的贡献有上限：词表中有该词时为(keyword_weight+exact_match_weight)/n，
+        只能子串匹配时为exact_match_weight/n。查询词按上限升序排列，上限之和加上长度奖励上限
+        不超过当前第k名分数的最长前缀是"非必要词"：只命中这些词的文档不可能进入top_k。
+        只按文档id顺序遍历必要词的倒排表，候选文档的非必要词命中用二分查找补齐，
+        补齐过程中分数上限一旦不超过第k名分数就放弃该文档。堆中第k名分数升高后，
+        更多查询词变为非必要词，不再遍历它们的倒排表
+        
+        权重为负或阈值低于长度奖励上限（未命中任何词的文档也可能入选）时退回向量化全量打分
+        
+        doc_mask不为None时只对位图中的文档打分，没有结果时退回全量检索
+        """
+        if top_k <= 0:
+            return []
+        
+        keyword_weight = self.rag_config["keyword_weight"]
+        exact_weight = self.rag_config["exact_match_weight"]
+        length_weight = self.rag_config["length_bonus_weight"]
+        threshold = self.rag_config["min_score_threshold"]
+        if not query_words or keyword_weight < 0 or exact_weight < 0 or not self._can_prune_candidates():
+            return self._retrieve_keyword_sparse(query_words, top_k, doc_mask)
+        
+        index = self.keyword_index
+        n_query_words = len(query_words)
+        terms = self._maxscore_terms(query_words)
+        # prefix_bounds[i]: 前i个查询词的上限之和
+        prefix_bounds = [0.0]
+        for term in terms:
+            prefix_bounds.append(prefix_bounds[-1] + term["bound"])
+        max_length_bonus = max(length_weight, 0)
+        content_lengths = index.unique_term_counts
+        
+        def first_essential(theta: float, start: int) -> int:
+            """上限之和不超过theta的最长前缀长度（浮点误差留出余量，只在确定无法入选时剪枝）"""
+            while start < len(terms) and prefix_bounds[start + 1] + max_length_bonus + MAXSCORE_EPSILON <= theta:
+                start += 1
+            return start
+        
+        theta = threshold
+        essential = first_essential(theta, 0)
+        # 只有一开始就是必要词的倒排表才会被遍历
+        for term in terms[essential:]:
+            term["docs"] = self._live_union(term["postings"])
+        pointers = [0] * len(terms)
+        
+        # 堆元素为(score, -doc_id)：堆顶是当前top_k中分数最低、同分时id最大的文档。
+        # 文档按id升序处理，后处理的文档与堆顶同分时不会入选，因此"分数不超过theta"即可剪枝
+        heap: List[Tuple[float, int]] = []
+        while True:
+            doc_id = None
+            for i in range(essential, len(terms)):
+                docs = terms[i]["docs"]
+                if pointers[i] < len(docs) and (doc_id is None or docs[pointers[i]] < doc_id):
+                    doc_id = int(docs[pointers[i]])
+            if doc_id is None:
+                break
+            
+            keyword_matches = exact_matches = 0
+            for i in range(essential, len(terms)):
+                docs = terms[i]["docs"]
+                if pointers[i] < len(docs) and docs[pointers[i]] == doc_id:
+                    pointers[i] += 1
+                    exact_matches += 1
+                    keyword_matches += self._posting_contains(terms[i]["exact"], doc_id)
+            if doc_mask is not None and not doc_mask[doc_id]:
+                continue
+            
+            length_bonus = min(int(content_lengths[doc_id]) / 50, 1) * length_weight
+            partial = (keyword_matches * keyword_weight + exact_matches * exact_weight) / n_query_words
+            # 按上限从高到低补齐非必要词的命中，剩余上限不足以超过theta时放弃
+            pruned = False
+            for i in range(essential - 1, -1, -1):
+                if partial + prefix_bounds[i + 1] + length_bonus + MAXSCORE_EPSILON <= theta:
+                    pruned = True
+                    break
+                term = terms[i]
+                if self._term_contains(term, doc_id):
+                    exact_matches += 1
+                    partial += exact_weight / n_query_words
+                    if self._posting_contains(term["exact"], doc_id):
+                        keyword_matches += 1
+                        partial += keyword_weight / n_query_words
+            if pruned or partial + length_bonus + MAXSCORE_EPSILON <= theta:
+                continue
+            
+            score = self._combine_keyword_score(
+                keyword_matches, exact_matches, n_query_words, int(content_lengths[doc_id])
+            )
+            if score <= threshold:
+                continue
+            entry = (score, -doc_id)
+            if len(heap) < top_k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+            else:
+                continue
+            if len(heap) == top_k:
+                theta = heap[0][0]
+                essential = first_essential(theta, essential)
+        
+        if not heap and doc_mask is not None:
+            return self._retrieve_keyword(query_words, top_k)
+        
+        # 按分数降序、同分按原始顺序返回
+        results = []
+        for score, neg_doc_id in sorted(heap, reverse=True):
+            results.append({
+                'score': score,
+                'data': self.doc_store.record(-neg_doc_id),
+                'index': self.doc_store.label(-neg_doc_id)
+            })
+        return results
+    
+    def _maxscore_terms(self, query_words: set) -> List[Dict[str, Any]]:
+        """
+        MaxScore使用的查询词信息，按分数上限升序、同上限时倒排表长的在前排列
+        （长倒排表先成为非必要词，剪枝省下的遍历最多）
+        
+        Returns:
+            每个能子串命中的查询词一项：bound 分数上限，postings 子串匹配词项的倒排文档id数组，
+            exact 完全匹配词项的倒排文档id数组（词表中没有该词时为None）
+        """
+        index = self.keyword_index
+        n_query_words = len(query_words)
+        terms = []
+        for word in query_words:
+            term_ids = index.matching_term_ids(word)
+            if not term_ids:
+                continue
+            exact_id = index.term_ids.get(word)
+            bound = self.rag_config["exact_match_weight"]
+            if exact_id is not None:
+                bound += self.rag_config["keyword_weight"]
+            postings = [index.posting(term_id)[0] for term_id in term_ids]
+            terms.append({
+                "word": word,
+                "bound": bound / n_query_words,
+                "postings": postings,
+                "size": sum(len(docs) for docs in postings),
+                "exact": index.posting(exact_id)[0] if exact_id is not None else None,
+            })
+        terms.sort(key=lambda term: (term["bound"], -term["size"], term["word"]))
+        return terms
+    
+    def _live_union(self, postings: List[np.ndarray]) -> np.ndarray:
+        """多个倒排文档id数组的并集（升序），去掉已删除的文档"""
+        docs = np.unique(np.concatenate(postings)) if postings else np.zeros(0, dtype=np.int64)
+        if self.keyword_index.num_deleted:
+            docs = docs[self.keyword_index.alive[docs]]
+        return docs
+    
+    @staticmethod
+    def _posting_contains(docs: Optional[np.ndarray], doc_id: int) -> bool:
+        """二分查找升序倒排文档id数组中是否有doc_id"""
+        if docs is None:
+            return False
+        pos = np.searchsorted(docs, doc_id)
+        return bool(pos < len(docs) and docs[pos] == doc_id)
+    
+    def _term_contains(self, term: Dict[str, Any], doc_id: int) -> bool:
+        """文档是否子串命中该查询词；已遍历过的词直接查并集，否则逐个查子串匹配词项的倒排表"""
+        if "docs" in term:
+            return self._posting_contains(term["docs"], doc_id)
+        return any(self._posting_contains(docs, doc_id) for docs in term["postings"])
+    
+    def _retrieve_bm25(self, query_words: set, top_k: int,
+                       doc_mask: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """基于预计算IDF和长度归一化数组的BM25检索"""
+        scores = self.keyword_index.bm25_scores(
+            query_words,
+            self.rag_config["bm25_k1"],
+            self.rag_config["bm25_b"]
+        )
+        
+        return self._collect_top_k(scores, top_k, doc_mask=doc_mask)
+    
+    def _retrieve_keyword_sparse(self, query_words: set, top_k: int,
+                                 doc_mask: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """
+        keyword打分的向量化实现
+        
+        用文档-词项CSR矩阵一次性算出所有文档的关键词命中数和子串命中数，
+        再按与_calculate_similarity_score相同的公式和运算顺序组合，结果与逐文档打分一致
+        """
+        keyword_hits, exact_hits = self.keyword_index.match_counts(query_words)
+        scores = self._keyword_scores(keyword_hits, exact_hits, len(query_words))
+        return self._collect_top_k(scores, top_k, doc_mask=doc_mask)
+    
+    def _keyword_scores(self, keyword_hits: np.ndarray, exact_hits: np.ndarray, n_query_words: int,
+                        doc_ids: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        由命中数计算keyword综合分数
+        
+        Args:
+            keyword_hits: 完全匹配的查询词数
+            exact_hits: 子串匹配的查询词数
+            n_query_words: 查询词数量
+            doc_ids: 命中数对应的文档id，为None时表示全部文档
+        """
+        if n_query_words == 0:
+            return np.zeros(len(exact_hits), dtype=np.float64)
+        
+        unique_term_counts = self.keyword_index.unique_term_counts
+        if doc_ids is not None:
+            unique_term_counts = unique_term_counts[doc_ids]
+        
+        keyword_score = keyword_hits / n_query_words
+        exact_score = exact_hits / n_query_words
+        length_bonus = np.minimum(unique_term_counts / 50, 1) * self.rag_config["length_bonus_weight"]
+        
+        return (
+            keyword_score * self.rag_config["keyword_weight"] +
+            exact_score * self.rag_config["exact_match_weight"] +
+            length_bonus
+        )
+    
+    def _collect_top_k(self, scores: np.ndarray, top_k: int,
+                       doc_ids: Optional[np.ndarray] = None,
+                       doc_mask: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """
+        根据分数数组选出top k，同分文档按原始顺序排列
+        
+        Args:
+            scores: 分数数组
+            top_k: 返回数量
+            doc_ids: scores对应的升序文档id，为None时scores覆盖全部文档
+            doc_mask: 元数据过滤位图，只在位图中的文档里选取；没有文档超过阈值时退回不过滤
+        """
+        if doc_mask is not None:
+            valid = doc_mask if doc_ids is None else doc_mask[doc_ids]
+            positions = top_k_indices(np.where(valid, scores, -np.inf), self.rag_config["min_score_threshold"], top_k)
+            if len(positions) == 0:
+                return self._collect_top_k(scores, top_k, doc_ids)
+        else:
+            if doc_ids is None and self.keyword_index.num_deleted:
+                scores = np.where(self.keyword_index.alive, scores, -np.inf)
+            positions = top_k_indices(scores, self.rag_config["min_score_threshold"], top_k)
+        results = []
+        for pos in positions:
+            doc_id = pos if doc_ids is None else doc_ids[pos]
+            results.append({
+                'score': float(scores[pos]),
+                'data': self.doc_store.record(doc_id),
+                'index': self.doc_store.label(doc_id)
+            })
+        return results
+    
     def _calculate_similarity_score(self, query_words: set, query_lower: str, 
                                   content_words: set, content_lower: str, 
                                   content_length: int) -> float:
         """
-        计算相似度分数
+        计算相似度分数（逐文档参考实现，检索时使用倒排索引得到的命中数）
         
         Args:
             query_words: 查询词汇集合
@@ -230,16 +736,32 @@ class ResumeRAGCore:
         Returns:
             相似度分数
         """
-        if not query_words:
+        keyword_matches = len(query_words.intersection(content_words))
+        exact_matches = sum(1 for word in query_words if word in content_lower)
+        return self._combine_keyword_score(keyword_matches, exact_matches, len(query_words), content_length)
+    
+    def _combine_keyword_score(self, keyword_matches: int, exact_matches: int,
+                               n_query_words: int, content_length: int) -> float:
+        """
+        由命中数计算综合分数
+        
+        Args:
+            keyword_matches: 完全匹配的查询词数
+            exact_matches: 作为子串出现在内容中的查询词数
+            n_query_words: 查询词数量
+            content_length: 内容长度（去重词数）
+            
+        Returns:
+            相似度分数
+        """
+        if not n_query_words:
             return 0.0
         
         # 1. 关键词匹配分数
-        common_words = query_words.intersection(content_words)
-        keyword_score = len(common_words) / len(query_words)
+        keyword_score = keyword_matches / n_query_words
         
         # 2. 精确匹配分数
-        exact_matches = sum(1 for word in query_words if word in content_lower)
-        exact_score = exact_matches / len(query_words)
+        exact_score = exact_matches / n_query_words
         
         # 3. 长度奖励分数（避免过短的文档得分过高）
         length_bonus = min(content_length / 50, 1) * self.rag_config["length_bonus_weight"]
@@ -372,13 +894,15 @@ Answer naturally as me:
             logger.error(error_msg)
             return error_msg
     
-    def query(self, question: str, stream: bool = False) -> Dict[str, Any]:
+    def query(self, question: str, stream: bool = False,
+              retrieved_docs: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
         """
         完整的查询流程
         
         Args:
             question: 用户问题
             stream: 是否使用流式输出
+            retrieved_docs: 预先检索好的文档（如retrieve_many的结果），为None时实时检索
             
         Returns:
             包含回答和相关信息的字典
@@ -387,7 +911,8 @@ Answer naturally as me:
         
         try:
             # 1. 检索相关文档
-            retrieved_docs = self.retrieve(question)
+            if retrieved_docs is None:
+                retrieved_docs = self.retrieve(question)
             
             # 2. 生成prompt
             prompt = self.generate_prompt(question, retrieved_docs)
@@ -469,7 +994,15 @@ Answer naturally as me:
         if "model" in new_config:
             self.model_config.update(new_config["model"])
         if "rag" in new_config:
+            tokenizer = self.rag_config["tokenizer"]
+            filter_fields = self.rag_config["filter_fields"], self.rag_config["alias_fields"]
             self.rag_config.update(new_config["rag"])
+            if self.rag_config["tokenizer"] != tokenizer:
+                # 分词规则变化后倒排索引中的词项不再适用，需要重建
+                self._tokenize = get_tokenizer(self.rag_config["tokenizer"])
+                self._preprocess_data()
+            elif (self.rag_config["filter_fields"], self.rag_config["alias_fields"]) != filter_fields:
+                self._build_metadata_index()
         logger.info("配置已更新")
     
     def get_config(self) -> Dict[str, Any]:
@@ -353,13 +353,18 @@ class RAGDebugger:
         print(f"🧪 开始批量测试 ({len(test_queries)} 个查询)")
         print(f"{'='*60}")
         
+        # 一次性批量检索所有查询
+        retrieval_start = time.time()
+        batch_retrieved = self.rag_core.retrieve_many(test_queries)
+        print(f"🔍 批量检索完成，耗时: {time.time() - retrieval_start:.3f}s")
+        
         results = []
-        for i, query in enumerate(test_queries, 1):
+        for i, (query, retrieved_docs) in enumerate(zip(test_queries, batch_retrieved), 1):
             print(f"\n📝 测试 {i}/{len(test_queries)}: {query}")
             print(f"{'-'*40}")
             
             start_time = time.time()
-            result = self.rag_core.query(query, stream=False)
+            result = self.rag_core.query(query, stream=False, retrieved_docs=retrieved_docs)
             test_time = time.time() - start_time
             
             if result['success']:
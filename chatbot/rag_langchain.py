@@ -6,8 +6,15 @@ LangChain RAG 集成模块
 
 import os
 import sys
+import asyncio
 import logging
-from typing import Dict, Any, Optional
+import threading
+import time
+from functools import partial
+from typing import Dict, Any, List, Optional
+
+from config import DEFAULT_EXCEL_PATH, HYBRID_CONFIG
+from hybrid_retriever import HybridRetriever, RETRIEVAL_MODES
 
 # 设置日志
 logging.basicConfig(
@@ -31,6 +38,9 @@ else:
 # 导入 LangChain RAG 组件
 try:
     from chatbot import ResumeChatbot
+    from embedding_batcher import EmbeddingMicroBatcher
+    from retreival import (clear_registry, get_query_cache_stats, release_index_lease, renew_index_lease,
+                           resolve_index_directory, retrieve_similar_documents)
 except ImportError as e:
     logger.error(f"无法导入 ResumeChatbot: {e}")
     # 尝试从相对路径导入
@@ -38,24 +48,33 @@ except ImportError as e:
         import sys
         sys.path.append('/app/RAG_algotirhm/rag_core/LangChainRag')
         from chatbot import ResumeChatbot
+        from embedding_batcher import EmbeddingMicroBatcher
+        from retreival import (clear_registry, get_query_cache_stats, release_index_lease, renew_index_lease,
+                               resolve_index_directory, retrieve_similar_documents)
     except ImportError as e2:
         logger.error(f"导入失败: {e2}")
         raise
 
 
+# 索引热切换时用于预热新向量库的查询
+INDEX_WARMUP_QUERY = "What are the candidate's main skills?"
+
+
 class LangChainRAGAdapter:
     """
     LangChain RAG 适配器
     将新的 LangChain RAG 系统适配到现有 API 接口
     """
     
-    def __init__(self, persist_directory: Optional[str] = None, config: Optional[Dict] = None):
+    def __init__(self, persist_directory: Optional[str] = None, config: Optional[Dict] = None,
+                 xlsx_path: Optional[str] = None):
         """
         初始化 LangChain RAG 适配器
         
         Args:
             persist_directory: ChromaDB 存储目录
             config: 可选配置
+            xlsx_path: 关键词检索使用的简历Excel文件，默认为 DEFAULT_EXCEL_PATH
         """
         # 设置默认路径
         if persist_directory is None:
@@ -63,15 +82,115 @@ class LangChainRAGAdapter:
         
         logger.info(f"初始化 LangChain RAG 系统，persist_directory: {persist_directory}")
         
+        # 持久化目录中的 CURRENT 指针指向当前索引版本，reload_index 据此热切换
+        self.persist_directory = persist_directory
+        self.index_directory = resolve_index_directory(persist_directory)
+        self._reload_lock = threading.Lock()
+        
         try:
             # 初始化 ResumeChatbot
-            self.chatbot = ResumeChatbot(persist_directory=persist_directory, config=config)
+            self.chatbot = ResumeChatbot(persist_directory=self.index_directory, config=config)
             logger.info("LangChain RAG 系统初始化成功")
         except Exception as e:
             logger.error(f"LangChain RAG 系统初始化失败: {e}")
             raise
+        # 登记正在读取的索引版本，清理旧版本时不会删除它
+        self.renew_index_lease()
+        
+        # 并发请求的查询向量合并成批计算；每批都使用当前向量库的 embedding 模型，索引热切换后随之更新
+        self.embedding_batcher = EmbeddingMicroBatcher(lambda: self.chatbot.vectordb.embeddings)
+        
+        # 关键词检索引擎在第一次使用 keyword / hybrid 模式时才加载
+        self.xlsx_path = xlsx_path or os.path.join(os.path.dirname(os.path.abspath(__file__)), DEFAULT_EXCEL_PATH)
+        self._keyword_rag = None
+        self._keyword_lock = threading.Lock()
+        self.hybrid_retriever = HybridRetriever({
+            "keyword": self._keyword_search,
+            "vector": self.chatbot.retrieve,
+        })
+    
+    @property
+    def keyword_rag(self):
+        """关键词检索引擎（ResumeRAGCore）"""
+        with self._keyword_lock:
+            if self._keyword_rag is None:
+                from rag_core import ResumeRAGCore
+                self._keyword_rag = ResumeRAGCore(self.xlsx_path)
+            return self._keyword_rag
+    
+    def _keyword_search(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        """
+        关键词检索，结果转换为与向量检索相同的格式
+        
+        Args:
+            query: 查询字符串
+            top_k: 返回数量
+            
+        Returns:
+            文档列表，每个文档包含content、metadata字段
+        """
+        docs = []
+        for item in self.keyword_rag.retrieve(query, top_k):
+            row = item['data']
+            docs.append({
+                'content': f"{row.get('type', 'Unknown')} | {row.get('company_organization', 'Unknown')} | "
+                           f"{row.get('position_title', 'Unknown')}: {row.get('context', '')}",
+                'metadata': {
+                    'source': os.path.basename(self.xlsx_path),
+                    'record_index': item['index'],
+                    'type': row.get('type'),
+                    'company_organization': row.get('company_organization'),
+                    'keyword_score': item['score'],
+                },
+            })
+        return docs
+    
+    def _retrieve(self, question: str, top_k: int, mode: str,
+                  query_vector: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+        """
+        按检索模式检索文档，只读访问向量库和关键词索引，可在线程池中并发执行
+        
+        Args:
+            question: 用户问题
+            top_k: 检索文档数量
+            mode: 检索模式，"vector" | "keyword" | "hybrid"
+            query_vector: 预先计算的查询向量，为None时在向量检索中计算
+            
+        Returns:
+            文档列表，每个文档包含content、metadata字段
+        """
+        if mode == "vector":
+            return self.chatbot.retrieve(question, top_k, query_vector=query_vector)
+        engine_kwargs = {"vector": {"query_vector": query_vector}} if query_vector is not None else None
+        return self.hybrid_retriever.retrieve(question, top_k, mode, engine_kwargs)
+    
+    @staticmethod
+    def _format_result(result: Dict[str, Any], mode: str) -> Dict[str, Any]:
+        """适配 chatbot 的返回格式以兼容原有 API"""
+        return {
+            "answer": result["answer"],
+            "retrieved_docs": result.get("retrieved_docs", []),
+            "retrieved_count": result.get("retrieved_count", 0),
+            "retrieval_mode": mode,
+            "response_time": 0,  # chatbot 内部已计时
+            "success": result.get("success", True)
+        }
+    
+    @staticmethod
+    def _error_result(e: Exception) -> Dict[str, Any]:
+        """查询失败时的返回值"""
+        logger.error(f"查询处理失败: {str(e)}")
+        return {
+            "answer": f"抱歉，处理您的问题时出现错误: {str(e)}",
+            "retrieved_docs": [],
+            "retrieved_count": 0,
+            "response_time": 0,
+            "success": False,
+            "error": str(e)
+        }
     
-    def query(self, question: str, stream: bool = False, top_k: int = 5) -> Dict[str, Any]:
+    def query(self, question: str, stream: bool = False, top_k: int = 5,
+              mode: Optional[str] = None, query_vector: Optional[List[float]] = None) -> Dict[str, Any]:
         """
         查询接口（兼容原有 API）
         
@@ -79,33 +198,107 @@ class LangChainRAGAdapter:
             question: 用户问题
             stream: 是否使用流式输出
             top_k: 检索文档数量
+            mode: 检索模式，"vector" | "keyword" | "hybrid"，默认使用 HYBRID_CONFIG["default_mode"]
+            query_vector: 预先计算的查询向量，为None时在向量检索中计算
             
         Returns:
             包含回答和元数据的字典
         """
+        mode = mode or HYBRID_CONFIG["default_mode"]
         try:
-            # 调用 chatbot 的 chat 方法
-            result = self.chatbot.chat(question, top_k=top_k, stream=stream)
+            retrieved_docs = self._retrieve(question, top_k, mode, query_vector)
+            # chatbot.chat 内部对读取记忆、生成、写回记忆加锁，并发调用时对话轮次不会交错
+            result = self.chatbot.chat(question, top_k=top_k, stream=stream, retrieved_docs=retrieved_docs)
+            return self._format_result(result, mode)
+        except Exception as e:
+            return self._error_result(e)
+    
+    async def aquery(self, question: str, stream: bool = False, top_k: int = 5,
+                     mode: Optional[str] = None) -> Dict[str, Any]:
+        """
+        异步查询接口
+        查询向量经微批处理器与其他并发请求合并计算，检索在线程池中并发执行；
+        生成回答读写共享的对话记忆，在线程池中逐个执行（见 ResumeChatbot.chat），不阻塞事件循环
+        
+        Args:
+            question: 用户问题
+            stream: 是否使用流式输出
+            top_k: 检索文档数量
+            mode: 检索模式，"vector" | "keyword" | "hybrid"，默认使用 HYBRID_CONFIG["default_mode"]
             
-            # 适配返回格式以兼容原有 API
-            return {
-                "answer": result["answer"],
-                "retrieved_docs": result.get("retrieved_docs", []),
-                "retrieved_count": result.get("retrieved_count", 0),
-                "response_time": 0,  # chatbot 内部已计时
-                "success": result.get("success", True)
-            }
+        Returns:
+            包含回答和元数据的字典
+        """
+        mode = mode or HYBRID_CONFIG["default_mode"]
+        query_vector = None
+        if mode != "keyword":
+            try:
+                query_vector = await self.embedding_batcher.embed_query(question)
+            except Exception as e:
+                # 批量计算失败时退回检索时逐条计算
+                logger.warning(f"批量计算查询向量失败，改为单独计算: {e}")
+        
+        loop = asyncio.get_running_loop()
+        try:
+            retrieved_docs = await loop.run_in_executor(
+                None, partial(self._retrieve, question, top_k, mode, query_vector)
+            )
+            result = await loop.run_in_executor(
+                None, partial(self.chatbot.chat, question, top_k=top_k, stream=stream, retrieved_docs=retrieved_docs)
+            )
+            return self._format_result(result, mode)
         except Exception as e:
-            logger.error(f"查询处理失败: {str(e)}")
+            return self._error_result(e)
+    
+    def reload_index(self) -> Dict[str, Any]:
+        """
+        热切换到 CURRENT 指针指向的索引版本（版本由 index_versions.build_index_version 发布）
+        新索引先加载并预热，再替换 chatbot 使用的向量库：切换前已开始的请求在旧索引上完成，
+        之后的请求使用新索引，切换过程中没有请求失败，也没有请求承担加载开销
+        每次调用都会续约索引版本租约，定期调用（见 api_server_langchain.watch_index_versions）即为租约心跳
+        
+        Returns:
+            包含是否切换、当前与之前的索引目录和加载耗时的字典
+        """
+        with self._reload_lock:
+            index_directory = resolve_index_directory(self.persist_directory)
+            if index_directory == self.index_directory:
+                self.renew_index_lease()
+                return {"reloaded": False, "index_directory": index_directory}
+            # 加载前先登记新版本，加载期间它不会被清理
+            renew_index_lease(self.persist_directory, index_directory)
+            
+            start = time.perf_counter()
+            # 与启动时相同的 embedding 模型、后端和向量库类型（ResumeChatbot 的检索配置）
+            vectordb = self.chatbot.load_vector_store(index_directory)
+            # 预热：首次检索会打开客户端并加载向量（flat / HNSW 还会从 Chroma 导出），不放在请求路径上
+            retrieve_similar_documents(INDEX_WARMUP_QUERY, vectordb, 1)
+            self.chatbot.swap_vector_store(vectordb)
+            previous, self.index_directory = self.index_directory, index_directory
+            # 注册表不再持有旧版本，进行中的请求结束后旧向量库即可释放；
+            # 租约改为新版本后，旧版本在宽限期过后即可被清理，进行中的请求在此之前早已结束
+            clear_registry(previous)
+            load_time = time.perf_counter() - start
+            
+            logger.info(f"索引已切换: {previous} -> {index_directory}，加载耗时 {load_time:.2f}s")
             return {
-                "answer": f"抱歉，处理您的问题时出现错误: {str(e)}",
-                "retrieved_docs": [],
-                "retrieved_count": 0,
-                "response_time": 0,
-                "success": False,
-                "error": str(e)
+                "reloaded": True,
+                "index_directory": index_directory,
+                "previous_index_directory": previous,
+                "load_time": load_time,
             }
     
+    def renew_index_lease(self):
+        """续约当前索引版本的租约，失败时只记录警告（未续约的版本在租约过期后才可能被清理）"""
+        try:
+            renew_index_lease(self.persist_directory, self.index_directory)
+        except OSError as e:
+            logger.warning(f"续约索引版本租约失败: {e}")
+    
+    def close(self):
+        """释放索引版本租约，服务关闭时调用"""
+        release_index_lease(self.persist_directory)
+    
     def get_summary(self) -> Dict[str, Any]:
         """
         获取系统摘要信息
@@ -122,6 +315,11 @@ class LangChainRAGAdapter:
                 "llm": "deepseek-ai/DeepSeek-V3.1",
                 "memory": "ConversationBufferMemory"
             },
+            "retrieval_modes": list(RETRIEVAL_MODES),
+            "default_retrieval_mode": HYBRID_CONFIG["default_mode"],
+            "query_embedding_cache": get_query_cache_stats(),
+            "embedding_batcher": self.embedding_batcher.stats(),
+            "index_directory": self.index_directory,
             "status": "operational"
         }
     